@@ -1,983 +1,1292 @@
-import sys
-import os
-import re
-import time
-import zipfile
-import urllib.request
-import subprocess
-from subprocess import STARTUPINFO, STARTF_USESHOWWINDOW
-from datetime import datetime
-from PyQt5 import QtCore
-from PyQt5.QtCore import QThread
-from PyQt5.QtCore import QSettings
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QLabel, QTableWidget, QPushButton, QComboBox, QTableWidgetItem, QLabel, \
-    QWidget, QGridLayout, QHBoxLayout, QVBoxLayout, QFormLayout, QLineEdit, QTabWidget,QSizePolicy,QPlainTextEdit,QGroupBox,QAction,QMessageBox,QMenu,QProgressDialog
-
-LIGHT_STYLE = ("""
-    QMainWindow {
-        background-color: #f0f0f0;
-    }
-    QTabWidget::pane {
-        border: none;
-    }
-    QTabBar {
-        background-color: #333;
-        color: white;
-        height: 30px;
-    }
-    QTabBar::tab:selected {
-        background-color: #555;
-    }
-    QTabBar::tab:!selected {
-        background-color: #444;
-    }
-    QPushButton {
-        border-radius: 15px;
-        background-color: #007BFF;
-        color: white;
-        border: none;
-        padding: 8px 15px;
-    }
-    QPushButton:hover {
-        background-color: #0056b3;
-    }
-    QLineEdit, QComboBox, QTableWidget, QPlainTextEdit {
-        background-color: white;
-        border: 1px solid #ccc;
-        padding: 5px;
-    }
-    QMessageBox {
-        background-color: #f0f0f0;
-        color: #000000;
-    }
-    QMessageBox QPushButton {
-        background-color: #e0e0e0;
-        color: black;
-        border: 1px solid #cccccc;
-    }
-    QComboBox {
-        border-radius: 10px;
-    }
-""")
-
-DARK_STYLE = ("""
-    QMainWindow {
-        background-color: #212121;
-    }
-    QTabWidget::pane {
-        border: none;
-    }
-    QTabBar {
-        background-color: #121212;
-        color: #ffffff;
-    }
-    QTabBar::tab:selected {
-        background-color: #424242;
-    }
-    QTabBar::tab:!selected {
-        background-color: #1c1c1c;
-    }
-    QPushButton {
-        border-radius: 15px;
-        background-color: #0056b3;
-        color: white;
-        border: none;
-        padding: 8px 15px;
-    }
-    QPushButton:hover {
-        background-color: #474747;
-    }
-    QLineEdit, QComboBox, QPlainTextEdit {
-        background-color: #1e1e1e;
-        color: #ffffff;
-        border: 1px solid #333333;
-    }
-    QComboBox {
-        border-radius: 10px;
-        padding: 6px 12px;
-    }
-    QTableWidget {
-        background-color: #1e1e1e;
-        color: #ffffff;
-    }
-    QTableWidget QHeaderView::section {
-        background-color: #333333;
-        color: #ffffff;
-    }
-    QLabel ,QGroupBox{
-        color: #ffffff;
-    }
-    QMessageBox {
-        background-color: #212121;
-        color: #ffffff;
-    }
-    QMessageBox QPushButton {
-        background-color: #333333;
-        color: white;
-        border: 1px solid #444444;
-    }
-""")
-
-bitrate_num = "1M","2M","3M","4M","5M","6M","8M","10M","12M","14M","20M","30M","40M","50M"
-sel_preset = "slow", "medium", "fast"
-num_encodes = "1", "2", "3","4","5"
-mp4_output = ".mp4"
-mkv_output = ".mkv"
-def get_video_duration(video_file):
-    """Get the duration of a video using FFprobe."""
-    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", video_file]
-    try:
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        output = subprocess.check_output(command, universal_newlines=True, startupinfo=startupinfo)
-        return float(output.strip())
-    except subprocess.CalledProcessError as e:
-        print(f"Error getting video duration for {video_file}: {e}")
-        return None
-    
-from concurrent.futures import ThreadPoolExecutor
-
-class VideoEncoderThread(QThread):
-    fps_updated = QtCore.pyqtSignal(int, float)
-    encoding_canceled = QtCore.pyqtSignal()
-    elapsed_time_updated = QtCore.pyqtSignal(str)
-    encoding_complete = QtCore.pyqtSignal()
-    encoding_progress_updated = QtCore.pyqtSignal(int, str)  # New signal for encoding progress
-    encoding_completed = QtCore.pyqtSignal(int)
-    console_output_updated = QtCore.pyqtSignal(str)  # New signal for console output
-
-    def __init__(self, input_files, output_folder, preset, bitrate, simultaneous_encodes, hwaccel_index, bitrate_mode_combobox,min_bitrate,max_bitrate,format_combobox):
-        super().__init__()
-        self.input_files = input_files
-        self.output_folder = output_folder
-        self.preset = preset
-        self.bitrate = bitrate
-        self.simultaneous_encodes = simultaneous_encodes
-        self.bitrate_mode_combobox = bitrate_mode_combobox  # Store the bitrate_mode_combobox as an instance variable
-        self.min_bitrate_combobox = min_bitrate
-        self.max_bitrate_combobox = max_bitrate
-        self.format_combobox = format_combobox
-        self.processes = []
-        self.elapsed_times = [0] * len(input_files)
-        self.start_times = [num_encodes] * len(input_files)
-        self._is_canceled = False
-        self.hwaccel_index = hwaccel_index
-        self.started_encoding = [False] * len(input_files)
-        self.finished_encoding = [False] * len(input_files)
-        self.processed_frames = [0] * len(input_files)
-
-    def run(self):
-        with ThreadPoolExecutor(max_workers=self.simultaneous_encodes) as executor:
-            futures = []
-
-            for i, input_file in enumerate(self.input_files):
-                # Choose format based on combobox selection
-                selected_format = self.format_combobox.currentText()
-                print(selected_format)
-
-                # Modify the output file name to include the selected format
-                output_file = os.path.splitext(os.path.join(self.output_folder, os.path.basename(input_file)))[0] + '.' + selected_format
-
-
-                # Get the selected hardware acceleration option based on the index
-                hwaccel_options = ["Nvidia_Cuda_h264","Nvidia_Cuvid_h264","Nvidia_Cuda_265", "Nvidia_Cuvid_265"]
-                if 0 <= self.hwaccel_index < len(hwaccel_options):
-                    hwaccel = hwaccel_options[self.hwaccel_index]
-                else:
-                    hwaccel = "auto"
-
-                if hwaccel  == "Nvidia_Cuvid_265":
-                    command = [
-                        "ffmpeg",
-                        "-y",
-                        "-hwaccel", "cuvid",
-                        "-i", input_file,
-                        "-c:v", "hevc_nvenc",
-                        "-preset", self.preset,
-                    ]
-                    
-                    if self.bitrate_mode_combobox.currentText() == "CBR":
-                        command += ["-b:v", self.bitrate]
-                    elif self.bitrate_mode_combobox.currentText() == "VBR":
-                        command += ["-b:v",self.min_bitrate_combobox.currentText(),"-minrate", self.min_bitrate_combobox.currentText(), "-maxrate", self.max_bitrate_combobox.currentText(), "-bufsize", "50M"]
-                    
-                    command += ["-c:a", "copy", output_file]
-
-                if hwaccel  == "Nvidia_Cuvid_h264":
-                    command = [
-                        "ffmpeg",
-                        "-y",
-                        "-hwaccel", "cuvid",
-                        "-i", input_file,
-                        "-c:v", "h264_nvenc",
-                        "-preset", self.preset,
-                        ]
-                    
-                    if self.bitrate_mode_combobox.currentText() == "CBR":
-                        command += ["-b:v", self.bitrate]
-                    elif self.bitrate_mode_combobox.currentText() == "VBR":
-                        command += ["-b:v",self.min_bitrate_combobox.currentText(),"-minrate", self.min_bitrate_combobox.currentText(), "-maxrate", self.max_bitrate_combobox.currentText(), "-bufsize", "50M"]
-                    
-                    command += ["-c:a", "copy", output_file]
-
-                if hwaccel == "Nvidia_Cuda_265":
-                    command = [
-                        "ffmpeg",
-                        "-y",
-                        "-hwaccel", "cuda",
-                        "-i", input_file,
-                        "-c:v", "hevc_nvenc",
-                        "-preset", self.preset,
-                        ]
-                    
-                    if self.bitrate_mode_combobox.currentText() == "CBR":
-                        command += ["-b:v", self.bitrate]
-                    elif self.bitrate_mode_combobox.currentText() == "VBR":
-                        command += ["-b:v",self.min_bitrate_combobox.currentText(),"-minrate", self.min_bitrate_combobox.currentText(), "-maxrate", self.max_bitrate_combobox.currentText(), "-bufsize", "50M"]
-                   
-                    command += ["-c:a", "copy", output_file]
-
-                if hwaccel == "Nvidia_Cuda_h264":
-                    command = [
-                        "ffmpeg",
-                        "-y",
-                        "-hwaccel", "cuda",
-                        "-i", input_file,
-                        "-c:v", "h264_nvenc",
-                        "-preset", self.preset,
-                        ]
-                    
-                    if self.bitrate_mode_combobox.currentText() == "CBR":
-                        command += ["-b:v", self.bitrate]
-                    elif self.bitrate_mode_combobox.currentText() == "VBR":
-                        command += ["-b:v",self.min_bitrate_combobox.currentText(),"-minrate", self.min_bitrate_combobox.currentText(), "-maxrate", self.max_bitrate_combobox.currentText(), "-bufsize", "50M"]
-                    
-                    command += ["-c:a", "copy", output_file]
-
-                future = executor.submit(self.execute_ffmpeg, command, i)
-                futures.append(future)
-
-            for i, future in enumerate(futures):
-                future.result()
-
-                if self._is_canceled:
-                    self.encoding_canceled.emit()
-
-                else:
-                    self.encoding_completed.emit(i)  # Emit the signal with the row index
-                    
-                   
-
-    def shutdown(self):
-        self._is_canceled = True
-        # Terminate all subprocesses
-        for process in self.processes:
-            process.terminate()
-            process.wait()
-
-    def cancel_encoding(self):
-        self._is_canceled = True
-        self.shutdown()
-
-    def execute_ffmpeg(self, command, row_index):
-        startupinfo = STARTUPINFO()
-        startupinfo.dwFlags |= STARTF_USESHOWWINDOW
-        try:
-            # Process the FFmpeg command and capture the output
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                bufsize=1,
-                universal_newlines=True,
-                startupinfo=startupinfo,
-                encoding='utf-8',  # Specify encoding directly
-                errors='replace',  # Handle decoding errors
-                text=True  # Use text mode
-            )
-
-            self.processes.append(process)
-            self.start_times[row_index] = datetime.now()
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-
-                if self._is_canceled:
-                    break
-
-                # Start the elapsed timer only when encoding has started for the video item
-                if not self.started_encoding[row_index]:
-                    self.started_encoding[row_index] = True
-                    self.start_times[row_index] = datetime.now()
-
-                fps_match = re.search(r'(\d+\.?\d*)\sfps', line)
-                if fps_match:
-                    fps = float(fps_match.group(1))
-                    elapsed_time = (datetime.now() - self.start_times[row_index]).total_seconds()
-                    if elapsed_time > 0:
-                        fps = fps / elapsed_time
-                    self.fps_updated.emit(row_index, fps)
-
-                if self.started_encoding[row_index]:
-                    self.elapsed_times[row_index] = int((datetime.now() - self.start_times[row_index]).total_seconds())
-
-                # Emit the console output line directly to the main GUI
-                self.console_output_updated.emit(line.strip())  # Emitting the stripped output line
-
-                frame_match = re.search(r'frame=\s*(\d+)', line)
-                if frame_match:
-                    self.processed_frames[row_index] = int(frame_match.group(1))
-
-            process.wait()
-
-            # Emit a signal indicating the task for row_index is completed
-            self.encoding_completed.emit(row_index)
-
-        except Exception as e:
-            # Handle exceptions (e.g., log the error)
-            print(f"An error occurred: {e}")
-        
-    def get_processed_frames(self, row):
-        # Return the number of processed frames for the task at the specified row
-        return self.processed_frames[row]
-
-class VideoEncoder(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        
-        self.is_dark_mode = True  # Start with dark mode enabled
-        self.setStyleSheet(DARK_STYLE)  
-
-        self.setWindowTitle("Video Encoder")
-        self.setGeometry(100, 100, 1000, 800)
-
-        self.init_ui()
-        self.check_and_install_ffmpeg()
-
-
-    def download_and_install_ffmpeg(self):
-        print("Downloading FFmpeg...")
-
-        # New download URL
-        download_url = "hhttps://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
-
-        # Rest of the code remains the same
-        download_path = os.path.join(os.getcwd(), "ffmpeg.zip")
-
-        # Create a progress dialog
-        progress_dialog = QProgressDialog("Downloading FFmpeg...", "Cancel", 0, 100)
-        progress_dialog.setWindowModality(QtCore.Qt.WindowModal)
-        progress_dialog.setWindowTitle("Download Progress")
-        progress_dialog.setAutoClose(True)
-
-        def reporthook(blocknum, blocksize, totalsize):
-            nonlocal progress_dialog
-
-            # Calculate the download progress
-            progress = min(int(blocknum * blocksize * 100 / totalsize), 100)
-
-            # Update the progress dialog
-            progress_dialog.setValue(progress)
-
-        urllib.request.urlretrieve(download_url, download_path, reporthook=reporthook)
-
-        # Close the progress dialog
-        progress_dialog.close()
-
-        print("Extracting FFmpeg...")
-
-        # Extract the downloaded zip file directly to C:\ffmpeg\bin
-        ffmpeg_bin_path = "C:\\ffmpeg\\bin"
-
-        with zipfile.ZipFile(download_path, 'r') as zip_ref:
-            for file_info in zip_ref.infolist():
-                try:
-                    file_info.filename = os.path.basename(file_info.filename)  # Get only the filename
-                    zip_ref.extract(file_info, ffmpeg_bin_path)
-                except Exception as e:
-                    #print(f"Error extracting file: {file_info.filename}")
-                    #print(f"Exception: {e}")
-                    continue
-
-
-        # Clean up: remove the downloaded zip file
-        os.remove(download_path)
-
-        # Add the FFmpeg bin directory to the system's PATH
-        self.add_to_path(ffmpeg_bin_path)
-
-        # Print a message
-        print("FFmpeg installed successfully.")
-
-
-    def check_and_install_ffmpeg(self): 
-        if not self.is_ffmpeg_installed():
-            message = (
-                "FFmpeg is not installed or not found in the system's PATH.\n\n"
-                "FFmpeg is required for this application to function properly. "
-                "Do you want to download and install it to 'C:\\ffmpeg\\bin'?"
-            )
-
-            reply = QMessageBox.question(self, 'FFmpeg Not Found', message,
-                                        QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-
-            if reply == QMessageBox.Yes:
-                self.download_and_install_ffmpeg()
-                print("FFmpeg installed successfully.")
-            else:
-                print("User chose not to install FFmpeg.")
-                # Handle the case where the user chooses not to install FFmpeg
-
-    def is_ffmpeg_installed(self):
-        try:
-            # Use subprocess to run the command 'ffmpeg -version'
-            subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            print("FFmpeg is already installed.")
-            return True
-        except FileNotFoundError:
-            print("FFmpeg is not installed.")
-            return False
-        
-    def add_to_path(self, program_path: str):
-        """Takes in a path to a program and adds it to the user-specific path"""
-        if os.name == "nt":  # Windows systems
-            import winreg  # Allows access to the windows registry
-            import ctypes  # Allows interface with low-level C API's
-
-            with winreg.ConnectRegistry(None, winreg.HKEY_CURRENT_USER) as root:  # Get the current user registry
-                with winreg.OpenKey(root, "Environment", 0, winreg.KEY_ALL_ACCESS) as key:  # Go to the environment key
-                    existing_path_value = winreg.QueryValueEx(key, "PATH")[0]  # Grab the current path value
-
-                    # Check if the path is already in the existing value
-                    if program_path not in existing_path_value:
-                        new_path_value = existing_path_value + ";" + program_path
-                        winreg.SetValueEx(key, "PATH", 0, winreg.REG_EXPAND_SZ, new_path_value)  # Update the path
-
-                # Tell other processes to update their environment
-                HWND_BROADCAST = 0xFFFF
-                WM_SETTINGCHANGE = 0x1A
-                SMTO_ABORTIFHUNG = 0x0002
-                result = ctypes.c_long()
-                SendMessageTimeoutW = ctypes.windll.user32.SendMessageTimeoutW
-                SendMessageTimeoutW(HWND_BROADCAST, WM_SETTINGCHANGE, 0, u"Environment", SMTO_ABORTIFHUNG, 5000, ctypes.byref(result), )
-        else:  # If the system is *nix
-            print("This method is intended for Windows systems. For *nix systems, consider modifying the PATH manually.")
-
-        print(f"Added {program_path} to user path, please restart the shell for changes to take effect")
-
-
-
-    def contextMenuEvent(self, event):
-        # Ensure the event is within the bounds of the QTableWidget
-        if not self.table_widget.underMouse():
-            return
-
-        contextMenu = QMenu(self)
-        
-        # Map the event position to the viewport of the table widget
-        tablePos = self.table_widget.viewport().mapFromGlobal(event.globalPos())
-        row = self.table_widget.rowAt(tablePos.y())
-
-        # Add 'Delete Row' action if the click is on a valid row
-        deleteAction = None
-        if row >= 0:
-            # Optionally select the row that was right-clicked
-            self.table_widget.selectRow(row)
-
-            deleteAction = contextMenu.addAction("Remove Selected")
-
-        # Add 'Remove All' action
-        removeAllAction = contextMenu.addAction("Remove All")
-
-        action = contextMenu.exec_(event.globalPos())
-
-        if action == deleteAction and deleteAction is not None:
-            self.delete_row(row)
-        elif action == removeAllAction:
-            self.remove_all_rows()
-
-    def delete_row(self, row):
-        # Confirm before deleting
-        reply = QMessageBox.question(self, 'Remove Selected', 'Are you sure you want to delete this row?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if reply == QMessageBox.Yes:
-            self.table_widget.removeRow(row)
-
-    def remove_all_rows(self):
-        # Confirm before removing all rows
-        reply = QMessageBox.question(self, 'Remove All Rows', 'Are you sure you want to remove all rows?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if reply == QMessageBox.Yes:
-            self.table_widget.setRowCount(0)
-
-    def toggle_theme(self):
-        if self.is_dark_mode:
-            self.setStyleSheet(LIGHT_STYLE)
-            self.is_dark_mode = False
-        else:
-            self.setStyleSheet(DARK_STYLE)
-            self.is_dark_mode = True
-
-    def reset_ui(self):
-       
-        self.input_button.setEnabled(True)
-        self.output_button.setEnabled(True)
-        self.output_textbox.setEnabled(True)
-        self.preset_combobox.setEnabled(True)
-        self.bitrate_combobox.setEnabled(True)
-        self.hwaccel_combobox.setEnabled(True)
-        self.Simultaneous_Encodes_combobox.setEnabled(True)
-        self.encode_button.setEnabled(True)
-        self.cancel_button.setEnabled(True)
-
-    def init_ui(self):
-
-        self.input_folder = ''
-        self.settings = QSettings("MyCompany", "VideoEncoder")
-        self.input_folder = self.settings.value("input_folder", "")
-        self.output_folder = self.settings.value("output_folder", "")
-        main_widget = QWidget(self)
-        self.setCentralWidget(main_widget)
-        layout = QVBoxLayout(main_widget)
-        self.tab_widget = QTabWidget()
-        layout.addWidget(self.tab_widget)
-        # Set tab position to top (optional, in case it was changed elsewhere)
-        self.tab_widget.setTabPosition(QTabWidget.North)
-        self.tab1 = QWidget()
-        self.tab2 = QWidget()
-        self.tab_widget.addTab(self.tab1, "Encoder")
-        self.tab_widget.addTab(self.tab2, "Console")
-        self.init_tab1_ui()
-        self.init_tab2_ui()
-        #Create the menu bar and menus as instance variables
-        self.menubar = self.menuBar()
-        self.file_menu = self.menubar.addMenu("File")
-        self.help_menu = self.menubar.addMenu("Help")
-        # Create actions for the menu items as instance variables
-        self.theme_action = QAction("Toggle Dark/Light Mode", self)
-        self.theme_action.triggered.connect(self.toggle_theme)
-        self.file_menu.addAction(self.theme_action)
-        self.open_action = QAction("Open", self)
-        self.open_action.triggered.connect(self.select_input_files)
-        self.file_menu.addAction(self.open_action)
-        self.exit_action = QAction("Exit", self)
-        self.exit_action.triggered.connect(self.close)
-        self.file_menu.addAction(self.exit_action)
-        self.about_action = QAction("About", self)
-        self.about_action.triggered.connect(self.show_about_dialog)
-        self.help_menu.addAction(self.about_action)
-
-    def init_tab1_ui(self):
-        layout = QVBoxLayout(self.tab1)
-    
-        input_group = QGroupBox("Input", self.tab1)
-        form_layout = QFormLayout(input_group)
-
-        self.input_button = QPushButton("Select Files", self.tab1)
-        form_layout.addRow("Files:", self.input_button)
-        self.table_widget = QTableWidget(self.tab1)
-        self.table_widget.setColumnCount(5)  
-        self.table_widget.setHorizontalHeaderLabels(["Input File", "Elapsed Time", "FPS", "Time Remaining", "Status"])
-        output_group = QGroupBox("Output", self.tab1)
-        form_layout = QFormLayout(output_group)
-        self.output_textbox = QLineEdit(self.tab1)
-        self.output_button = QPushButton("Select Folder", self.tab1)
-        form_layout.addRow("Folder:", self.output_textbox)
-        form_layout.addRow("", self.output_button)
-        settings_group = QGroupBox("Settings", self.tab1)
-        grid_layout = QGridLayout(settings_group)
-        self.Simultaneous_Encodes_combobox = QComboBox(self.tab1)
-        self.bitrate_combobox = QComboBox(self.tab1)
-        self.preset_combobox = QComboBox(self.tab1)
-        self.format_combobox = QComboBox(self.tab1)
-        self.format_combobox.addItems(["mp4", "mkv"])
-        self.hwaccel_combobox = QComboBox(self.tab1)
-        self.hwaccel_combobox.addItems(["Nvidia_Cuda_h264", "Nvidia_Cuvid_h264","Nvidia_cuda_265","Nvidia_Cuvid_265"])
-        grid_layout.addWidget(QLabel("Simultaneous Encodes:"), 0, 0)
-        grid_layout.addWidget(self.Simultaneous_Encodes_combobox, 0, 1)
-        grid_layout.addWidget(QLabel("Bitrate:"), 1, 2)
-        grid_layout.addWidget(self.bitrate_combobox, 1 ,3)
-        grid_layout.addWidget(QLabel("Preset:"), 1, 0)
-        grid_layout.addWidget(self.preset_combobox, 1, 1)
-        grid_layout.addWidget(QLabel("Format:"), 3,0)
-        grid_layout.addWidget(self.format_combobox,3,1)
-    
-        grid_layout.addWidget(QLabel("Hardware Acceleration:"), 4, 0)
-        grid_layout.addWidget(self.hwaccel_combobox, 4, 1)
-        self.encode_button = QPushButton("Encode Videos", self.tab1)
-        self.cancel_button = QPushButton("Cancel Encode", self.tab1)
-        button_layout = QHBoxLayout()
-        button_layout.addWidget(self.encode_button)
-        button_layout.addWidget(self.cancel_button)
-        layout.addWidget(input_group)
-        layout.addWidget(self.table_widget)
-        layout.addWidget(output_group)
-        layout.addWidget(settings_group)
-        layout.addLayout(button_layout)
-
-        # New Bitrate Mode Combobox
-        self.bitrate_mode_combobox = QComboBox(self.tab1)
-        self.bitrate_mode_combobox.addItems(["CBR", "VBR"])
-        grid_layout.addWidget(QLabel("Bitrate Mode:"), 0, 2)
-        grid_layout.addWidget(self.bitrate_mode_combobox, 0, 3)
-        self.bitrate_mode_combobox.currentIndexChanged.connect(self.on_bitrate_mode_change)
-
-
-        # Min Bitrate Editable Combobox
-        self.min_bitrate_combobox = QComboBox(self.tab1)
-        self.min_bitrate_combobox.setEditable(True)
-        grid_layout.addWidget(QLabel("Min Bitrate (M):"), 3, 2)
-        grid_layout.addWidget(self.min_bitrate_combobox, 3, 3)
-
-        # Max Bitrate Editable Combobox
-        self.max_bitrate_combobox = QComboBox(self.tab1)
-        self.max_bitrate_combobox.setEditable(True)
-        grid_layout.addWidget(QLabel("Max Bitrate (M):"), 4, 2)
-        grid_layout.addWidget(self.max_bitrate_combobox, 4, 3)
-
-        self.bitrate_combobox.addItems(bitrate_num)
-        self.min_bitrate_combobox.addItems(bitrate_num)
-        self.max_bitrate_combobox.addItems(bitrate_num)
-
-
-        self.preset_combobox.addItems(sel_preset)
-        self.Simultaneous_Encodes_combobox.addItems(num_encodes)
-        # Read previous settings using QSettings
-        self.settings = QSettings("MyCompany", "VideoEncoder")
-        previous_bitrate = self.settings.value("bitrate", "1M")
-        previous_bitrate_mode = self.settings.value("bitrate_mode", "CBR")
-        previous_min_bitrate = self.settings.value("min_bitrate", "1M")
-        previous_max_bitrate = self.settings.value("max_bitrate", "2M")
-        previous_preset = self.settings.value("preset", "medium")
-        previous_simultaneous_encodes = self.settings.value("simultaneous_encodes", "1")
-        previous_hwaccel_index = int(self.settings.value("hwaccel_index", "0"))
-        previous_output_folder = self.settings.value("output_folder", "")
-        # Create and set default values for comboboxes
-        self.bitrate_combobox.setCurrentText(previous_bitrate)
-        self.bitrate_mode_combobox.setCurrentText(previous_bitrate_mode)
-        self.min_bitrate_combobox.setCurrentText(previous_min_bitrate)
-        self.max_bitrate_combobox.setCurrentText(previous_max_bitrate)
-
-        self.preset_combobox.setCurrentText(previous_preset)
-        self.Simultaneous_Encodes_combobox.setCurrentText(previous_simultaneous_encodes)
-        self.hwaccel_combobox.setCurrentIndex(previous_hwaccel_index)
-        self.output_textbox.setText(previous_output_folder)
-        self.input_button.clicked.connect(self.select_input_files)
-        self.output_button.clicked.connect(self.select_output_folder)
-        self.encode_button.clicked.connect(self.encode_videos)
-        self.start_time = None
-        self.total_video_duration = 0
-        self.simultaneous_encodes = 0
-        self.fps_queue = []
-        self.frame_count_queue = []
-        self.current_fps = 25
-        self.timer = QtCore.QTimer(self)
-        self.cancel_button.setEnabled(False)  # Initially disable the cancel button
-
-        
-
-
-    def init_tab2_ui(self):
-        layout = QVBoxLayout(self.tab2)
-        label2 = QLabel("Console", self.tab2)
-        layout.addWidget(label2)
-        # Adding a QPlainTextEdit that expands to fill the available space in Tab 2
-        self.line_edit_tab2 = QPlainTextEdit(self.tab2)  # Use QPlainTextEdit instead of QLineEdit
-        size_policy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.line_edit_tab2.setSizePolicy(size_policy)
-        layout.addWidget(self.line_edit_tab2)
-
-    @QtCore.pyqtSlot(str)
-    def update_console_output(self, line):
-        self.line_edit_tab2.appendPlainText(line)  # Use appendPlainText to add new lines
-
-
-    def show_about_dialog(self):
-        about_text = (
-            "Simple Video Encoder/Converter for Nvidia GPUs\n"
-
-            "Tested on Nvidia 3060, 3070, 4090\n\n"
-
-            "Note: This application is a work in progress, and not all functions work correctly.\n\n"
-
-            "Version: 4.0\n\n"
-
-            "Key Features:\n"
-
-            "GUI Interface for easy interaction\n"
-
-            "Hardware Acceleration for faster encoding (Cuvid, Cuda)\n"
-
-            "Concurrent Video Encoding for improved efficiency\n"
-
-            "Live Encoding Progress display with Elapsed Time, FPS, and Time Remaining\n"
-
-            "Customizable encoding settings (bitrate, preset, h264, hevc 265)\n\n"
-
-            "ffmpeg commands are:\n\n"
-
-            "Nvidia Cuda\n"
-            "ffmpeg -y -hwaccel cuda -i input_video -c:v h264_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
-
-            "Nvidia cuvid\n"
-            "ffmpeg -y -hwaccel cuvid -i input_video -c:v h264_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
-
-            "Nvidia Cuda\n"
-            "ffmpeg -y -hwaccel cuda -i input_video -c:v hevc_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
-
-            "Nvidia cuvid\n"
-            "ffmpeg -y -hwaccel cuvid -i input_video -c:v hevc_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
-        )
-
-        # Create a QMessageBox and set the style sheet to customize the font color
-        about_box = QMessageBox(self)
-        about_box.setWindowTitle("About Bulk Video Encoder")
-        about_box.setText(about_text)
-
-        # Show the "About" dialog
-        about_box.exec_()
-
-    def on_bitrate_mode_change(self, index):
-        # Disable bitrate_combobox if "CBR" is selected
-        is_cbr_selected = self.bitrate_mode_combobox.currentText() == "CBR"
-        self.min_bitrate_combobox.setDisabled(is_cbr_selected)
-        self.max_bitrate_combobox.setDisabled(is_cbr_selected)
-
-        is_vbr_or_pvbr_selected = self.bitrate_mode_combobox.currentText() in ("VBR", "PVBR")
-        self.bitrate_combobox.setDisabled(is_vbr_or_pvbr_selected)
-
-    def select_input_files(self):
-        file_names, _ = QFileDialog.getOpenFileNames(self, "Select Files", self.input_folder, "Video Files (*.mp4;*.mkv;*.avi;*.mov;*.wmv;*.flv;*.webm;*.mpeg;*.mpg;*.m4v;*.ts)")
-        if file_names:
-            self.input_folder = os.path.dirname(file_names[0])
-            self.settings.setValue("input_folder", self.input_folder)
-            current_row_count = self.table_widget.rowCount()
-            new_row_count = current_row_count + len(file_names)
-            self.table_widget.setRowCount(new_row_count)
-
-            for i, file_name in enumerate(file_names, start=current_row_count):
-                item = QTableWidgetItem(file_name)
-                self.table_widget.setItem(i, 0, item)
-                elapsed_time_item = QTableWidgetItem("--:--:--")
-                self.table_widget.setItem(i, 1, elapsed_time_item)
-                fps_item = QTableWidgetItem("--")
-                self.table_widget.setItem(i, 2, fps_item)
-
-            self.table_widget.resizeColumnsToContents()
-            # Calculate the total width needed for all columns
-            total_width = self.table_widget.verticalHeader().width()
-            total_width += self.table_widget.horizontalScrollBar().height()
-            for i in range(self.table_widget.columnCount()):
-                total_width += self.table_widget.columnWidth(i)
-                
-
-    def select_output_folder(self):
-        folder_name = QFileDialog.getExistingDirectory(self, "Select Folder", self.output_folder)
-        if folder_name:
-            self.output_textbox.setText(folder_name)
-            self.output_folder = folder_name
-            self.settings.setValue("output_folder", self.output_folder)
-
-    def get_file_size(file_path):
-        size_bytes = os.path.getsize(file_path)
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.2f}{unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.2f}TB"
-
-    def encode_videos(self,row):
-        self.frame_count = 0
-        input_files = []
-        self.elapsed_time = 0
-        self.elapsed_timer = QtCore.QTimer(self)
-        self.elapsed_timer.timeout.connect(self.update_elapsed_time)
-        self.elapsed_timer.start(1000)
-        #self.status_label.setText("Encoding")
-        # Store current settings in QSettings
-        self.settings.setValue("bitrate", self.bitrate_combobox.currentText())
-        self.settings.setValue("bitrate_mode", self.bitrate_mode_combobox.currentText())
-        self.settings.setValue("min_bitrate", self.min_bitrate_combobox.currentText())
-        self.settings.setValue("max_bitrate", self.max_bitrate_combobox.currentText())
-
-        self.settings.setValue("preset", self.preset_combobox.currentText())
-        self.settings.setValue("simultaneous_encodes", self.Simultaneous_Encodes_combobox.currentText())
-        self.settings.setValue("hwaccel_index", self.hwaccel_combobox.currentIndex())
-        self.settings.setValue("output_folder", self.output_textbox.text())
-
-        self.table_widget.setItem(row, 4, QTableWidgetItem(""))
-
-
-        for row in range(self.table_widget.rowCount()):
-            input_files.append(self.table_widget.item(row, 0).text())
-
-        output_folder = self.output_textbox.text()
-        preset = self.preset_combobox.currentText()
-        bitrate = self.bitrate_combobox.currentText()
-        self.simultaneous_encodes = int(self.Simultaneous_Encodes_combobox.currentText())
-        self.bitrate_mode_combobox
-        self.min_bitrate_combobox.currentText()
-        self.max_bitrate_combobox.currentText()
-        selected_format = self.format_combobox.currentText()
-
-
-        self.input_button.setEnabled(False)
-        self.output_button.setEnabled(False)
-        self.output_textbox.setEnabled(False)
-        self.preset_combobox.setEnabled(False)
-        self.bitrate_combobox.setEnabled(False)      
-        self.hwaccel_combobox.setEnabled(False)
-        self.cancel_button.setEnabled(True)
-        self.Simultaneous_Encodes_combobox.setEnabled(False)
-        self.encode_button.setEnabled(False)
-        self.fps_queue.clear()
-        self.frame_count_queue.clear()
-        self.encoding_thread = VideoEncoderThread(input_files, output_folder, preset, bitrate, self.simultaneous_encodes, self.hwaccel_combobox.currentIndex(), self.bitrate_mode_combobox, self.min_bitrate_combobox, self.max_bitrate_combobox, self.format_combobox)
-        self.encoding_thread.fps_updated.connect(self.update_fps_for_row)  # Connect to update_fps_for_row
-        self.encoding_thread.encoding_canceled.connect(self.encoding_canceled_handler)
-        self.cancel_button.clicked.connect(self.cancel_encoding_thread)
-        self.encoding_thread.encoding_complete.connect(self.encoding_complete)  # Connect the signal to the slot
-        self.encoding_thread.encoding_progress_updated.connect(self.update_encoding_progress)
-        self.encoding_thread.encoding_completed.connect(self.encoding_completed_handler)
-        self.encoding_thread.console_output_updated.connect(self.update_console_output)
-        self.encoding_thread.start()
-        self.start_time = time.time()
-
-    def update_encoding_progress(self, row, status):
-        self.table_widget.setItem(row, 4, QTableWidgetItem(status))
-        
-    def update_elapsed_time(self):
-        self.elapsed_time += 1
-        self.timer.start(500)
-        hours = self.elapsed_time // 3600
-        minutes = (self.elapsed_time % 3600) // 60
-        seconds = self.elapsed_time % 60
-        
-        # update elapsed time in table
-        for row in range(self.table_widget.rowCount()):
-            if self.encoding_thread.started_encoding[row] and not self.encoding_thread.finished_encoding[row]:
-          
-                item = self.table_widget.item(row, 1)
-                elapsed_time = item.data(QtCore.Qt.UserRole)
-                if elapsed_time is None:
-                    elapsed_time = 0
-                elapsed_time += 1
-                item.setText(f"{elapsed_time // 3600:02d}:{(elapsed_time % 3600) // 60:02d}:{elapsed_time % 60:02d}")
-                item.setData(QtCore.Qt.UserRole, elapsed_time)
-            
-    @QtCore.pyqtSlot(int, float)  # Updated slot signature to accept both int and float
-    def update_frame_and_fps_for_row(self, row, value):
-        # Use the 'value' parameter to determine whether it's FPS or frame count update
-        if isinstance(value, int):
-            # Update the frame count for the corresponding row in the table widget
-            item = self.table_widget.item(row, 1)
-            item.setText(str(value))
-        elif isinstance(value, float):
-            # Update the FPS for the corresponding row in the table widget
-            item = self.table_widget.item(row, 2)
-            item.setText(str(value))
-
-    @QtCore.pyqtSlot(int, float)
-    def update_fps_for_row(self, row, fps):
-        # Update the FPS for the corresponding row in the table widget
-        fps_item = self.table_widget.item(row, 2)
-        if fps_item is None:
-            return  # Exit the method if the item does not exist
-
-        fps_item.setText(f"{fps:.2f}")  # Keep FPS in float for more precision
-
-        # Calculate remaining time
-        total_frames = self.get_total_frames(row)
-        
-        # Access the processed_frames from the encoding_thread instance
-        processed_frames = self.encoding_thread.get_processed_frames(row)  
-
-        if total_frames and fps != 0:  # Make sure fps is not zero before performing the division
-            remaining_frames = total_frames - processed_frames
-            remaining_time = remaining_frames / fps
-
-            # Update the remaining time in the table widget
-            time_item = self.table_widget.item(row, 3)
-            if time_item is None:
-                time_item = QTableWidgetItem()
-                self.table_widget.setItem(row, 3, time_item)
-
-            # Format and set the remaining time
-            hours, minutes, seconds = int(remaining_time // 3600), int((remaining_time % 3600) // 60), int(remaining_time % 60)
-            time_item.setText(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-        self.table_widget.resizeColumnsToContents()
-
-
-    def get_total_frames(self, row):
-        # Get the total number of frames in the video using FFprobe
-        input_file = self.table_widget.item(row, 0).text()
-        duration = get_video_duration(input_file)
-        if duration is not None:
-            fps = self.current_fps
-            return int(duration * fps)
-        return None
-
-    def cancel_encoding_thread(self,row):
-        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
-            self.encoding_thread.cancel_encoding()
-            self.encoding_thread.terminate()  # Terminate the thread immediately without waiting
-            self.elapsed_timer.stop()
-            self.input_button.setEnabled(True)
-            self.output_button.setEnabled(True)
-            self.output_textbox.setEnabled(True)
-            self.preset_combobox.setEnabled(True)
-            self.bitrate_combobox.setEnabled(True)      
-            self.Simultaneous_Encodes_combobox.setEnabled(True)
-            self.encode_button.setEnabled(True)
-            self.cancel_button.setEnabled(False)
-            self.reset_ui()
-            #self.status_label.setText("Encoding canceled")
-            for row in range(self.table_widget.rowCount()):
-                self.table_widget.setItem(row, 1, QTableWidgetItem("--:--:--"))  # Reset elapsed time (assuming it's column 1)
-                self.table_widget.setItem(row, 3, QTableWidgetItem("--:--:--"))  # Reset time remaining (assuming it's column 3)
-
-    @QtCore.pyqtSlot(int)
-    def encoding_completed_handler(self, row):
-        # Update column 5 for the corresponding row to "Done" when an encoding is completed
-        self.table_widget.setItem(row, 4, QTableWidgetItem("Done"))
-        self.encoding_thread.finished_encoding[row] = True
-        self.reset_ui()
-
-    @QtCore.pyqtSlot()
-    def encoding_canceled_handler(self):
-        self.cancel_button.setEnabled(False)
-        self.encode_button.setEnabled(True)
-
-        #self.status_label.setText("Encoding canceled")
-        self.reset_ui()
-
-    def encoding_complete(self):
-        self.elapsed_timer.stop()
-        self.timer.stop()
-        self.input_button.setEnabled(True)
-        self.output_button.setEnabled(True)
-        self.output_textbox.setEnabled(True)
-        self.preset_combobox.setEnabled(True)
-        self.bitrate_combobox.setEnabled(True)
-        self.Simultaneous_Encodes_combobox.setEnabled(True)
-        self.encode_button.setEnabled(True)
-        self.cancel_button.setEnabled(False)
-        self.reset_ui()
-        
-        # Cleanup the encoding thread
-        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
-            self.encoding_thread.wait()  # Wait for the encoding thread to finish
-
-    def closeEvent(self, event):
-        # Check if the encoding thread is running and cancel it
-        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
-            self.encoding_thread.cancel_encoding()
-            self.encoding_thread.wait()  # Wait for the encoding thread to finish
-
-        # Call the default close event to allow the application to exit
-        super().closeEvent(event)
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = VideoEncoder()
-    window.show()
-    sys.exit(app.exec_())
+import sys
+import os
+import logging
+from PyQt5 import QtCore
+from PyQt5.QtCore import QThread
+from PyQt5.QtCore import QSettings
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QLabel, QTableView, QPushButton, QComboBox, QLabel, \
+    QWidget, QGridLayout, QHBoxLayout, QVBoxLayout, QFormLayout, QLineEdit, QTabWidget,QSizePolicy,QPlainTextEdit,QGroupBox,QAction,QMessageBox,QMenu,QProgressDialog,QCheckBox
+import threading
+from collections import deque
+from bulk_encoder.core import (BatchEncoder, EncodeSettings, QUEUED, RUNNING, PAUSED, RESUMING, DONE, FAILED,
+                               CANCELED, SKIPPED, bitrate_num, bitrate_modes, crf_values, num_encodes, segment_thresholds)
+from bulk_encoder.profiles import GENERIC_PRESETS, get_profile, profile_names
+from bulk_encoder.backends import best_profile, describe_ranking, rank_backends, untested_ranking
+from bulk_encoder.concurrency import AUTO, is_auto
+from bulk_encoder.probe import ProbePool
+from bulk_encoder.metrics import write_report
+from bulk_encoder.ladder import parse_ladder
+from bulk_encoder.resources import PLAN_OFF, PLAN_PIN
+from bulk_encoder.scan import VIDEO_PATTERNS, find_videos_chunked, path_key
+from bulk_encoder.tools import discover_tools
+
+LIGHT_STYLE = ("""
+    QMainWindow {
+        background-color: #f0f0f0;
+    }
+    QTabWidget::pane {
+        border: none;
+    }
+    QTabBar {
+        background-color: #333;
+        color: white;
+        height: 30px;
+    }
+    QTabBar::tab:selected {
+        background-color: #555;
+    }
+    QTabBar::tab:!selected {
+        background-color: #444;
+    }
+    QPushButton {
+        border-radius: 15px;
+        background-color: #007BFF;
+        color: white;
+        border: none;
+        padding: 8px 15px;
+    }
+    QPushButton:hover {
+        background-color: #0056b3;
+    }
+    QLineEdit, QComboBox, QTableView, QPlainTextEdit {
+        background-color: white;
+        border: 1px solid #ccc;
+        padding: 5px;
+    }
+    QMessageBox {
+        background-color: #f0f0f0;
+        color: #000000;
+    }
+    QMessageBox QPushButton {
+        background-color: #e0e0e0;
+        color: black;
+        border: 1px solid #cccccc;
+    }
+    QComboBox {
+        border-radius: 10px;
+    }
+""")
+
+DARK_STYLE = ("""
+    QMainWindow {
+        background-color: #212121;
+    }
+    QTabWidget::pane {
+        border: none;
+    }
+    QTabBar {
+        background-color: #121212;
+        color: #ffffff;
+    }
+    QTabBar::tab:selected {
+        background-color: #424242;
+    }
+    QTabBar::tab:!selected {
+        background-color: #1c1c1c;
+    }
+    QPushButton {
+        border-radius: 15px;
+        background-color: #0056b3;
+        color: white;
+        border: none;
+        padding: 8px 15px;
+    }
+    QPushButton:hover {
+        background-color: #474747;
+    }
+    QLineEdit, QComboBox, QPlainTextEdit {
+        background-color: #1e1e1e;
+        color: #ffffff;
+        border: 1px solid #333333;
+    }
+    QComboBox {
+        border-radius: 10px;
+        padding: 6px 12px;
+    }
+    QTableView {
+        background-color: #1e1e1e;
+        color: #ffffff;
+    }
+    QTableView QHeaderView::section {
+        background-color: #333333;
+        color: #ffffff;
+    }
+    QLabel ,QGroupBox{
+        color: #ffffff;
+    }
+    QMessageBox {
+        background-color: #212121;
+        color: #ffffff;
+    }
+    QMessageBox QPushButton {
+        background-color: #333333;
+        color: white;
+        border: 1px solid #444444;
+    }
+""")
+
+CONSOLE_MAX_LINES = 5000  # Lines kept in the console tab; full output is in the per-job log files
+CONSOLE_FLUSH_MS = 200
+SCAN_CHUNKS_IN_FLIGHT = 2
+
+
+class VideoEncoderThread(QThread):
+    encoding_canceled = QtCore.pyqtSignal()
+    encoding_complete = QtCore.pyqtSignal()
+    encoding_completed = QtCore.pyqtSignal(int)
+    batch_planned = QtCore.pyqtSignal(str)
+    concurrency_changed = QtCore.pyqtSignal(str)
+    job_started = QtCore.pyqtSignal(int)
+
+    def __init__(self, input_files, settings, backend_ranking=None):
+        super().__init__()
+        # The encoding itself lives in bulk_encoder so it can also run headless
+        self.encoder = BatchEncoder(input_files, settings, backend_ranking=backend_ranking)
+        self.encoder.on_progress = None  # Progress is read from the shared Job objects by JobTableModel
+        self.encoder.on_output = self.buffer_console_line
+        self.encoder.on_job_finished = self.job_finished
+        self.encoder.on_job_started = lambda job: self.job_started.emit(job.index)
+        self.encoder.on_batch_planned = lambda plan: self.batch_planned.emit(plan.describe())
+        self.encoder.on_concurrency_changed = lambda controller: self.concurrency_changed.emit(controller.describe())
+        # Console lines wait here until the GUI collects them on a timer, instead of one signal per line
+        self.console_lines = deque(maxlen=CONSOLE_MAX_LINES)
+        self.console_lock = threading.Lock()
+
+    @property
+    def jobs(self):
+        return self.encoder.jobs
+
+    def buffer_console_line(self, job, line):
+        with self.console_lock:
+            self.console_lines.append((job.index, line))
+
+    def take_console_lines(self):
+        with self.console_lock:
+            lines = list(self.console_lines)
+            self.console_lines.clear()
+        return lines
+
+    def run(self):
+        self.encoder.run()
+        self.encoding_complete.emit()
+
+    def job_finished(self, job):
+        if job.state == CANCELED and self.encoder.is_canceled:
+            self.encoding_canceled.emit()
+        else:
+            self.encoding_completed.emit(job.index)  # The job's number; its row moves when rows above are removed
+
+    def cancel_encoding(self):
+        self.encoder.cancel()
+
+
+class ProbeNotifier(QtCore.QObject):
+    # Carries probe results from the probe pool threads to the GUI thread
+    probed = QtCore.pyqtSignal(str, object)
+
+
+class ToolsNotifier(QtCore.QObject):
+    # Carries the result of the background ffmpeg/ffprobe discovery to the GUI thread
+    discovered = QtCore.pyqtSignal(object)
+    # ... and of the encoder tests that follow it (see bulk_encoder.backends)
+    ranked = QtCore.pyqtSignal(object)
+
+
+class ScanNotifier(QtCore.QObject):
+    # Carries the files a folder scan finds, a chunk at a time, to the GUI thread
+    found = QtCore.pyqtSignal(object, object)  # paths, the scan's stop event
+    finished = QtCore.pyqtSignal(str)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+class JobRow:
+    """One row of the job table: the input file, its probe data and, once encoding, its Job."""
+
+    __slots__ = ("path", "key", "probe", "probed", "job")
+
+    def __init__(self, path):
+        self.path = path
+        self.key = path_key(path)
+        self.probe = None
+        self.probed = False
+        self.job = None
+
+
+class JobTableModel(QtCore.QAbstractTableModel):
+    """Job table backed by the encoder's Job objects.
+
+    Worker threads only mark rows dirty; a single GUI timer turns the dirty
+    rows into dataChanged signals a few times per second, so the cost of
+    repainting does not grow with the number of ffmpeg progress lines.
+    Rows are found through an index keyed by path, and the timer only looks
+    at the rows that are encoding, so a table of 100k files costs no more
+    per tick than one of ten.
+    """
+
+    COLUMNS = ["Input File", "Elapsed Time", "FPS", "Time Remaining", "Status",
+               "Duration", "Resolution", "Codec", "Frames"]
+    REFRESH_INTERVAL_MS = 250
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._index = {}  # path_key -> row number; also what keeps a file from being added twice
+        self._live = set()  # JobRows whose encode has started and may still tick
+        self._dirty = set()
+        self._all_dirty = False
+        self._dirty_lock = threading.Lock()
+        self.queue_visible = False  # Queued (#n) positions shown in the Status column while a batch runs
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.timeout.connect(self.flush)
+        self.refresh_timer.start(self.REFRESH_INTERVAL_MS)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        job = row.job
+        if column == 0:
+            return row.path
+        if column == 1:
+            return format_duration(job.elapsed) if job and job.start_time else "--:--:--"
+        if column == 2:
+            return f"{job.fps:.2f}" if job and job.state == RUNNING else "--"
+        if column == 3:
+            eta = job.eta if job and job.state == RUNNING else None
+            return format_duration(eta) if eta is not None else "--:--:--"
+        if column == 4:
+            return self.status_text(job)
+        if not row.probed:
+            return "..."
+        info = row.probe
+        if not info:
+            return "--"
+        if column == 5:
+            return format_duration(info["duration"])
+        if column == 6:
+            return f"{info['width']}x{info['height']}"
+        if column == 7:
+            return info["video_codec"]
+        return str(info["frames"])
+
+    @staticmethod
+    def status_text(job):
+        if job is None:
+            return ""
+        if job.state == RUNNING:
+            return f"{job.progress:.0%} ({job.speed:.2f}x)"
+        if job.state == DONE and job.remux:
+            return "Remuxed"
+        if job.state == DONE and job.failed_profiles:
+            return f"Done on {job.profile}"
+        if job.state == PAUSED:
+            return "Paused" if job.queue_position is None else f"Held (#{job.queue_position})"
+        if job.state == RESUMING:
+            return "Resuming"
+        if job.state == QUEUED and job.queue_position is not None:
+            return f"Queued (#{job.queue_position})"
+        return {QUEUED: "Queued", DONE: "Done", FAILED: "Failed", CANCELED: "Canceled",
+                SKIPPED: "Skipped"}.get(job.state, "")
+
+    def add_files(self, paths):
+        """Append rows for the paths not in the table yet; returns (number of the first new row, paths added)."""
+        first = len(self._rows)
+        new_rows = []
+        for path in paths:
+            row = JobRow(path)
+            if row.key not in self._index:
+                self._index[row.key] = first + len(new_rows)
+                new_rows.append(row)
+        if new_rows:
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new_rows) - 1)
+            self._rows.extend(new_rows)
+            self.endInsertRows()
+        return first, [row.path for row in new_rows]
+
+    def remove_rows(self, rows):
+        """Remove the given row numbers, one contiguous run at a time.
+
+        Only the index entries below the first removed row are renumbered,
+        and only once, however many rows go.
+        """
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        runs = []  # [first, last] of each contiguous run, top to bottom
+        for row in rows:
+            if runs and row == runs[-1][1] + 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+        for first, last in reversed(runs):  # bottom up, so the row numbers of the runs above stay valid
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            for job_row in self._rows[first:last + 1]:
+                self._live.discard(job_row)
+                del self._index[job_row.key]
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        for row in range(rows[0], len(self._rows)):
+            self._index[self._rows[row].key] = row
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._index = {}
+        self._live = set()
+        self.endResetModel()
+
+    def paths(self):
+        return [row.path for row in self._rows]
+
+    def row_for_path(self, path):
+        return self._index.get(path_key(path))
+
+    def row_for_job(self, job):
+        row = self.row_for_path(job.input_file)
+        return row if row is not None and self._rows[row].job is job else None
+
+    def mark_job_dirty(self, job):
+        row = self.row_for_job(job)
+        if row is not None:
+            self.mark_dirty(row)
+
+    def mark_started(self, job):
+        """From now on refresh the job's row on every tick, until it stops running."""
+        row = self.row_for_job(job)
+        if row is not None:
+            self._live.add(self._rows[row])
+
+    def job_at(self, row):
+        return self._rows[row].job
+
+    def attach_jobs(self, jobs, first_row=0):
+        """Link rows, from first_row on, to the Jobs encoding them (jobs are created in row order)."""
+        for row, job in enumerate(jobs, first_row):
+            self._rows[row].job = job
+        self.mark_all_dirty()
+
+    def set_probe(self, path, info):
+        row = self.row_for_path(path)
+        if row is not None:
+            self._rows[row].probe = info
+            self._rows[row].probed = True
+            self.mark_dirty(row)
+
+    def mark_dirty(self, row):
+        # Safe to call from worker threads
+        with self._dirty_lock:
+            self._dirty.add(row)
+
+    def mark_all_dirty(self):
+        with self._dirty_lock:
+            self._all_dirty = True
+
+    def flush(self):
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+            all_dirty, self._all_dirty = self._all_dirty, False
+        if not self._rows:
+            return
+        last_column = len(self.COLUMNS) - 1
+        if all_dirty:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, last_column))
+            return
+        # Elapsed time ticks for every running job; a row gets one last refresh after its encode stops
+        for job_row in list(self._live):
+            row = self._index.get(job_row.key)
+            if row is not None:
+                dirty.add(row)
+            if job_row.job is None or job_row.job.state not in (RUNNING, PAUSED, RESUMING):
+                self._live.discard(job_row)
+        for row in sorted(dirty):
+            if row < len(self._rows):
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+        # Queue positions move whenever a job starts or is moved: one signal for the whole Status column
+        if self.queue_visible:
+            status = self.COLUMNS.index("Status")
+            self.dataChanged.emit(self.index(0, status), self.index(len(self._rows) - 1, status))
+
+
+class VideoEncoder(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        
+        self.is_dark_mode = True  # Start with dark mode enabled
+        self.setStyleSheet(DARK_STYLE)  
+
+        self.setWindowTitle("Video Encoder")
+        self.setGeometry(100, 100, 1000, 800)
+
+        self.init_ui()
+        # Find ffmpeg after the window is up; warm starts answer from the tools cache without running it
+        self.tools = None
+        self.backend_ranking = None
+        self.tools_notifier = ToolsNotifier(self)
+        self.tools_notifier.discovered.connect(self.tools_discovered)
+        self.tools_notifier.ranked.connect(self.backends_ranked)
+        self.start_tool_discovery()
+
+    def start_tool_discovery(self, refresh=False):
+        threading.Thread(target=lambda: self.tools_notifier.discovered.emit(discover_tools(refresh=refresh)),
+                         name="discover-tools", daemon=True).start()
+
+    @QtCore.pyqtSlot(object)
+    def tools_discovered(self, tools):
+        self.tools = tools
+        if tools.found:
+            print("FFmpeg is already installed.")
+            self.statusBar().showMessage(tools.version.split(" Copyright")[0], 5000)
+            # A few seconds of test encodes the first time, then answered from the cache for a week
+            threading.Thread(target=lambda: self.tools_notifier.ranked.emit(rank_backends(tools)),
+                             name="rank-backends", daemon=True).start()
+        else:
+            print("FFmpeg is not installed.")
+            self.check_and_install_ffmpeg()
+
+    @QtCore.pyqtSlot(object)
+    def backends_ranked(self, ranking):
+        self.backend_ranking = ranking
+        if self.is_encoding():
+            self.encoding_thread.encoder.backend_ranking = ranking  # started before the tests were in
+        print(f"Encoders: {describe_ranking(ranking)}")
+        tests = {test.profile: test for test in ranking}
+        model = self.hwaccel_combobox.model()
+        for i, name in enumerate(profile_names()):
+            test = tests.get(name)
+            usable = test is not None and test.works is not False
+            model.item(i).setEnabled(usable)
+            description = get_profile(name).description
+            status = test.describe() if test is not None else f"{name}: not in this ffmpeg build"
+            self.hwaccel_combobox.setItemData(i, f"{description}\n{status}", QtCore.Qt.ToolTipRole)
+        auto_index = self.hwaccel_combobox.findText(AUTO, QtCore.Qt.MatchFixedString)  # any case
+        best = best_profile(ranking)
+        self.hwaccel_combobox.setItemData(auto_index, f"Fastest encoder that works here: {best or 'none'}",
+                                          QtCore.Qt.ToolTipRole)
+        current = tests.get(self.hwaccel_combobox.currentText())
+        if self.hwaccel_combobox.currentIndex() != auto_index and (current is None or current.works is False):
+            self.hwaccel_combobox.setCurrentIndex(auto_index)
+            self.statusBar().showMessage(f"The selected encoder does not work on this computer; using {best}", 10000)
+
+    def download_and_install_ffmpeg(self):
+        # Only needed on a first run without ffmpeg, so not imported at startup
+        import urllib.request
+        import zipfile
+
+        print("Downloading FFmpeg...")
+
+        # New download URL
+        download_url = "hhttps://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
+
+        # Rest of the code remains the same
+        download_path = os.path.join(os.getcwd(), "ffmpeg.zip")
+
+        # Create a progress dialog
+        progress_dialog = QProgressDialog("Downloading FFmpeg...", "Cancel", 0, 100)
+        progress_dialog.setWindowModality(QtCore.Qt.WindowModal)
+        progress_dialog.setWindowTitle("Download Progress")
+        progress_dialog.setAutoClose(True)
+
+        def reporthook(blocknum, blocksize, totalsize):
+            nonlocal progress_dialog
+
+            # Calculate the download progress
+            progress = min(int(blocknum * blocksize * 100 / totalsize), 100)
+
+            # Update the progress dialog
+            progress_dialog.setValue(progress)
+
+        urllib.request.urlretrieve(download_url, download_path, reporthook=reporthook)
+
+        # Close the progress dialog
+        progress_dialog.close()
+
+        print("Extracting FFmpeg...")
+
+        # Extract the downloaded zip file directly to C:\ffmpeg\bin
+        ffmpeg_bin_path = "C:\\ffmpeg\\bin"
+
+        with zipfile.ZipFile(download_path, 'r') as zip_ref:
+            for file_info in zip_ref.infolist():
+                try:
+                    file_info.filename = os.path.basename(file_info.filename)  # Get only the filename
+                    zip_ref.extract(file_info, ffmpeg_bin_path)
+                except Exception as e:
+                    #print(f"Error extracting file: {file_info.filename}")
+                    #print(f"Exception: {e}")
+                    continue
+
+
+        # Clean up: remove the downloaded zip file
+        os.remove(download_path)
+
+        # Add the FFmpeg bin directory to the system's PATH
+        self.add_to_path(ffmpeg_bin_path)
+
+        # Print a message
+        print("FFmpeg installed successfully.")
+        self.start_tool_discovery(refresh=True)
+
+
+    def check_and_install_ffmpeg(self): 
+        if not self.is_ffmpeg_installed():
+            message = (
+                "FFmpeg is not installed or not found in the system's PATH.\n\n"
+                "FFmpeg is required for this application to function properly. "
+                "Do you want to download and install it to 'C:\\ffmpeg\\bin'?"
+            )
+
+            reply = QMessageBox.question(self, 'FFmpeg Not Found', message,
+                                        QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+            if reply == QMessageBox.Yes:
+                self.download_and_install_ffmpeg()
+                print("FFmpeg installed successfully.")
+            else:
+                print("User chose not to install FFmpeg.")
+                # Handle the case where the user chooses not to install FFmpeg
+
+    def is_ffmpeg_installed(self):
+        # Answered by the background discovery (see tools_discovered)
+        return self.tools is not None and self.tools.found
+        
+    def add_to_path(self, program_path: str):
+        """Takes in a path to a program and adds it to the user-specific path"""
+        if os.name == "nt":  # Windows systems
+            import winreg  # Allows access to the windows registry
+            import ctypes  # Allows interface with low-level C API's
+
+            with winreg.ConnectRegistry(None, winreg.HKEY_CURRENT_USER) as root:  # Get the current user registry
+                with winreg.OpenKey(root, "Environment", 0, winreg.KEY_ALL_ACCESS) as key:  # Go to the environment key
+                    existing_path_value = winreg.QueryValueEx(key, "PATH")[0]  # Grab the current path value
+
+                    # Check if the path is already in the existing value
+                    if program_path not in existing_path_value:
+                        new_path_value = existing_path_value + ";" + program_path
+                        winreg.SetValueEx(key, "PATH", 0, winreg.REG_EXPAND_SZ, new_path_value)  # Update the path
+
+                # Tell other processes to update their environment
+                HWND_BROADCAST = 0xFFFF
+                WM_SETTINGCHANGE = 0x1A
+                SMTO_ABORTIFHUNG = 0x0002
+                result = ctypes.c_long()
+                SendMessageTimeoutW = ctypes.windll.user32.SendMessageTimeoutW
+                SendMessageTimeoutW(HWND_BROADCAST, WM_SETTINGCHANGE, 0, u"Environment", SMTO_ABORTIFHUNG, 5000, ctypes.byref(result), )
+        else:  # If the system is *nix
+            print("This method is intended for Windows systems. For *nix systems, consider modifying the PATH manually.")
+
+        print(f"Added {program_path} to user path, please restart the shell for changes to take effect")
+
+
+
+    def contextMenuEvent(self, event):
+        # Ensure the event is within the bounds of the job table
+        if not self.table_view.underMouse():
+            return
+
+        contextMenu = QMenu(self)
+        
+        # Map the event position to the viewport of the table widget
+        tablePos = self.table_view.viewport().mapFromGlobal(event.globalPos())
+        row = self.table_view.rowAt(tablePos.y())
+
+        # Add 'Delete Row' action if the click is on a valid row
+        deleteAction = None
+        if row >= 0:
+            # Select the row that was right-clicked, unless it is part of the selection already
+            if not self.table_view.selectionModel().isRowSelected(row, QtCore.QModelIndex()):
+                self.table_view.selectRow(row)
+
+            deleteAction = contextMenu.addAction("Remove Selected")
+
+        # Add 'Remove All' action
+        removeAllAction = contextMenu.addAction("Remove All")
+
+        # Removing one row while encoding also cancels its file; removing all would end the batch
+        if self.is_encoding():
+            removeAllAction.setEnabled(False)
+
+        # Per-file controls while the batch runs; the other files carry on
+        job_actions = {}
+        job = self.job_model.job_at(row) if row >= 0 and self.is_encoding() else None
+        if job is not None and job.state in (QUEUED, RUNNING, PAUSED, RESUMING):
+            encoder = self.encoding_thread.encoder
+            contextMenu.addSeparator()
+            if job.state == PAUSED:
+                job_actions[contextMenu.addAction("Resume")] = encoder.resume
+            else:
+                job_actions[contextMenu.addAction("Pause")] = encoder.pause
+            job_actions[contextMenu.addAction("Cancel This File")] = encoder.cancel_job
+            if job.queue_position is not None:
+                job_actions[contextMenu.addAction("Start Next")] = encoder.move_to_front
+                job_actions[contextMenu.addAction("Move Up")] = lambda job: encoder.move_job(job, -1)
+                job_actions[contextMenu.addAction("Move Down")] = lambda job: encoder.move_job(job, 1)
+
+        action = contextMenu.exec_(event.globalPos())
+
+        if action == deleteAction and deleteAction is not None:
+            self.delete_selected_rows()
+        elif action == removeAllAction:
+            self.remove_all_rows()
+        elif action in job_actions:
+            job_actions[action](job)
+
+    def delete_selected_rows(self):
+        rows = [index.row() for index in self.table_view.selectionModel().selectedRows()]
+        # Confirm before deleting
+        question = 'Are you sure you want to delete this row?' if len(rows) == 1 else f'Are you sure you want to delete these {len(rows)} rows?'
+        reply = QMessageBox.question(self, 'Remove Selected', question, QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            if self.is_encoding():
+                for row in rows:
+                    job = self.job_model.job_at(row)
+                    if job is not None:
+                        self.encoding_thread.encoder.cancel_job(job)  # the batch carries on without it
+            self.job_model.remove_rows(rows)
+
+    def remove_all_rows(self):
+        # Confirm before removing all rows
+        reply = QMessageBox.question(self, 'Remove All Rows', 'Are you sure you want to remove all rows?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.stop_folder_scans()
+            self.job_model.clear()
+
+    def toggle_theme(self):
+        if self.is_dark_mode:
+            self.setStyleSheet(LIGHT_STYLE)
+            self.is_dark_mode = False
+        else:
+            self.setStyleSheet(DARK_STYLE)
+            self.is_dark_mode = True
+
+    def reset_ui(self):
+        # Only once the batch has ended: while it runs, Encode would start a second batch over the same rows
+        self.input_button.setEnabled(True)
+        self.output_button.setEnabled(True)
+        self.output_textbox.setEnabled(True)
+        self.preset_combobox.setEnabled(True)
+        self.bitrate_combobox.setEnabled(True)
+        self.hwaccel_combobox.setEnabled(True)
+        self.Simultaneous_Encodes_combobox.setEnabled(True)
+        self.encode_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def init_ui(self):
+
+        self.input_folder = ''
+        self.settings = QSettings("MyCompany", "VideoEncoder")
+        self.input_folder = self.settings.value("input_folder", "")
+        self.output_folder = self.settings.value("output_folder", "")
+        main_widget = QWidget(self)
+        self.setCentralWidget(main_widget)
+        layout = QVBoxLayout(main_widget)
+        self.tab_widget = QTabWidget()
+        layout.addWidget(self.tab_widget)
+        # Set tab position to top (optional, in case it was changed elsewhere)
+        self.tab_widget.setTabPosition(QTabWidget.North)
+        self.tab1 = QWidget()
+        self.tab2 = QWidget()
+        self.tab_widget.addTab(self.tab1, "Encoder")
+        self.tab_widget.addTab(self.tab2, "Console")
+        self.init_tab1_ui()
+        self.init_tab2_ui()
+        #Create the menu bar and menus as instance variables
+        self.menubar = self.menuBar()
+        self.file_menu = self.menubar.addMenu("File")
+        self.help_menu = self.menubar.addMenu("Help")
+        # Create actions for the menu items as instance variables
+        self.theme_action = QAction("Toggle Dark/Light Mode", self)
+        self.theme_action.triggered.connect(self.toggle_theme)
+        self.file_menu.addAction(self.theme_action)
+        self.open_action = QAction("Open", self)
+        self.open_action.triggered.connect(self.select_input_files)
+        self.file_menu.addAction(self.open_action)
+        self.add_folder_action = QAction("Add Folder...", self)
+        self.add_folder_action.triggered.connect(self.select_input_folder)
+        self.file_menu.addAction(self.add_folder_action)
+        self.metrics_action = QAction("Export Metrics...", self)
+        self.metrics_action.triggered.connect(self.export_metrics)
+        self.metrics_action.setEnabled(False)  # available once a batch has run
+        self.file_menu.addAction(self.metrics_action)
+        self.exit_action = QAction("Exit", self)
+        self.exit_action.triggered.connect(self.close)
+        self.file_menu.addAction(self.exit_action)
+        self.about_action = QAction("About", self)
+        self.about_action.triggered.connect(self.show_about_dialog)
+        self.help_menu.addAction(self.about_action)
+
+    def init_tab1_ui(self):
+        layout = QVBoxLayout(self.tab1)
+    
+        input_group = QGroupBox("Input", self.tab1)
+        form_layout = QFormLayout(input_group)
+
+        self.input_button = QPushButton("Select Files", self.tab1)
+        # Whole folder trees, searched in the background; the rows appear as the files are found
+        self.folder_button = QPushButton("Add Folder", self.tab1)
+        input_buttons = QHBoxLayout()
+        input_buttons.addWidget(self.input_button)
+        input_buttons.addWidget(self.folder_button)
+        form_layout.addRow("Files:", input_buttons)
+        self.folder_filter_textbox = QLineEdit(self.settings.value("folder_patterns", " ".join(VIDEO_PATTERNS)),
+                                               self.tab1)
+        self.folder_filter_textbox.setToolTip("File name patterns Add Folder picks up, separated by spaces")
+        form_layout.addRow("Folder Filter:", self.folder_filter_textbox)
+        self.job_model = JobTableModel(self)
+        self.table_view = QTableView(self.tab1)
+        self.table_view.setModel(self.job_model)
+        self.table_view.setSelectionBehavior(QTableView.SelectRows)
+        output_group = QGroupBox("Output", self.tab1)
+        form_layout = QFormLayout(output_group)
+        self.output_textbox = QLineEdit(self.tab1)
+        self.output_button = QPushButton("Select Folder", self.tab1)
+        form_layout.addRow("Folder:", self.output_textbox)
+        form_layout.addRow("", self.output_button)
+        settings_group = QGroupBox("Settings", self.tab1)
+        grid_layout = QGridLayout(settings_group)
+        self.Simultaneous_Encodes_combobox = QComboBox(self.tab1)
+        self.bitrate_combobox = QComboBox(self.tab1)
+        self.preset_combobox = QComboBox(self.tab1)
+        self.format_combobox = QComboBox(self.tab1)
+        self.format_combobox.addItems(["mp4", "mkv"])
+        self.hwaccel_combobox = QComboBox(self.tab1)
+        self.hwaccel_combobox.addItems(profile_names())
+        for i, name in enumerate(profile_names()):
+            self.hwaccel_combobox.setItemData(i, get_profile(name).description, QtCore.Qt.ToolTipRole)
+        # Last, so the saved indexes of the profiles above keep pointing at the same profile
+        self.hwaccel_combobox.addItem(AUTO.capitalize())
+        self.hwaccel_combobox.setItemData(len(profile_names()), "Fastest encoder that works on this computer",
+                                          QtCore.Qt.ToolTipRole)
+        grid_layout.addWidget(QLabel("Simultaneous Encodes:"), 0, 0)
+        grid_layout.addWidget(self.Simultaneous_Encodes_combobox, 0, 1)
+        # Shows what "Auto" picked and what it measured
+        self.concurrency_label = QLabel("", self.tab1)
+        grid_layout.addWidget(self.concurrency_label, 2, 0, 1, 2)
+        grid_layout.addWidget(QLabel("Bitrate:"), 1, 2)
+        grid_layout.addWidget(self.bitrate_combobox, 1 ,3)
+        grid_layout.addWidget(QLabel("Preset:"), 1, 0)
+        grid_layout.addWidget(self.preset_combobox, 1, 1)
+        grid_layout.addWidget(QLabel("Format:"), 3,0)
+        grid_layout.addWidget(self.format_combobox,3,1)
+    
+        grid_layout.addWidget(QLabel("Encoder:"), 4, 0)
+        grid_layout.addWidget(self.hwaccel_combobox, 4, 1)
+        self.encode_button = QPushButton("Encode Videos", self.tab1)
+        self.cancel_button = QPushButton("Cancel Encode", self.tab1)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.encode_button)
+        button_layout.addWidget(self.cancel_button)
+        layout.addWidget(input_group)
+        layout.addWidget(self.table_view)
+        layout.addWidget(output_group)
+        layout.addWidget(settings_group)
+        layout.addLayout(button_layout)
+
+        # New Bitrate Mode Combobox
+        self.bitrate_mode_combobox = QComboBox(self.tab1)
+        self.bitrate_mode_combobox.addItems(bitrate_modes)
+        grid_layout.addWidget(QLabel("Bitrate Mode:"), 0, 2)
+        grid_layout.addWidget(self.bitrate_mode_combobox, 0, 3)
+        self.bitrate_mode_combobox.currentIndexChanged.connect(self.on_bitrate_mode_change)
+
+
+        # Min Bitrate Editable Combobox
+        self.min_bitrate_combobox = QComboBox(self.tab1)
+        self.min_bitrate_combobox.setEditable(True)
+        grid_layout.addWidget(QLabel("Min Bitrate (M):"), 3, 2)
+        grid_layout.addWidget(self.min_bitrate_combobox, 3, 3)
+
+        # Max Bitrate Editable Combobox
+        self.max_bitrate_combobox = QComboBox(self.tab1)
+        self.max_bitrate_combobox.setEditable(True)
+        grid_layout.addWidget(QLabel("Max Bitrate (M):"), 4, 2)
+        grid_layout.addWidget(self.max_bitrate_combobox, 4, 3)
+
+        # Quality level for CRF mode
+        self.crf_combobox = QComboBox(self.tab1)
+        self.crf_combobox.setEditable(True)
+        self.crf_combobox.addItems(crf_values)
+        grid_layout.addWidget(QLabel("Quality (CRF):"), 2, 2)
+        grid_layout.addWidget(self.crf_combobox, 2, 3)
+
+        # Long files can be cut into segments that are encoded in parallel
+        self.split_combobox = QComboBox(self.tab1)
+        for seconds in segment_thresholds:
+            self.split_combobox.addItem(f"Longer than {seconds // 60} min" if seconds else "Off", seconds)
+        grid_layout.addWidget(QLabel("Split Long Files:"), 5, 0)
+        grid_layout.addWidget(self.split_combobox, 5, 1)
+
+        # Inputs that already match the target codec and bitrate only need a container change
+        self.remux_checkbox = QCheckBox("Remux files that already match", self.tab1)
+        self.remux_checkbox.setToolTip("Copy the streams instead of re-encoding when the input already uses "
+                                       "the encoder's codec at or below the requested bitrate")
+        grid_layout.addWidget(self.remux_checkbox, 5, 2, 1, 2)
+
+        # Several sizes of every input from one decode
+        self.renditions_textbox = QLineEdit(self.tab1)
+        self.renditions_textbox.setPlaceholderText("Off, or e.g. 1080:8M,720:4M,480:1500k")
+        self.renditions_textbox.setToolTip("HEIGHT[:BITRATE[:ENCODER]], comma separated; each input is decoded "
+                                           "once and written as name_1080p, name_720p, ...")
+        grid_layout.addWidget(QLabel("Renditions:"), 6, 0)
+        grid_layout.addWidget(self.renditions_textbox, 6, 1, 1, 3)
+
+        # Simultaneous CPU encodes get their own cores instead of all competing for every core
+        self.cpu_plan_checkbox = QCheckBox("Give each encode its own CPU cores", self.tab1)
+        self.cpu_plan_checkbox.setToolTip("Divide the cores between simultaneous CPU encodes, limit each "
+                                          "encoder's threads to its share and pin it to those cores")
+        grid_layout.addWidget(self.cpu_plan_checkbox, 7, 0, 1, 2)
+        self.background_checkbox = QCheckBox("Low priority", self.tab1)
+        self.background_checkbox.setToolTip("Run ffmpeg at low CPU and disk priority so the computer stays responsive")
+        grid_layout.addWidget(self.background_checkbox, 7, 2, 1, 2)
+
+        self.bitrate_combobox.addItems(bitrate_num)
+        self.min_bitrate_combobox.addItems(bitrate_num)
+        self.max_bitrate_combobox.addItems(bitrate_num)
+
+
+        self.Simultaneous_Encodes_combobox.addItems(num_encodes)
+        # Read previous settings using QSettings
+        self.settings = QSettings("MyCompany", "VideoEncoder")
+        previous_bitrate = self.settings.value("bitrate", "1M")
+        previous_bitrate_mode = self.settings.value("bitrate_mode", "CBR")
+        previous_min_bitrate = self.settings.value("min_bitrate", "1M")
+        previous_max_bitrate = self.settings.value("max_bitrate", "2M")
+        previous_preset = self.settings.value("preset", "medium")
+        previous_simultaneous_encodes = self.settings.value("simultaneous_encodes", "1")
+        previous_hwaccel_index = int(self.settings.value("hwaccel_index", "0"))
+        previous_crf = self.settings.value("crf", "23")
+        previous_split_index = int(self.settings.value("split_index", "0"))
+        previous_remux = self.settings.value("remux", "true") == "true"
+        previous_renditions = self.settings.value("renditions", "")
+        previous_cpu_plan = self.settings.value("cpu_plan", PLAN_OFF)
+        previous_background = self.settings.value("background", "false") == "true"
+        previous_output_folder = self.settings.value("output_folder", "")
+        # Create and set default values for comboboxes
+        self.bitrate_combobox.setCurrentText(previous_bitrate)
+        self.bitrate_mode_combobox.setCurrentText(previous_bitrate_mode)
+        self.min_bitrate_combobox.setCurrentText(previous_min_bitrate)
+        self.max_bitrate_combobox.setCurrentText(previous_max_bitrate)
+
+        self.crf_combobox.setCurrentText(previous_crf)
+        self.split_combobox.setCurrentIndex(previous_split_index)
+        self.remux_checkbox.setChecked(previous_remux)
+        self.renditions_textbox.setText(previous_renditions)
+        self.cpu_plan_checkbox.setChecked(previous_cpu_plan == PLAN_PIN)
+        self.background_checkbox.setChecked(previous_background)
+        self.Simultaneous_Encodes_combobox.setCurrentText(previous_simultaneous_encodes)
+        self.hwaccel_combobox.setCurrentIndex(previous_hwaccel_index)
+        # Each encoder profile has its own preset vocabulary
+        self.hwaccel_combobox.currentIndexChanged.connect(self.on_profile_change)
+        self.on_profile_change()
+        self.preset_combobox.setCurrentText(previous_preset)
+        self.on_bitrate_mode_change(self.bitrate_mode_combobox.currentIndex())
+        self.output_textbox.setText(previous_output_folder)
+        self.input_button.clicked.connect(self.select_input_files)
+        self.folder_button.clicked.connect(self.select_input_folder)
+        self.output_button.clicked.connect(self.select_output_folder)
+        self.encode_button.clicked.connect(self.encode_videos)
+        self.cancel_button.clicked.connect(self.cancel_encoding_thread)
+        self.simultaneous_encodes = 0
+        # Files are probed in the background as soon as they are added
+        self.probe_notifier = ProbeNotifier(self)
+        self.probe_notifier.probed.connect(self.update_probe_info)
+        self.probe_pool = ProbePool(on_probed=self.probe_notifier.probed.emit)
+        # Folder scans run on their own threads and hand over SCAN_CHUNKS_IN_FLIGHT chunks at most
+        # before waiting for the GUI to take them, so a fast disk cannot flood the event queue
+        self.scan_notifier = ScanNotifier(self)
+        self.scan_notifier.found.connect(self.add_scanned_files)
+        self.scan_notifier.finished.connect(self.folder_scan_finished)
+        self.scan_stop = threading.Event()
+        self.scan_slots = threading.Semaphore(SCAN_CHUNKS_IN_FLIGHT)
+        self.scans_running = 0
+        self.scanned_files = 0
+        self.cancel_button.setEnabled(False)  # Initially disable the cancel button
+
+        
+
+
+    def init_tab2_ui(self):
+        layout = QVBoxLayout(self.tab2)
+        label2 = QLabel("Console", self.tab2)
+        layout.addWidget(label2)
+        # Adding a QPlainTextEdit that expands to fill the available space in Tab 2
+        # Show everything, or a single job (read back from its log file)
+        self.console_filter_combobox = QComboBox(self.tab2)
+        self.console_filter_combobox.addItem("All jobs", -1)
+        self.console_filter_combobox.currentIndexChanged.connect(self.on_console_filter_change)
+        layout.addWidget(self.console_filter_combobox)
+        self.line_edit_tab2 = QPlainTextEdit(self.tab2)  # Use QPlainTextEdit instead of QLineEdit
+        self.line_edit_tab2.setReadOnly(True)
+        self.line_edit_tab2.setMaximumBlockCount(CONSOLE_MAX_LINES)  # Oldest lines drop off the top
+        self.console_history = deque(maxlen=CONSOLE_MAX_LINES)
+        self.console_timer = QtCore.QTimer(self)
+        self.console_timer.timeout.connect(self.flush_console_output)
+        self.console_timer.start(CONSOLE_FLUSH_MS)
+        size_policy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.line_edit_tab2.setSizePolicy(size_policy)
+        layout.addWidget(self.line_edit_tab2)
+
+    @QtCore.pyqtSlot(str)
+    def update_console_output(self, line):
+        self.line_edit_tab2.appendPlainText(line)  # Use appendPlainText to add new lines
+
+    def flush_console_output(self):
+        if not hasattr(self, "encoding_thread"):
+            return
+        lines = self.encoding_thread.take_console_lines()
+        if not lines:
+            return
+        self.console_history.extend(lines)
+        selected = self.console_filter_combobox.currentData()
+        text = "\n".join(line for row, line in lines if selected == -1 or row == selected)
+        if text:
+            self.update_console_output(text)
+
+    def on_console_filter_change(self, index):
+        selected = self.console_filter_combobox.currentData()
+        self.line_edit_tab2.clear()
+        if selected is None or selected == -1:
+            text = "\n".join(line for row, line in self.console_history)
+        else:
+            log_file = self.encoding_thread.jobs[selected].log_file
+            try:
+                with open(log_file, encoding="utf-8", errors="replace") as f:
+                    text = "".join(deque(f, maxlen=CONSOLE_MAX_LINES)).rstrip("\n")
+            except OSError:
+                text = "\n".join(line for row, line in self.console_history if row == selected)
+        if text:
+            self.update_console_output(text)
+
+    def reset_console_filter(self):
+        self.console_filter_combobox.blockSignals(True)
+        self.console_filter_combobox.clear()
+        self.console_filter_combobox.addItem("All jobs", -1)
+        self.console_filter_combobox.blockSignals(False)
+        self.console_filter_jobs = set()
+        self.console_history.clear()
+
+    def add_console_filter_job(self, job):
+        # Jobs are listed as they start: a batch of 100k files would make a combobox too long to open
+        if job.index not in self.console_filter_jobs:
+            self.console_filter_jobs.add(job.index)
+            self.console_filter_combobox.addItem(f"{job.index + 1}: {os.path.basename(job.input_file)}", job.index)
+
+
+    def export_metrics(self):
+        """Save the last batch's per-file and batch metrics as JSON, CSV or Prometheus text."""
+        if not hasattr(self, "encoding_thread") or self.is_encoding():
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "encode_metrics.json",
+                                              "JSON (*.json);;CSV (*.csv);;Prometheus textfile (*.prom)")
+        if not path:
+            return
+        try:
+            write_report(path, self.encoding_thread.jobs, self.encoding_thread.encoder.wall_seconds)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Export Metrics", str(e))
+
+    def show_about_dialog(self):
+        about_text = (
+            "Simple Video Encoder/Converter for Nvidia GPUs\n"
+
+            "Tested on Nvidia 3060, 3070, 4090\n\n"
+
+            "Note: This application is a work in progress, and not all functions work correctly.\n\n"
+
+            "Version: 4.0\n\n"
+
+            "Key Features:\n"
+
+            "GUI Interface for easy interaction\n"
+
+            "Hardware Acceleration for faster encoding (Cuvid, Cuda)\n"
+
+            "Concurrent Video Encoding for improved efficiency\n"
+
+            "Live Encoding Progress display with Elapsed Time, FPS, and Time Remaining\n"
+
+            "Customizable encoding settings (bitrate, preset, h264, hevc 265)\n"
+
+            "CPU encoders (libx264, libx265, SVT-AV1) for machines without an Nvidia GPU\n\n"
+
+            "ffmpeg commands are:\n\n"
+
+            "Nvidia Cuda\n"
+            "ffmpeg -y -hwaccel cuda -i input_video -c:v h264_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
+
+            "Nvidia cuvid\n"
+            "ffmpeg -y -hwaccel cuvid -i input_video -c:v h264_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
+
+            "Nvidia Cuda\n"
+            "ffmpeg -y -hwaccel cuda -i input_video -c:v hevc_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
+
+            "Nvidia cuvid\n"
+            "ffmpeg -y -hwaccel cuvid -i input_video -c:v hevc_nvenc -preset fast -b:v bitrate -c:a copy output_video\n"
+        )
+
+        # Create a QMessageBox and set the style sheet to customize the font color
+        about_box = QMessageBox(self)
+        about_box.setWindowTitle("About Bulk Video Encoder")
+        about_box.setText(about_text)
+
+        # Show the "About" dialog
+        about_box.exec_()
+
+    def on_bitrate_mode_change(self, index):
+        # Only enable the inputs the selected rate control uses
+        mode = self.bitrate_mode_combobox.currentText()
+        self.min_bitrate_combobox.setDisabled(mode != "VBR")
+        self.max_bitrate_combobox.setDisabled(mode != "VBR")
+        self.bitrate_combobox.setDisabled(mode != "CBR")
+        self.crf_combobox.setDisabled(mode != "CRF")
+
+    def on_profile_change(self, index=None):
+        current = self.preset_combobox.currentText()
+        self.preset_combobox.clear()
+        if is_auto(self.hwaccel_combobox.currentText()):
+            # Every profile understands the generic presets
+            self.preset_combobox.addItems(GENERIC_PRESETS)
+            self.preset_combobox.setCurrentText(current if current in GENERIC_PRESETS else "medium")
+            return
+        profile = get_profile(self.hwaccel_combobox.currentText())
+        self.preset_combobox.addItems(profile.presets)
+        # Keep the preset if the new profile knows it (directly or as slow/medium/fast)
+        current = profile.preset_aliases.get(current, current)
+        self.preset_combobox.setCurrentText(current if current in profile.presets else profile.default_preset)
+
+    def select_input_files(self):
+        file_names, _ = QFileDialog.getOpenFileNames(self, "Select Files", self.input_folder, "Video Files (*.mp4;*.mkv;*.avi;*.mov;*.wmv;*.flv;*.webm;*.mpeg;*.mpg;*.m4v;*.ts)")
+        if file_names:
+            self.input_folder = os.path.dirname(file_names[0])
+            self.settings.setValue("input_folder", self.input_folder)
+            self.add_input_files(file_names)
+
+            # Only size the columns when rows are added, not on every progress update
+            self.table_view.resizeColumnsToContents()
+
+    def add_input_files(self, paths):
+        """Add rows for the paths not in the table yet, probe them and, while encoding, queue them too."""
+        first_row, added = self.job_model.add_files(paths)
+        for path in added:
+            self.probe_pool.submit(path)
+        if added and self.is_encoding():
+            # Join the running batch: queued behind the files already waiting, no restart
+            try:
+                jobs = self.encoding_thread.encoder.add_files(added)
+            except RuntimeError:
+                jobs = []  # finishing right now; the rows wait for the next batch
+            self.job_model.attach_jobs(jobs, first_row)
+        return added
+
+    def select_input_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Add Folder", self.input_folder)
+        if not folder:
+            return
+        patterns = self.folder_filter_textbox.text().split() or list(VIDEO_PATTERNS)
+        self.settings.setValue("folder_patterns", " ".join(patterns))
+        self.input_folder = folder
+        self.settings.setValue("input_folder", self.input_folder)
+        self.scans_running += 1
+        threading.Thread(target=self.scan_folder, args=(folder, patterns, self.scan_stop), name="folder-scan",
+                         daemon=True).start()
+        self.statusBar().showMessage(f"Searching {folder}...")
+
+    def scan_folder(self, folder, patterns, stop):
+        # Runs on the scan thread; find_videos_chunked ends early once stop is set
+        try:
+            for chunk in find_videos_chunked(folder, patterns, stop=stop):
+                while not self.scan_slots.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                self.scan_notifier.found.emit(chunk, stop)
+        finally:
+            self.scan_notifier.finished.emit(folder)
+
+    def stop_folder_scans(self):
+        # Scans started from now on get a fresh event
+        self.scan_stop.set()
+        self.scan_stop = threading.Event()
+        self.scanned_files = 0
+
+    @QtCore.pyqtSlot(object, object)
+    def add_scanned_files(self, paths, stop):
+        self.scan_slots.release()
+        if stop.is_set():
+            return  # found before the scan was stopped, delivered after
+        first_chunk = self.job_model.rowCount() == 0
+        self.scanned_files += len(self.add_input_files(paths))
+        if first_chunk:
+            self.table_view.resizeColumnsToContents()
+        self.statusBar().showMessage(f"Searching folders: {self.scanned_files} files added")
+
+    @QtCore.pyqtSlot(str)
+    def folder_scan_finished(self, folder):
+        self.scans_running -= 1
+        if self.scans_running == 0:
+            self.statusBar().showMessage(f"Added {self.scanned_files} files")
+            self.scanned_files = 0
+            self.table_view.resizeColumnsToContents()
+
+    def select_output_folder(self):
+        folder_name = QFileDialog.getExistingDirectory(self, "Select Folder", self.output_folder)
+        if folder_name:
+            self.output_textbox.setText(folder_name)
+            self.output_folder = folder_name
+            self.settings.setValue("output_folder", self.output_folder)
+
+    def encode_videos(self):
+        try:
+            parse_ladder(self.renditions_textbox.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Renditions", str(e))
+            return
+        profile = self.hwaccel_combobox.currentText()
+        if is_auto(profile):
+            # Until the encoder tests are in, hardware first; a backend that fails falls back per file
+            ranking = self.backend_ranking or (untested_ranking(self.tools) if self.tools else [])
+            profile = best_profile(ranking)
+            if profile is None:
+                QMessageBox.warning(self, "Encoder", "No working encoder was found on this computer.")
+                return
+        #self.status_label.setText("Encoding")
+        # Store current settings in QSettings
+        self.settings.setValue("bitrate", self.bitrate_combobox.currentText())
+        self.settings.setValue("bitrate_mode", self.bitrate_mode_combobox.currentText())
+        self.settings.setValue("min_bitrate", self.min_bitrate_combobox.currentText())
+        self.settings.setValue("max_bitrate", self.max_bitrate_combobox.currentText())
+
+        self.settings.setValue("preset", self.preset_combobox.currentText())
+        self.settings.setValue("simultaneous_encodes", self.Simultaneous_Encodes_combobox.currentText())
+        self.settings.setValue("hwaccel_index", self.hwaccel_combobox.currentIndex())
+        self.settings.setValue("crf", self.crf_combobox.currentText())
+        self.settings.setValue("split_index", self.split_combobox.currentIndex())
+        self.settings.setValue("remux", "true" if self.remux_checkbox.isChecked() else "false")
+        self.settings.setValue("renditions", self.renditions_textbox.text())
+        cpu_plan = PLAN_PIN if self.cpu_plan_checkbox.isChecked() else PLAN_OFF
+        self.settings.setValue("cpu_plan", cpu_plan)
+        self.settings.setValue("background", "true" if self.background_checkbox.isChecked() else "false")
+        self.settings.setValue("output_folder", self.output_textbox.text())
+
+        input_files = self.job_model.paths()
+
+        self.simultaneous_encodes = self.Simultaneous_Encodes_combobox.currentText()  # a number or "Auto"
+        settings = EncodeSettings(
+            self.output_textbox.text(),
+            preset=self.preset_combobox.currentText(),
+            bitrate=self.bitrate_combobox.currentText(),
+            bitrate_mode=self.bitrate_mode_combobox.currentText(),
+            min_bitrate=self.min_bitrate_combobox.currentText(),
+            max_bitrate=self.max_bitrate_combobox.currentText(),
+            output_format=self.format_combobox.currentText(),
+            profile=profile,
+            crf=self.crf_combobox.currentText(),
+            segment_min_duration=self.split_combobox.currentData(),
+            remux=self.remux_checkbox.isChecked(),
+            renditions=self.renditions_textbox.text(),
+            cpu_plan=cpu_plan,
+            background=self.background_checkbox.isChecked(),
+            simultaneous_encodes=self.simultaneous_encodes,
+        )
+
+
+        self.output_button.setEnabled(False)
+        self.output_textbox.setEnabled(False)
+        self.preset_combobox.setEnabled(False)
+        self.bitrate_combobox.setEnabled(False)      
+        self.hwaccel_combobox.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.Simultaneous_Encodes_combobox.setEnabled(False)
+        self.encode_button.setEnabled(False)
+        self.encoding_thread = VideoEncoderThread(input_files, settings, self.backend_ranking)
+        self.job_model.attach_jobs(self.encoding_thread.jobs)
+        self.job_model.queue_visible = True
+        self.encoding_thread.encoding_canceled.connect(self.encoding_canceled_handler)
+        self.encoding_thread.encoding_complete.connect(self.encoding_complete)  # Connect the signal to the slot
+        self.encoding_thread.encoding_completed.connect(self.encoding_completed_handler)
+        self.encoding_thread.batch_planned.connect(self.statusBar().showMessage)
+        self.encoding_thread.concurrency_changed.connect(self.concurrency_label.setText)
+        self.encoding_thread.job_started.connect(self.job_started_handler)
+        self.reset_console_filter()
+        self.encoding_thread.start()
+
+    def is_encoding(self):
+        return hasattr(self, "encoding_thread") and self.encoding_thread.isRunning()
+
+    @QtCore.pyqtSlot(str, object)
+    def update_probe_info(self, path, info):
+        self.job_model.set_probe(path, info)
+
+    def cancel_encoding_thread(self,row):
+        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
+            self.encoding_thread.cancel_encoding()  # ffmpegs get SIGTERM now; the thread ends once they exit
+            # The controls come back in encoding_complete, once every ffmpeg has exited
+            self.cancel_button.setEnabled(False)
+            self.job_model.mark_all_dirty()
+
+    @QtCore.pyqtSlot(int)
+    def job_started_handler(self, job_index):
+        job = self.encoding_thread.jobs[job_index]
+        self.job_model.mark_started(job)
+        self.add_console_filter_job(job)
+
+    @QtCore.pyqtSlot(int)
+    def encoding_completed_handler(self, job_index):
+        # The Status column reads Done/Failed from the job itself; the batch may still be running
+        self.job_model.mark_job_dirty(self.encoding_thread.jobs[job_index])
+
+    @QtCore.pyqtSlot()
+    def encoding_canceled_handler(self):
+        # A file of the canceled batch stopped; the others are still exiting
+        self.cancel_button.setEnabled(False)
+        self.job_model.mark_all_dirty()
+
+    def encoding_complete(self):
+        self.reset_ui()
+        self.job_model.queue_visible = False
+        self.job_model.mark_all_dirty()
+        jobs = self.encoding_thread.jobs if hasattr(self, "encoding_thread") else []
+        remuxed = sum(1 for job in jobs if job.remux and job.state == DONE)
+        encoded = sum(1 for job in jobs if not job.remux and job.state == DONE)
+        failed = sum(1 for job in jobs if job.state == FAILED)
+        canceled = sum(1 for job in jobs if job.state == CANCELED)
+        self.statusBar().showMessage(f"Finished: {encoded} re-encoded, {remuxed} remuxed"
+                                     + (f", {failed} failed" if failed else "")
+                                     + (f", {canceled} canceled" if canceled else ""))
+        self.metrics_action.setEnabled(bool(jobs))
+
+        # Cleanup the encoding thread
+        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
+            self.encoding_thread.wait()  # Wait for the encoding thread to finish
+
+    def closeEvent(self, event):
+        self.stop_folder_scans()
+        self.probe_pool.shutdown(wait=False)
+        # Check if the encoding thread is running and cancel it
+        if hasattr(self, "encoding_thread") and self.encoding_thread.isRunning():
+            self.encoding_thread.cancel_encoding()
+            self.encoding_thread.wait()  # Wait for the encoding thread to finish
+
+        # Call the default close event to allow the application to exit
+        super().closeEvent(event)
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(message)s", level=logging.WARNING)  # bulk_encoder's warnings, on the console
+    app = QApplication(sys.argv)
+    window = VideoEncoder()
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,104 @@
+"""Startup benchmark for the GUI.
+
+Starts Bulk_Video_Converter_v4.py in a fresh interpreter several times and
+records, from the moment the process is launched:
+
+    imported     the module and its imports are loaded
+    interactive  the window is shown and the event loop is processing events
+    tools_ready  ffmpeg/ffprobe discovery has finished
+
+"cold" runs start with an empty user cache, "warm" runs reuse the cache a
+previous run left behind. Without a display, Qt's offscreen platform is used.
+
+    python benchmarks/startup.py --runs 5 --save startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MILESTONES = ("imported", "interactive", "tools_ready")
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+marks = {}
+import Bulk_Video_Converter_v4 as gui
+marks["imported"] = time.time()
+app = gui.QApplication(sys.argv[:1])
+window = gui.VideoEncoder()
+window.show()
+
+def finish():
+    marks.setdefault("tools_ready", time.time())
+    if "interactive" in marks:
+        print("STARTUP " + json.dumps(marks), flush=True)
+        app.quit()
+
+def interactive():
+    marks["interactive"] = time.time()
+    if window.tools is not None:
+        finish()
+
+window.tools_notifier.discovered.connect(lambda tools: finish())
+gui.QtCore.QTimer.singleShot(0, interactive)
+gui.QtCore.QTimer.singleShot(30000, app.quit)
+app.exec_()
+"""
+
+
+def cache_env(cache_dir):
+    """Environment pointing the user cache (see bulk_encoder.system.user_cache_dir) at cache_dir."""
+    env = dict(os.environ, XDG_CACHE_HOME=cache_dir, LOCALAPPDATA=cache_dir)
+    if os.name != "nt" and not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def run_once(env):
+    """Seconds from launch to each milestone of one start."""
+    start = time.time()
+    output = subprocess.run([sys.executable, "-c", CHILD, ROOT], env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, universal_newlines=True, timeout=60).stdout
+    line = next((line for line in output.splitlines() if line.startswith("STARTUP ")), None)
+    if line is None:
+        raise RuntimeError("the window did not start:\n" + output)
+    marks = json.loads(line[len("STARTUP "):])
+    return {name: round(marks[name] - start, 4) for name in MILESTONES}
+
+
+def summarize(samples):
+    return {name: round(statistics.median(sample[name] for sample in samples), 4) for name in MILESTONES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the GUI's time to interactive.")
+    parser.add_argument("--runs", type=int, default=5, help="starts per case (default: 5)")
+    parser.add_argument("--save", metavar="JSON", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bulk_encoder_startup_") as work_dir:
+        cold = []
+        for i in range(args.runs):
+            cold.append(run_once(cache_env(os.path.join(work_dir, f"cold{i}"))))
+        warm_env = cache_env(os.path.join(work_dir, "warm"))
+        run_once(warm_env)  # fills the cache
+        warm = [run_once(warm_env) for _ in range(args.runs)]
+    for case, samples in (("cold", cold), ("warm", warm)):
+        results[case] = summarize(samples)
+        print(f"{case:<5} " + "  ".join(f"{name} {results[case][name] * 1000:6.0f} ms" for name in MILESTONES))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Throughput benchmark for the encode pipeline.
+
+Generates deterministic clips with ffmpeg's lavfi sources, runs them through
+bulk_encoder.BatchEncoder (the same pipeline as the GUI and the CLI) for each
+encoder profile and concurrency level, and records wall time, aggregate fps,
+realtime speed and output size. Results are saved as JSON; comparing them with
+an earlier file flags regressions.
+
+    python benchmarks/throughput.py --save baseline.json
+    python benchmarks/throughput.py --compare baseline.json --save latest.json
+
+--cpu-plans off threads pin runs every case once per CPU plan, to compare
+dividing the cores between simultaneous encodes against ffmpeg's default.
+
+Only CPU encoders are used by default, so it runs on any Linux box with ffmpeg.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_encoder.core import BatchEncoder, EncodeSettings, DONE  # noqa: E402
+from bulk_encoder.journal import JobJournal  # noqa: E402
+from bulk_encoder.probe import ProbeCache  # noqa: E402
+from bulk_encoder.profiles import get_profile  # noqa: E402
+from bulk_encoder.resources import CPU_PLANS, PLAN_OFF, available_cpus  # noqa: E402
+from bulk_encoder.tools import discover_tools  # noqa: E402
+
+# name: (lavfi video source, width, height, seconds). testsrc2 is cheap to encode, mandelbrot is detailed
+CLIPS = {
+    "testsrc2_480p_10s": ("testsrc2", 854, 480, 10),
+    "mandelbrot_480p_10s": ("mandelbrot", 854, 480, 10),
+    "testsrc2_720p_10s": ("testsrc2", 1280, 720, 10),
+    "testsrc2_1080p_5s": ("testsrc2", 1920, 1080, 5),
+}
+QUICK_CLIPS = ("testsrc2_480p_10s", "mandelbrot_480p_10s")
+FRAME_RATE = 30
+
+DEFAULT_PROFILES = ("CPU_x264", "CPU_x265")
+DEFAULT_LEVELS = (1, 2)
+DEFAULT_THRESHOLD = 0.10  # flag cases that got more than 10% slower
+
+
+def generate_clip(name, folder):
+    """Create (once) the input clip `name` in folder; the same arguments always give the same frames."""
+    source, width, height, seconds = CLIPS[name]
+    path = os.path.join(folder, f"{name}.mkv")
+    if os.path.exists(path):
+        return path
+    command = ["ffmpeg", "-y", "-v", "error",
+               "-f", "lavfi", "-i", f"{source}=size={width}x{height}:rate={FRAME_RATE}",
+               "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000", "-t", str(seconds),
+               "-c:v", "libx264", "-preset", "ultrafast", "-qp", "10", "-pix_fmt", "yuv420p", "-g", str(FRAME_RATE),
+               "-c:a", "aac", "-b:a", "128k", "-fflags", "+bitexact",
+               "-f", "matroska", path + ".partial"]
+    subprocess.check_call(command)
+    os.replace(path + ".partial", path)
+    return path
+
+
+def run_case(profile, level, inputs, work_dir, preset, crf, cpu_plan=PLAN_OFF):
+    """Encode inputs with one profile at one concurrency level; returns the measurements."""
+    output_folder = tempfile.mkdtemp(prefix=f"{profile}_j{level}_{cpu_plan}_", dir=work_dir)
+    settings = EncodeSettings(output_folder, preset=preset, bitrate_mode="CRF", crf=str(crf), profile=profile,
+                              simultaneous_encodes=level, log_folder=os.path.join(output_folder, "logs"),
+                              resume=False, remux=False, cpu_plan=cpu_plan)
+    encoder = BatchEncoder(inputs, settings, probe_cache=ProbeCache(None), journal=JobJournal(None))
+    encoder.probe()  # probing is not part of the measured encode time
+    start = time.monotonic()
+    failed = encoder.run()
+    wall = time.monotonic() - start
+
+    frames = sum(job.total_frames or job.frames for job in encoder.jobs)
+    duration = sum(job.duration for job in encoder.jobs)
+    size = sum(os.path.getsize(job.output_file) for job in encoder.jobs
+               if job.state == DONE and os.path.exists(job.output_file))
+    return {
+        "profile": profile,
+        "level": level,
+        "cpu_plan": cpu_plan,
+        "files": len(inputs),
+        "failed": failed,
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "speed": round(duration / wall, 3) if wall else 0.0,
+        "output_bytes": size,
+    }
+
+
+def case_key(result):
+    plan = result.get("cpu_plan", PLAN_OFF)
+    return f"{result['profile']}@{result['level']}" + (f"/{plan}" if plan != PLAN_OFF else "")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Lines describing each case against the baseline, and the number of regressions."""
+    old = {case_key(r): r for r in baseline["results"]}
+    lines = []
+    regressions = 0
+    for result in current["results"]:
+        key = case_key(result)
+        before = old.get(key)
+        if before is None:
+            lines.append(f"{key:<24} new case, {result['wall_seconds']:.2f}s")
+            continue
+        change = result["wall_seconds"] / before["wall_seconds"] - 1 if before["wall_seconds"] else 0.0
+        size_change = result["output_bytes"] / before["output_bytes"] - 1 if before["output_bytes"] else 0.0
+        flag = ""
+        if result["failed"] > before["failed"]:
+            flag = "  REGRESSION (more failures)"
+        elif change > threshold:
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  faster"
+        if flag.startswith("  REGRESSION"):
+            regressions += 1
+        lines.append(f"{key:<24} {before['wall_seconds']:7.2f}s -> {result['wall_seconds']:7.2f}s ({change:+.1%}), "
+                     f"{before['fps']:.0f} -> {result['fps']:.0f} fps, size {size_change:+.1%}{flag}")
+    if baseline.get("host") != current.get("host"):
+        lines.append("Note: baseline was recorded on a different host or ffmpeg build; timings may not compare.")
+    return lines, regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the encode pipeline with synthetic clips.")
+    parser.add_argument("--profiles", nargs="+", default=list(DEFAULT_PROFILES), help="encoder profiles to run")
+    parser.add_argument("-j", "--levels", nargs="+", type=int, default=list(DEFAULT_LEVELS),
+                        help="simultaneous encode levels to run (default: 1 2)")
+    parser.add_argument("--cpu-plans", nargs="+", choices=CPU_PLANS, default=[PLAN_OFF],
+                        help="CPU plans to run every case with (default: off)")
+    parser.add_argument("--preset", default="fast", help="preset for every case (default: fast)")
+    parser.add_argument("--crf", type=int, default=23)
+    parser.add_argument("--quick", action="store_true", help="only the two small clips")
+    parser.add_argument("--clips-folder", default=os.path.join(tempfile.gettempdir(), "bulk_encoder_bench_clips"),
+                        help="where generated clips are kept between runs")
+    parser.add_argument("--save", metavar="JSON", help="write the results to this file")
+    parser.add_argument("--compare", metavar="JSON", help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression (default: 0.10)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tools = discover_tools()
+    encoders = set(tools.encoders)
+    profiles = [name for name in args.profiles if get_profile(name).encoder in encoders]
+    for name in sorted(set(args.profiles) - set(profiles)):
+        print(f"Skipping {name}: this ffmpeg has no {get_profile(name).encoder}")
+    if not profiles:
+        return 2
+
+    os.makedirs(args.clips_folder, exist_ok=True)
+    clip_names = QUICK_CLIPS if args.quick else tuple(CLIPS)
+    inputs = [generate_clip(name, args.clips_folder) for name in clip_names]
+
+    results = {
+        "host": {"cpus": len(available_cpus()), "machine": platform.machine(), "ffmpeg": tools.version},
+        "python": platform.python_version(),
+        "clips": list(clip_names),
+        "preset": args.preset,
+        "crf": args.crf,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="bulk_encoder_bench_") as work_dir:
+        for profile in profiles:
+            for level in args.levels:
+                for cpu_plan in args.cpu_plans:
+                    result = run_case(profile, level, inputs, work_dir, args.preset, args.crf, cpu_plan)
+                    results["results"].append(result)
+                    print(f"{case_key(result):<24} {result['wall_seconds']:7.2f}s {result['fps']:7.1f} fps "
+                          f"{result['speed']:6.2f}x realtime {result['output_bytes'] / 1048576:7.1f} MB"
+                          + (f"  {result['failed']} failed" if result["failed"] else ""))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = compare(baseline, results, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Qt-free encoding core of the Bulk Video Converter.
+
+The GUI (Bulk_Video_Converter_v4.py) and the command line
+(``python -m bulk_encoder``) both drive the same BatchEncoder.
+"""
+from .core import BatchEncoder, EncodeSettings, Job, build_command, output_path_for
+from .probe import ProbeCache, get_video_duration, probe_file
+
+__all__ = ["BatchEncoder", "EncodeSettings", "Job", "ProbeCache", "build_command", "get_video_duration",
+           "output_path_for", "probe_file"]
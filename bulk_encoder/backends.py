@@ -0,0 +1,133 @@
+import os
+import subprocess
+import time
+from types import SimpleNamespace
+
+from .profiles import PROFILES
+from .system import hidden_startupinfo, user_cache_dir
+from .tools import CACHE_VERSION, load_cache, save_cache
+
+TEST_MAX_AGE = 7 * 24 * 3600  # drivers change under an unchanged ffmpeg; test again after a week
+TEST_SOURCE = "testsrc2=size=640x360:rate=30"
+TEST_FRAMES = 30
+TEST_TIMEOUT = 60
+# Rate control for the test encode; the profile's default preset is used
+TEST_SETTINGS = dict(bitrate="4M", min_bitrate="2M", max_bitrate="4M", bitrate_mode="CBR", crf="23")
+
+
+class BackendTest:
+    """Whether one encoder profile works on this host, and how fast it encoded the test clip."""
+
+    def __init__(self, profile, works, seconds=0.0, error=""):
+        self.profile = profile
+        self.works = works  # None: not tested (see untested_ranking)
+        self.seconds = seconds
+        self.error = error  # last line ffmpeg printed when the test failed
+
+    @property
+    def fps(self):
+        return TEST_FRAMES / self.seconds if self.works and self.seconds > 0 else 0.0
+
+    def describe(self):
+        if self.works is None:
+            return f"{self.profile}: not tested"
+        if self.works:
+            return f"{self.profile}: {self.fps:.0f} fps"
+        return f"{self.profile}: unavailable ({self.error or 'test encode failed'})"
+
+
+def test_command(profile, ffmpeg="ffmpeg"):
+    """A short synthetic encode (nothing written) that fails if the encoder cannot open on this host."""
+    settings = SimpleNamespace(preset=profile.default_preset, **TEST_SETTINGS)
+    return ([ffmpeg, "-hide_banner", "-nostdin", "-v", "error", "-f", "lavfi", "-i", TEST_SOURCE,
+             "-frames:v", str(TEST_FRAMES)] + profile.video_args(settings) + ["-f", "null", "-"])
+
+
+def test_backend(profile, ffmpeg="ffmpeg"):
+    start = time.monotonic()
+    try:
+        result = subprocess.run(test_command(profile, ffmpeg), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                universal_newlines=True, errors="replace", timeout=TEST_TIMEOUT,
+                                startupinfo=hidden_startupinfo())
+    except subprocess.TimeoutExpired:
+        return BackendTest(profile.name, False, error=f"no result within {TEST_TIMEOUT}s")
+    except OSError as e:
+        return BackendTest(profile.name, False, error=str(e))
+    seconds = time.monotonic() - start
+    if result.returncode != 0:
+        lines = [line for line in result.stderr.splitlines() if line.strip()]
+        return BackendTest(profile.name, False, error=lines[-1].strip() if lines else f"exit code {result.returncode}")
+    return BackendTest(profile.name, True, seconds)
+
+
+def candidate_profiles(tools):
+    """Registered profiles whose encoder this ffmpeg was built with."""
+    return [profile for profile in PROFILES.values() if profile.encoder in tools.encoders]
+
+
+def _ranked(tests):
+    # Working backends fastest first, then untested ones in registry order, then those that failed
+    return sorted(tests, key=lambda test: (test.works is not True, test.works is False, -test.fps))
+
+
+def untested_ranking(tools):
+    """What rank_backends() can say without running anything: hardware profiles first.
+
+    For callers that cannot wait for the test encodes; the fallback retries
+    still catch a backend that does not work.
+    """
+    profiles = sorted(candidate_profiles(tools), key=lambda profile: not profile.hardware)
+    return [BackendTest(profile.name, None) for profile in profiles]
+
+
+def default_backends_cache():
+    return os.path.join(user_cache_dir(), "backends.json")
+
+
+def rank_backends(tools, cache_path=None, refresh=False):
+    """Test every profile this ffmpeg has an encoder for; the results, fastest working backend first.
+
+    Each candidate encodes TEST_FRAMES frames of a lavfi test pattern, so a
+    GPU encoder that is compiled in but has no device or driver behind it is
+    found out here instead of on the first real file. Results are cached in
+    cache_path (default: backends.json in the user cache) for TEST_MAX_AGE
+    seconds, as long as ffmpeg is the same binary; pass "" to disable the
+    cache.
+    """
+    if not tools.found:
+        return []
+    if cache_path is None:
+        cache_path = default_backends_cache()
+    candidates = candidate_profiles(tools)
+    names = [profile.name for profile in candidates]
+    cached = load_cache(cache_path) if cache_path and not refresh else None
+    if (cached is not None and cached.get("signatures") == tools.signatures and cached.get("profiles") == names
+            and time.time() - cached.get("tested_at", 0) < TEST_MAX_AGE):
+        return [BackendTest(**test) for test in cached["results"]]
+
+    # One at a time: tests running side by side would slow each other down and skew the ranking
+    tests = _ranked([test_backend(profile, tools.ffmpeg) for profile in candidates])
+    if cache_path:
+        save_cache(cache_path, {"cache_version": CACHE_VERSION, "signatures": tools.signatures, "profiles": names,
+                                "tested_at": time.time(), "results": [vars(test) for test in tests]})
+    return tests
+
+
+def best_profile(ranking):
+    """Name of the first usable backend in ranking (tested or not), None if there is none."""
+    return next((test.profile for test in ranking if test.works is not False), None)
+
+
+def fallback_profiles(profile_name, ranking):
+    """Usable backends to retry on after profile_name fails, best first.
+
+    Only backends for the same codec: a fallback changes how a file is
+    encoded, not what the user gets.
+    """
+    codec = PROFILES[profile_name].codec
+    return [test.profile for test in ranking
+            if test.works is not False and test.profile != profile_name and PROFILES[test.profile].codec == codec]
+
+
+def describe_ranking(ranking):
+    return "; ".join(test.describe() for test in ranking) or "no encoder profiles available"
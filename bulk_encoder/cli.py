@@ -0,0 +1,469 @@
+import argparse
+import glob
+import logging
+import os
+import shlex
+import sys
+import threading
+import time
+
+from .backends import best_profile, describe_ranking, rank_backends
+from .cluster import Coordinator, CoordinatorGone, TokenRejected, Worker, coordinator_url, parse_address
+from .concurrency import AUTO, is_auto
+from .core import (BatchEncoder, EncodeSettings, RUNNING, PAUSED, RESUMING, DONE, CANCELED, SKIPPED, bitrate_modes,
+                   output_formats)
+from .journal import JobJournal
+from .ladder import parse_ladder
+from .metrics import WRITERS, write_report
+from .profiles import PROFILES, get_profile
+from .resources import CPU_PLANS, PLAN_OFF
+from .scan import find_videos, path_key
+from .tools import discover_tools
+from .watch import WatchDaemon, WatchRule, load_rules
+
+
+def expand_inputs(patterns):
+    """Expand files, glob patterns and folders (searched for videos) into a de-duplicated list of files, keeping order."""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        elif os.path.isdir(pattern):
+            matches = find_videos(pattern)
+        else:
+            matches = [pattern]
+        for path in matches:
+            key = path_key(path)
+            if key not in seen and os.path.isfile(path):
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+def profile_arg(value):
+    return AUTO if is_auto(value) else value
+
+
+def simultaneous_encodes_arg(value):
+    if is_auto(value):
+        return AUTO
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError("expected a positive number or 'auto'")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m bulk_encoder",
+        description="Encode video files with ffmpeg without the GUI.")
+    parser.add_argument("inputs", nargs="*", metavar="FILE",
+                        help="input files, folders (searched recursively for videos) or glob patterns "
+                        "(quote globs to use ** recursion)")
+    parser.add_argument("-o", "--output-folder", default=".", help="folder for encoded files (default: current folder)")
+    parser.add_argument("--profile", "--hwaccel", dest="profile", type=profile_arg,
+                        choices=list(PROFILES) + [AUTO],
+                        default="Nvidia_Cuda_h264",
+                        help="encoder profile, or 'auto' for the fastest one that works on this host "
+                             "(default: Nvidia_Cuda_h264; CPU_x264, CPU_x265 and CPU_SVT_AV1 need no GPU)")
+    parser.add_argument("--no-fallback", dest="fallback", action="store_false",
+                        help="do not retry a failed file on another backend for the same codec")
+    parser.add_argument("--test-encoders", action="store_true",
+                        help="test every encoder profile on this host, list the working ones fastest first and exit")
+    parser.add_argument("--preset", default="medium",
+                        help="slow, medium, fast or a preset native to the profile's encoder (default: medium)")
+    parser.add_argument("--bitrate", default="1M", help="target bitrate in CBR mode (default: 1M)")
+    parser.add_argument("--bitrate-mode", choices=bitrate_modes, default="CBR")
+    parser.add_argument("--crf", default="23", help="quality level in CRF mode (default: 23)")
+    parser.add_argument("--min-bitrate", default="1M", help="minimum bitrate in VBR mode (default: 1M)")
+    parser.add_argument("--max-bitrate", default="2M", help="maximum bitrate in VBR mode (default: 2M)")
+    parser.add_argument("--format", dest="output_format", choices=output_formats, default="mp4")
+    parser.add_argument("-j", "--simultaneous-encodes", type=simultaneous_encodes_arg, default=1, metavar="N",
+                        help="number of files to encode at once, or 'auto' to tune it to the host (default: 1)")
+    parser.add_argument("--split-longer-than", type=float, default=0, metavar="SECONDS",
+                        help="encode inputs at least this long as parallel segments joined afterwards (default: off)")
+    parser.add_argument("--renditions", default="", metavar="LADDER",
+                        help="write several sizes of every input from a single decode, e.g. "
+                             "1080:8M,720:4M,480:1500k (HEIGHT[:BITRATE[:PROFILE]], comma separated)")
+    parser.add_argument("--cpu-plan", choices=CPU_PLANS, default=PLAN_OFF,
+                        help="share the cores between simultaneous CPU encodes: 'threads' gives each encode its share "
+                             "of threads, 'pin' also pins it to its own cores (default: off, ffmpeg's own threading)")
+    parser.add_argument("--background", action="store_true",
+                        help="run ffmpeg at low CPU and I/O priority (nice 10, idle I/O class)")
+    parser.add_argument("--no-remux", dest="remux", action="store_false",
+                        help="re-encode every file, even those already in the target codec and bitrate")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="encode every file, even those the journal shows are already done")
+    parser.add_argument("--journal", help="job journal database (default: journal.sqlite3 in the user cache)")
+    parser.add_argument("--metrics", action="append", default=[], metavar="FILE",
+                        help="write per-file and batch metrics to FILE; .json, .csv or .prom (Prometheus "
+                             "textfile collector) by extension; can be given more than once")
+    parser.add_argument("--watch", action="append", default=[], metavar="FOLDER",
+                        help="keep running and encode files as they finish arriving in FOLDER (repeatable); "
+                             "outputs go to --output-folder")
+    parser.add_argument("--watch-rules", metavar="JSON",
+                        help="watch folders listed in a JSON file, each with its own output folder, profile "
+                             "and settings")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="act as coordinator: hand the input files to worker agents instead of encoding here; "
+                             "listens on 127.0.0.1 unless a host is given (0.0.0.0 for every interface)")
+    parser.add_argument("--transfer", action="store_true",
+                        help="with --serve, send inputs and outputs over HTTP instead of using shared paths")
+    parser.add_argument("--worker", metavar="URL",
+                        help="act as a worker agent for the coordinator at URL, with -j slots; the encoding "
+                             "settings (--profile and the like) come from the coordinator")
+    parser.add_argument("--token", default=os.environ.get("BULK_ENCODER_TOKEN"),
+                        help="shared secret between the coordinator and its workers (default: $BULK_ENCODER_TOKEN); "
+                             "--serve makes one up if not given, --worker needs it")
+    parser.add_argument("--settle-seconds", type=float, default=5.0,
+                        help="in watch mode, how long a file's size and mtime must stay unchanged (default: 5)")
+    parser.add_argument("--log-folder", help="folder for the per-file ffmpeg logs "
+                        "(default: a new timestamped folder under the user cache)")
+    parser.add_argument("--interactive", action="store_true",
+                        help="read job controls from stdin while encoding: add FILE..., list, pause N, resume N, "
+                             "cancel N, top N, up N, down N")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print job results")
+    return parser
+
+
+class ConsoleReporter:
+    """Prints job progress to stdout, at most once per second per job."""
+
+    def __init__(self, total, quiet=False):
+        self.total = total
+        self.quiet = quiet
+        self._last_print = {}
+        self._lock = threading.Lock()
+
+    def _print(self, job, message, file=None):
+        prefix = f"[{job.index + 1}/{self.total}] " if self.total else ""  # no total in watch mode
+        with self._lock:
+            print(f"{prefix}{os.path.basename(job.input_file)}: {message}", file=file, flush=True)
+
+    def batch_planned(self, plan):
+        if not self.quiet:
+            print(plan.describe(), flush=True)
+
+    def concurrency_changed(self, controller):
+        if not self.quiet and controller.adaptive:
+            print(controller.describe(), flush=True)
+
+    def job_started(self, job):
+        if self.quiet:
+            return
+        if job.failed_profiles:
+            self._print(job, f"{job.failed_profiles[-1]} failed, retrying on {job.profile}")
+        else:
+            self._print(job, "started")
+
+    def progress(self, job):
+        if self.quiet:
+            return
+        now = time.monotonic()
+        if now - self._last_print.get(job.input_file, 0) < 1:
+            return
+        self._last_print[job.input_file] = now
+        message = f"frame={job.frames}"
+        if job.total_frames:
+            message += f"/{job.total_frames} ({job.progress:.0%})"
+        message += f" fps={job.fps:.1f} speed={job.speed:.2f}x size={job.total_size / 1048576:.1f}MB elapsed={int(job.elapsed)}s"
+        if job.eta is not None:
+            message += f" eta={int(job.eta)}s"
+        if job.renditions:
+            message += " [" + " ".join(f"{output.rendition.name} {output.size / 1048576:.1f}MB"
+                                       for output in job.renditions) + "]"
+        self._print(job, message)
+
+    def error(self, job, message):
+        self._print(job, message, file=sys.stderr)
+
+    def job_finished(self, job):
+        if job.state == DONE:
+            action = "remuxed" if job.remux else "done"
+            if job.failed_profiles:
+                action += f" on {job.profile}"
+            outputs = ", ".join(output.output_file for output in job.renditions) or job.output_file
+            self._print(job, f"{action} in {int(job.elapsed)}s -> {outputs}")
+        elif job.state == SKIPPED:
+            self._print(job, f"skipped, already encoded -> {job.output_file}")
+        elif job.state == CANCELED:
+            self._print(job, "canceled")
+        else:
+            reason = job.log_tail[-1] if job.log_tail else ""
+            self._print(job, f"failed (ffmpeg exit code {job.returncode}) {reason}")
+            self._print(job, f"log: {job.log_file}")
+
+
+CONTROL_HELP = ("Commands: add FILE..., list, pause N, resume N, cancel N, top N (start next), up N, down N "
+                "(N is the file's number)")
+
+
+def print_jobs(encoder):
+    for job in encoder.jobs:
+        if job.state in (RUNNING, RESUMING) or (job.state == PAUSED and job.queue_position is None):
+            print(f"[{job.index + 1}] {os.path.basename(job.input_file)}: {job.state} {job.progress:.0%}")
+    for job in encoder.queued_jobs():
+        held = " (held)" if job.state == PAUSED else ""
+        print(f"  queued #{job.queue_position}: [{job.index + 1}] {os.path.basename(job.input_file)}{held}")
+
+
+def read_controls(encoder, stream, reporter):
+    """--interactive: apply the job controls typed on stream until it closes."""
+    controls = {"pause": encoder.pause, "resume": encoder.resume, "cancel": encoder.cancel_job,
+                "top": encoder.move_to_front, "up": lambda job: encoder.move_job(job, -1),
+                "down": lambda job: encoder.move_job(job, 1)}
+    for line in stream:
+        try:
+            words = shlex.split(line)
+        except ValueError:
+            words = ["help"]
+        if not words:
+            continue
+        if words[0] == "list":
+            print_jobs(encoder)
+            continue
+        if words[0] == "add":
+            queued = {path_key(job.input_file) for job in list(encoder.jobs)}
+            input_files = [path for path in expand_inputs(words[1:]) if path_key(path) not in queued]
+            try:
+                jobs = encoder.add_files(input_files)
+            except RuntimeError as e:
+                print(e, flush=True)
+                continue
+            reporter.total += len(jobs)
+            print(f"{len(jobs)} file(s) added", flush=True)
+            continue
+        control = controls.get(words[0])
+        try:
+            jobs = [encoder.jobs[int(word) - 1] for word in words[1:]]
+        except (ValueError, IndexError):
+            jobs = []
+        if control is None or not jobs or any(int(word) < 1 for word in words[1:]):
+            print(CONTROL_HELP, flush=True)
+            continue
+        for job in jobs:
+            control(job)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # The library modules report problems that do not stop a batch (a file ffprobe cannot read, an
+    # unwritable cache) through logging; they go to stderr, keeping stdout for progress and reports
+    logging.basicConfig(format="%(message)s", level=logging.WARNING)
+    if args.test_encoders:
+        return test_encoders()
+
+    for path in args.metrics:
+        if os.path.splitext(path)[1].lower() not in WRITERS:
+            print(f"Unknown metrics format for {path} (use .json, .csv or .prom)", file=sys.stderr)
+            return 2
+
+    if args.worker:
+        return work(args)  # the coordinator's settings apply; this host's --profile and the like do not
+
+    ranking = None
+    if is_auto(args.profile):
+        ranking = rank_backends(discover_tools())
+        args.profile = best_profile(ranking)
+        if args.profile is None:
+            print(f"No working encoder found: {describe_ranking(ranking)}", file=sys.stderr)
+            return 2
+        if not args.quiet:
+            print(f"Encoding with {args.profile} ({describe_ranking(ranking)})", flush=True)
+
+    settings = EncodeSettings(
+        args.output_folder,
+        preset=args.preset,
+        bitrate=args.bitrate,
+        bitrate_mode=args.bitrate_mode,
+        min_bitrate=args.min_bitrate,
+        max_bitrate=args.max_bitrate,
+        output_format=args.output_format,
+        profile=args.profile,
+        crf=args.crf,
+        simultaneous_encodes=args.simultaneous_encodes,
+        log_folder=args.log_folder,
+        segment_min_duration=args.split_longer_than,
+        resume=args.resume,
+        remux=args.remux,
+        renditions=args.renditions,
+        cpu_plan=args.cpu_plan,
+        background=args.background,
+        fallback=args.fallback,
+    )
+    try:
+        get_profile(args.profile).resolve_preset(args.preset)
+        for rendition in parse_ladder(args.renditions):
+            get_profile(rendition.profile or args.profile).resolve_preset(args.preset)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.watch or args.watch_rules:
+        return watch(args, settings)
+
+    input_files = expand_inputs(args.inputs)
+    if not input_files:
+        print("No input files found.", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_folder, exist_ok=True)
+    if args.serve:
+        return serve(args, settings, input_files)
+
+    encoder = BatchEncoder(input_files, settings, journal=JobJournal(args.journal) if args.journal else None,
+                           backend_ranking=ranking)
+    reporter = ConsoleReporter(len(input_files), quiet=args.quiet)
+    encoder.on_batch_planned = reporter.batch_planned
+    encoder.on_concurrency_changed = reporter.concurrency_changed
+    encoder.on_job_started = reporter.job_started
+    encoder.on_progress = reporter.progress
+    encoder.on_job_finished = reporter.job_finished
+    encoder.on_error = reporter.error
+    if args.interactive:
+        print(CONTROL_HELP, flush=True)
+        threading.Thread(target=read_controls, args=(encoder, sys.stdin, reporter), name="job-controls", daemon=True).start()
+
+    start = time.monotonic()
+    try:
+        failed = encoder.run()
+    except KeyboardInterrupt:
+        encoder.cancel()
+        print("Encoding canceled.", file=sys.stderr)
+        return 130
+
+    total = len(encoder.jobs)  # with the files added while it ran
+    skipped = sum(1 for job in encoder.jobs if job.state == SKIPPED)
+    summary = f"{total - failed}/{total} files encoded in {time.monotonic() - start:.1f}s"
+    print(summary + (f" ({skipped} already done, skipped)" if skipped else ""))
+    remuxed = sum(1 for job in encoder.jobs if job.remux and job.state == DONE)
+    if remuxed:
+        print(f"{remuxed} file(s) remuxed, {total - failed - skipped - remuxed} re-encoded")
+    for path in args.metrics:
+        try:
+            write_report(path, encoder.jobs, encoder.wall_seconds)
+        except OSError as e:
+            print(f"Could not write metrics to {path}: {e}", file=sys.stderr)
+    if encoder.concurrency.adaptive and encoder.concurrency.history:
+        print(f"Concurrency measurements: {encoder.concurrency.describe_history()}")
+    return 1 if failed else 0
+
+
+def test_encoders():
+    """--test-encoders: run the backend tests afresh and print the results."""
+    tools = discover_tools()
+    if not tools.found:
+        print("ffmpeg and ffprobe were not found.", file=sys.stderr)
+        return 2
+    print(tools.version)
+    ranking = rank_backends(tools, refresh=True)
+    for test in ranking:
+        print(test.describe())
+    return 0 if best_profile(ranking) else 1
+
+
+def watch(args, settings):
+    """Watch mode: encode files as they arrive until interrupted."""
+    if args.simultaneous_encodes == AUTO:
+        print("-j auto is not supported in watch mode; give a number of simultaneous encodes", file=sys.stderr)
+        return 2
+    rules = [WatchRule(folder, args.output_folder) for folder in args.watch]
+    try:
+        if args.watch_rules:
+            rules += load_rules(args.watch_rules)
+        missing = [rule.folder for rule in rules if not os.path.isdir(rule.folder)]
+        if missing:
+            raise ValueError(f"Not a folder: {', '.join(missing)}")
+        daemon = WatchDaemon(rules, settings, max_workers=args.simultaneous_encodes,
+                             settle_seconds=args.settle_seconds,
+                             journal=JobJournal(args.journal) if args.journal else None)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Invalid watch setup: {e}", file=sys.stderr)
+        return 2
+
+    reporter = ConsoleReporter(None, quiet=args.quiet)
+
+    def attach(encoder):
+        encoder.on_job_started = reporter.job_started
+        encoder.on_progress = reporter.progress
+        encoder.on_job_finished = reporter.job_finished
+        encoder.on_error = reporter.error
+
+    daemon.on_encoder_created = attach
+    daemon.on_file_ready = lambda path, rule: print(f"{os.path.basename(path)}: ready -> {rule.output_folder}",
+                                                    flush=True)
+    for rule in rules:
+        print(f"Watching {rule.folder} -> {rule.output_folder} ({daemon.settings[rule].profile})")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+        print("Watch stopped.", file=sys.stderr)
+    return 0
+
+
+def serve(args, settings, input_files):
+    """Coordinator mode: workers pull the jobs; returns once every file is finished."""
+    host, port = parse_address(args.serve)
+    try:
+        coordinator = Coordinator(input_files, settings, host, port, transfer=args.transfer,
+                                  journal=JobJournal(args.journal) if args.journal else None, token=args.token)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"Could not listen on {host}:{port}: {e}", file=sys.stderr)
+        return 2
+    reporter = ConsoleReporter(len(input_files), quiet=args.quiet)
+    coordinator.on_job_started = reporter.job_started
+    coordinator.on_progress = reporter.progress
+    coordinator.on_job_finished = reporter.job_finished
+    coordinator.on_worker_changed = lambda message: print(message, flush=True)
+    print(f"Coordinator for {len(input_files)} file(s) listening on {coordinator.url}; "
+          f"start workers with: python -m bulk_encoder --worker {coordinator.url} --token {coordinator.token} -j N",
+          flush=True)
+
+    start = time.monotonic()
+    coordinator.start()
+    try:
+        failed = coordinator.wait()
+    except KeyboardInterrupt:
+        coordinator.cancel()
+        print("Canceling; waiting for workers to stop...", file=sys.stderr)
+        coordinator.wait(coordinator.lease_seconds)
+        coordinator.shutdown(linger=0)
+        return 130
+    coordinator.shutdown()
+    print(f"{len(input_files) - failed}/{len(input_files)} files encoded in {time.monotonic() - start:.1f}s")
+    for path in args.metrics:
+        try:
+            write_report(path, coordinator.jobs, time.monotonic() - start)
+        except OSError as e:
+            print(f"Could not write metrics to {path}: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def work(args):
+    """Worker mode: encode jobs from a coordinator until its batch is done."""
+    if not args.token:
+        print("--worker needs the coordinator's --token (or BULK_ENCODER_TOKEN)", file=sys.stderr)
+        return 2
+    slots = args.simultaneous_encodes if args.simultaneous_encodes != AUTO else os.cpu_count() or 1
+    worker = Worker(coordinator_url(args.worker), args.token, slots=slots)
+    worker.on_message = lambda text: print(text, flush=True)
+    try:
+        worker.run()
+    except TokenRejected:
+        print(f"The coordinator at {args.worker} did not accept the token", file=sys.stderr)
+        return 2
+    except CoordinatorGone:
+        print(f"The coordinator at {args.worker} is not reachable", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        worker.stop()
+        print("Worker stopped.", file=sys.stderr)
+        return 130
+    return 0
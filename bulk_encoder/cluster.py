@@ -0,0 +1,605 @@
+import hmac
+import json
+import os
+import secrets
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import error as urlerror
+from urllib import request as urlrequest
+from urllib.parse import parse_qs, urlparse
+
+from .backends import rank_backends
+from .core import BatchEncoder, EncodeSettings, make_job
+from .journal import JobJournal
+from .profiles import get_profile
+from .resources import CpuPlanner
+from .states import QUEUED, RUNNING, DONE, FAILED, CANCELED, SKIPPED
+from .tools import discover_tools
+
+LEASE_SECONDS = 30  # a worker that is silent this long is presumed dead and its jobs are re-queued
+HEARTBEAT_SECONDS = 2
+MAX_ATTEMPTS = 3  # leases a job may lose before it is marked failed
+PROGRESS_FIELDS = ("frames", "fps", "out_time", "total_size", "speed")
+CHUNK_BYTES = 1 << 20
+DEFAULT_HOST = "127.0.0.1"  # this machine only; workers elsewhere need an explicit host to listen on
+TOKEN_HEADER = "X-Bulk-Encoder-Token"  # every request carries the coordinator's shared token
+
+
+def available_encoders(ranking):
+    """Encoders of the profiles that passed their test encode on this host (see bulk_encoder.backends)."""
+    return sorted({get_profile(test.profile).encoder for test in ranking if test.works})
+
+
+class Lease:
+    """A job handed to a worker; valid while the worker keeps sending heartbeats."""
+
+    def __init__(self, worker_id, lease_seconds):
+        self.worker_id = worker_id
+        self.token = uuid.uuid4().hex
+        self.lease_seconds = lease_seconds
+        self.renew()
+
+    def renew(self):
+        self.expires = time.monotonic() + self.lease_seconds
+
+    @property
+    def expired(self):
+        return time.monotonic() > self.expires
+
+
+class Coordinator:
+    """Owns the job queue of a batch and hands jobs to worker agents over HTTP.
+
+    Protocol (JSON bodies, POST unless noted):
+
+        /register   {name, slots, encoders}         -> {worker_id, heartbeat_seconds}
+        /lease      {worker_id}                     -> {job} | {job: null, done}
+        /heartbeat  {worker_id, progress: {id: {...}}} -> {cancel: [job ids]}
+        /finish     {worker_id, job_id, lease, state, returncode, log_tail}
+        GET /status
+        GET /jobs/<id>/input, PUT /jobs/<id>/output  (only with transfer=True)
+
+    Every request must carry the shared token in the TOKEN_HEADER header;
+    others get 401. The token is made up here unless one is given.
+
+    Inputs and outputs are either on paths every worker can reach (shared
+    storage, the default) or, with transfer=True, streamed through the
+    coordinator. Jobs of workers that stop sending heartbeats are re-queued.
+    """
+
+    def __init__(self, input_files, settings, host=DEFAULT_HOST, port=8765, lease_seconds=LEASE_SECONDS,
+                 transfer=False, journal=None, max_attempts=MAX_ATTEMPTS, token=None):
+        if transfer and settings.renditions:
+            raise ValueError("Rendition ladders need shared paths; they can't be used with transfer")
+        self.settings = settings
+        self.token = token or secrets.token_urlsafe(16)
+        self.transfer = transfer
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.journal = journal if journal is not None else JobJournal()
+        self.jobs = [make_job(i, input_file, settings) for i, input_file in enumerate(input_files)]
+        self.encoder = get_profile(settings.profile).encoder
+        self.workers = {}  # worker id -> registration info plus "last_seen"
+        self._leases = {}  # job index -> Lease
+        self._attempts = {}  # job index -> leases lost so far
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._canceled = False
+        self.on_job_started = None
+        self.on_progress = None
+        self.on_job_finished = None
+        self.on_worker_changed = None  # (message)
+
+        handler = type("CoordinatorHandler", (CoordinatorHandler,), {"coordinator": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        if host in ("0.0.0.0", "::"):
+            host = socket.gethostname()
+        return f"http://{host}:{port}"
+
+    def _emit(self, callback, *args):
+        if callback is not None:
+            callback(*args)
+
+    def start(self):
+        """Queue the jobs and start serving in the background."""
+        for job in self.jobs:
+            if self.settings.resume and self.journal.is_complete(job):
+                job.state = SKIPPED
+                self._emit(self.on_job_finished, job)
+            else:
+                job.queued_time = datetime.now()
+                self._queue.append(job)
+        if not self._queue:
+            self._finished.set()
+        threading.Thread(target=self.server.serve_forever, name="coordinator", daemon=True).start()
+        threading.Thread(target=self._reap_leases, name="lease-reaper", daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Block until every job has finished; returns the number of jobs that did not succeed."""
+        self._finished.wait(timeout)
+        return sum(1 for job in self.jobs if job.state not in (DONE, SKIPPED))
+
+    def shutdown(self, linger=None):
+        """Stop serving, after giving polling workers `linger` seconds to learn the batch is over."""
+        time.sleep(HEARTBEAT_SECONDS * 2 if linger is None else linger)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run(self):
+        self.start()
+        try:
+            return self.wait()
+        finally:
+            self.shutdown()
+
+    def cancel(self):
+        """Cancel the batch; workers stop their jobs at their next heartbeat."""
+        with self._lock:
+            self._canceled = True
+            canceled = list(self._queue)
+            self._queue.clear()
+            for job in canceled:
+                job.state = CANCELED
+        for job in canceled:
+            self._emit(self.on_job_finished, job)
+        self._check_finished()
+
+    def _check_finished(self):
+        with self._lock:
+            if not self._queue and not self._leases:
+                self._finished.set()
+
+    # Protocol handlers; each returns (HTTP status, JSON payload)
+
+    def register(self, body):
+        worker_id = uuid.uuid4().hex
+        encoders = body.get("encoders") or []
+        info = {"name": body.get("name") or worker_id[:8], "slots": int(body.get("slots") or 1),
+                "encoders": encoders, "last_seen": time.monotonic()}
+        with self._lock:
+            self.workers[worker_id] = info
+        message = f"worker {info['name']} joined with {info['slots']} slot(s)"
+        if self.encoder not in encoders:
+            message += f", but has no {self.encoder}; it gets no jobs"
+        self._emit(self.on_worker_changed, message)
+        return 200, {"worker_id": worker_id, "heartbeat_seconds": HEARTBEAT_SECONDS,
+                     "lease_seconds": self.lease_seconds}
+
+    def lease(self, body):
+        worker_id = body.get("worker_id")
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return 404, {"error": "unknown worker, register again"}
+            worker["last_seen"] = time.monotonic()
+            if self.encoder not in worker["encoders"]:
+                return 200, {"job": None, "done": True, "reason": f"this worker has no {self.encoder}"}
+            if not self._queue:
+                return 200, {"job": None, "done": self._finished.is_set() or self._canceled}
+            job = self._queue.popleft()
+            lease = self._leases[job.index] = Lease(worker_id, self.lease_seconds)
+            job.state = RUNNING
+            job.start_time = datetime.now()
+            job.end_time = None
+        self.journal.record_started(job)
+        self._emit(self.on_job_started, job)
+        return 200, {"job": self._job_message(job, lease)}
+
+    def _job_message(self, job, lease):
+        settings = dict(vars(self.settings))
+        message = {"job_id": job.index, "lease": lease.token, "input_name": os.path.basename(job.input_file),
+                   "settings": settings}
+        if self.transfer:
+            query = f"?lease={lease.token}"
+            message["input_url"] = f"/jobs/{job.index}/input{query}"
+            message["output_url"] = f"/jobs/{job.index}/output{query}"
+        else:
+            message["input_file"] = os.path.abspath(job.input_file)
+            settings["output_folder"] = os.path.abspath(self.settings.output_folder)
+        return message
+
+    def heartbeat(self, body):
+        worker_id = body.get("worker_id")
+        cancel = []
+        updated = []
+        with self._lock:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return 404, {"error": "unknown worker, register again"}
+            worker["last_seen"] = time.monotonic()
+            for job_id, progress in (body.get("progress") or {}).items():
+                job_id = int(job_id)
+                lease = self._leases.get(job_id)
+                if lease is None or lease.worker_id != worker_id or self._canceled:
+                    cancel.append(job_id)  # re-queued elsewhere, or the batch was canceled
+                    continue
+                lease.renew()
+                job = self.jobs[job_id]
+                for name in PROGRESS_FIELDS:
+                    setattr(job, name, progress.get(name, getattr(job, name)))
+                if progress.get("probe") and job.probe is None:
+                    job.set_probe(progress["probe"])
+                updated.append(job)
+        for job in updated:
+            self._emit(self.on_progress, job)
+        return 200, {"cancel": cancel}
+
+    def finish(self, body):
+        job_id = int(body.get("job_id", -1))
+        with self._lock:
+            lease = self._leases.get(job_id)
+            if lease is None or lease.token != body.get("lease"):
+                return 409, {"error": "lease no longer held"}
+            del self._leases[job_id]
+            job = self.jobs[job_id]
+            job.state = body.get("state") if body.get("state") in (DONE, FAILED, CANCELED) else FAILED
+            job.returncode = body.get("returncode")
+            job.remux = bool(body.get("remux"))
+            job.log_tail.extend(body.get("log_tail") or [])
+            job.end_time = datetime.now()
+        if self.transfer:
+            self._place_upload(job)
+        self.journal.record_finished(job)
+        self._emit(self.on_job_finished, job)
+        self._check_finished()
+        return 200, {}
+
+    def _place_upload(self, job):
+        if job.state == DONE:
+            try:
+                os.replace(job.temp_output, job.output_file)
+            except OSError as e:
+                job.log_tail.append(f"Could not move the uploaded output into place: {e}")
+                job.state = FAILED
+        elif os.path.exists(job.temp_output):
+            os.remove(job.temp_output)
+
+    def status(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs:
+                counts[job.state] = counts.get(job.state, 0) + 1
+            workers = [{"name": w["name"], "slots": w["slots"],
+                        "jobs": sum(1 for lease in self._leases.values() if lease.worker_id == worker_id)}
+                       for worker_id, w in self.workers.items()]
+        return 200, {"jobs": counts, "workers": workers, "finished": self._finished.is_set()}
+
+    def leased_job(self, job_id, token):
+        """The job if token is its current lease (for file transfers), else None."""
+        with self._lock:
+            lease = self._leases.get(job_id)
+            return self.jobs[job_id] if lease is not None and lease.token == token else None
+
+    def _reap_leases(self):
+        """Re-queue the jobs of workers that stopped sending heartbeats."""
+        while not self._finished.wait(1.0):
+            requeued, failed, gone = [], [], []
+            with self._lock:
+                for job_id, lease in list(self._leases.items()):
+                    if not lease.expired:
+                        continue
+                    del self._leases[job_id]
+                    job = self.jobs[job_id]
+                    self._attempts[job_id] = self._attempts.get(job_id, 0) + 1
+                    if self._attempts[job_id] >= self.max_attempts or self._canceled:
+                        job.state = FAILED if not self._canceled else CANCELED
+                        job.log_tail.append(f"Lost {self._attempts[job_id]} worker lease(s)")
+                        job.end_time = datetime.now()
+                        failed.append(job)
+                    else:
+                        job.state = QUEUED
+                        job.frames = 0
+                        self._queue.appendleft(job)  # it was started first, so it goes first again
+                        requeued.append(job)
+                now = time.monotonic()
+                for worker_id, worker in list(self.workers.items()):
+                    if now - worker["last_seen"] > self.lease_seconds:
+                        gone.append(self.workers.pop(worker_id)["name"])
+            for name in gone:
+                self._emit(self.on_worker_changed, f"worker {name} stopped responding")
+            for job in requeued:
+                self._emit(self.on_worker_changed, f"{os.path.basename(job.input_file)} re-queued")
+            for job in failed:
+                self.journal.record_finished(job)
+                self._emit(self.on_job_finished, job)
+            if failed:
+                self._check_finished()
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    coordinator = None
+    routes = {"/register": "register", "/lease": "lease", "/heartbeat": "heartbeat", "/finish": "finish"}
+
+    def log_message(self, format, *args):
+        pass  # the console shows job progress, not every request
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        """True if the request has the coordinator's token; replies 401 otherwise."""
+        if hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode(), self.coordinator.token.encode()):
+            return True
+        self._reply(401, {"error": "missing or wrong token"})
+        return False
+
+    def _transfer_job(self):
+        """(job, direction) for /jobs/<id>/input|output?lease=..., or None after replying with an error."""
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if not self.coordinator.transfer or len(parts) != 3 or parts[0] != "jobs" or not parts[1].isdigit():
+            self._reply(404, {"error": "not found"})
+            return None
+        job = self.coordinator.leased_job(int(parts[1]), parse_qs(url.query).get("lease", [""])[0])
+        if job is None:
+            self._reply(409, {"error": "lease no longer held"})
+            return None
+        return job, parts[2]
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        name = self.routes.get(self.path)
+        if name is None:
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "invalid JSON"})
+            return
+        self._reply(*getattr(self.coordinator, name)(body))
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/status":
+            self._reply(*self.coordinator.status())
+            return
+        found = self._transfer_job()
+        if found is None:
+            return
+        job, direction = found
+        if direction != "input":
+            self._reply(404, {"error": "not found"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(job.input_file)))
+        self.end_headers()
+        with open(job.input_file, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_BYTES)
+
+    def do_PUT(self):
+        if not self._authorized():
+            return
+        found = self._transfer_job()
+        if found is None:
+            return
+        job, direction = found
+        if direction != "output":
+            self._reply(404, {"error": "not found"})
+            return
+        remaining = int(self.headers.get("Content-Length") or 0)
+        os.makedirs(os.path.dirname(job.temp_output) or ".", exist_ok=True)
+        with open(job.temp_output, "wb") as f:
+            while remaining > 0:
+                chunk = self.rfile.read(min(CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        self._reply(200 if remaining == 0 else 400, {"error": "upload truncated"} if remaining else {})
+
+
+class CoordinatorGone(Exception):
+    pass
+
+
+class TokenRejected(Exception):
+    pass
+
+
+class Worker:
+    """Agent that pulls jobs from a Coordinator and encodes them with the local ffmpeg.
+
+    Runs up to `slots` jobs at once, each through its own one-file
+    BatchEncoder, and reports progress with every heartbeat.
+    """
+
+    def __init__(self, url, token, slots=1, name=None, work_dir=None, give_up_seconds=60):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.slots = max(1, int(slots))
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.work_dir = work_dir or tempfile.gettempdir()
+        self.give_up_seconds = give_up_seconds
+        self.worker_id = None
+        self.heartbeat_seconds = HEARTBEAT_SECONDS
+        # A worker only offers encoders that work here, so it is not handed NVENC jobs it cannot run
+        self.backend_ranking = rank_backends(discover_tools())
+        self.encoders = available_encoders(self.backend_ranking)
+        self.cpu_planner = CpuPlanner(slots=self.slots)  # the slots' encodes divide this machine's cores
+        self._running = {}  # job id -> (message, BatchEncoder or None)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.on_message = None  # (text)
+
+    def _say(self, text):
+        if self.on_message is not None:
+            self.on_message(text)
+
+    def _call(self, path, body):
+        """POST JSON to the coordinator; retries until give_up_seconds, then raises CoordinatorGone.
+
+        Raises TokenRejected if the coordinator does not accept the token.
+        """
+        data = json.dumps(body).encode()
+        deadline = time.monotonic() + self.give_up_seconds
+        while True:
+            req = urlrequest.Request(self.url + path, data=data,
+                                     headers={"Content-Type": "application/json", TOKEN_HEADER: self.token})
+            try:
+                with urlrequest.urlopen(req, timeout=30) as response:
+                    return json.loads(response.read() or b"{}")
+            except urlerror.HTTPError as e:
+                if e.code == 401:
+                    raise TokenRejected(self.url)
+                if e.code == 404 and path != "/register":
+                    self._register()
+                    body = dict(body, worker_id=self.worker_id)
+                    data = json.dumps(body).encode()
+                    continue
+                return {"error": e.code}
+            except (urlerror.URLError, OSError):
+                if self._stop.is_set() or time.monotonic() > deadline:
+                    raise CoordinatorGone(self.url)
+                time.sleep(1)
+
+    def _register(self):
+        reply = self._call("/register", {"name": self.name, "slots": self.slots, "encoders": self.encoders})
+        self.worker_id = reply["worker_id"]
+        self.heartbeat_seconds = reply.get("heartbeat_seconds", HEARTBEAT_SECONDS)
+
+    def run(self):
+        """Work until the coordinator's batch is done (or it goes away)."""
+        self._register()
+        self._say(f"registered with {self.url} as {self.name}, {self.slots} slot(s)")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    free = self.slots - len(self._running)
+                if free <= 0:
+                    self._stop.wait(0.5)
+                    continue
+                reply = self._call("/lease", {"worker_id": self.worker_id})
+                message = reply.get("job")
+                if message is None:
+                    if reply.get("done"):
+                        if reply.get("reason"):
+                            self._say(reply["reason"])
+                        break
+                    self._stop.wait(1.0)
+                    continue
+                with self._lock:
+                    self._running[message["job_id"]] = (message, None)
+                threading.Thread(target=self._run_job, args=(message,), daemon=True).start()
+        except CoordinatorGone:
+            self._say(f"coordinator {self.url} is not reachable")
+        finally:
+            self._stop.set()
+            for _, encoder in self._snapshot():
+                if encoder is not None:
+                    encoder.cancel()
+            while self._snapshot():
+                time.sleep(0.2)
+
+    def stop(self):
+        self._stop.set()
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self._running.values())
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            progress = {}
+            for message, encoder in self._snapshot():
+                job = encoder.jobs[0] if encoder is not None else None
+                entry = {name: getattr(job, name) for name in PROGRESS_FIELDS} if job is not None else {}
+                if job is not None and job.probe:
+                    entry["probe"] = job.probe
+                progress[str(message["job_id"])] = entry
+            try:
+                reply = self._call("/heartbeat", {"worker_id": self.worker_id, "progress": progress})
+            except (CoordinatorGone, TokenRejected):
+                continue
+            for job_id in reply.get("cancel") or []:
+                with self._lock:
+                    running = self._running.get(job_id)
+                if running is not None and running[1] is not None:
+                    self._say(f"job {job_id} was taken away, canceling")
+                    running[1].cancel()
+
+    def _download(self, message, folder):
+        path = os.path.join(folder, message["input_name"])
+        req = urlrequest.Request(self.url + message["input_url"], headers={TOKEN_HEADER: self.token})
+        with urlrequest.urlopen(req, timeout=60) as response, open(path, "wb") as f:
+            shutil.copyfileobj(response, f, CHUNK_BYTES)
+        return path
+
+    def _upload(self, message, path):
+        with open(path, "rb") as f:
+            req = urlrequest.Request(self.url + message["output_url"], data=f, method="PUT",
+                                     headers={"Content-Length": str(os.path.getsize(path)), TOKEN_HEADER: self.token})
+            with urlrequest.urlopen(req, timeout=600):
+                pass
+
+    def _run_job(self, message):
+        job_id = message["job_id"]
+        folder = tempfile.mkdtemp(prefix=f"bulk_encoder_job{job_id}_", dir=self.work_dir)
+        state, returncode, log_tail, remux = FAILED, None, [], False
+        try:
+            settings = EncodeSettings(**message["settings"])
+            settings.simultaneous_encodes = 1
+            settings.log_folder = os.path.join(folder, "logs")
+            settings.resume = False  # the coordinator's journal decides what to skip
+            if "input_url" in message:
+                input_file = self._download(message, folder)
+                settings.output_folder = os.path.join(folder, "out")
+                os.makedirs(settings.output_folder, exist_ok=True)
+            else:
+                input_file = message["input_file"]
+            encoder = BatchEncoder([input_file], settings, journal=JobJournal(None), cpu_planner=self.cpu_planner,
+                                   backend_ranking=self.backend_ranking)
+            encoder.on_error = lambda job, text: self._say(f"{message['input_name']}: {text}")
+            with self._lock:
+                self._running[job_id] = (message, encoder)
+            self._say(f"encoding {message['input_name']}")
+            encoder.run()
+            job = encoder.jobs[0]
+            state, returncode, log_tail, remux = job.state, job.returncode, list(job.log_tail)[-5:], job.remux
+            if state == DONE and "output_url" in message:
+                self._upload(message, job.output_file)
+        except (OSError, ValueError, TypeError, urlerror.URLError) as e:
+            state, log_tail = FAILED, log_tail + [f"Worker {self.name}: {e}"]
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        try:
+            self._call("/finish", {"worker_id": self.worker_id, "job_id": job_id, "lease": message["lease"],
+                                   "state": state, "returncode": returncode, "log_tail": log_tail, "remux": remux})
+        except (CoordinatorGone, TokenRejected):
+            pass
+        self._say(f"{message['input_name']}: {state}")
+        with self._lock:
+            del self._running[job_id]
+
+
+def parse_address(value, default_port=8765):
+    """'host:port', ':port' or 'port' -> (host, port); the host defaults to DEFAULT_HOST (this machine only)."""
+    host, _, port = value.rpartition(":")
+    return host or DEFAULT_HOST, int(port or default_port)
+
+
+def coordinator_url(value):
+    return value if "://" in value else f"http://{value}"
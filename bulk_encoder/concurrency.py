@@ -0,0 +1,159 @@
+import os
+import time
+
+from .scheduler import REFERENCE_PIXELS
+
+AUTO = "auto"  # the Simultaneous Encodes or profile value that lets the encoder choose
+
+
+def is_auto(value):
+    """Whether a setting is AUTO, however it is capitalised ("Auto" in the window, "auto" on the command line)."""
+    return str(value).lower() == AUTO
+
+
+def job_throughput(job):
+    """Work rate of a running job in 1080p-realtime units (speed x pixels / 1080p)."""
+    info = job.probe
+    pixels = info["width"] * info["height"] if info else 0
+    return job.speed * (pixels / REFERENCE_PIXELS if pixels else 1.0)
+
+
+class CpuSampler:
+    """System-wide CPU utilisation between two calls, read from /proc/stat (None where unavailable)."""
+
+    def __init__(self):
+        self._last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open("/proc/stat") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+        return idle, sum(values)
+
+    def sample(self):
+        current = self._read()
+        last, self._last = self._last, current
+        if current is None or last is None or current[1] == last[1]:
+            return None
+        return 1.0 - (current[0] - last[0]) / (current[1] - last[1])
+
+
+class FixedConcurrency:
+    """The user's fixed number of simultaneous encodes."""
+
+    adaptive = False
+
+    def __init__(self, level):
+        self.level = max(1, int(level))
+        self.max_level = self.level
+
+    def sample(self, running_jobs):
+        pass
+
+    def job_finished(self):
+        """Called between jobs; returns True if the level changed."""
+        return False
+
+    def describe(self):
+        return f"{self.level} simultaneous encode(s)"
+
+
+class AdaptiveConcurrency:
+    """Hill-climbs the number of simultaneous encodes to maximise total throughput.
+
+    Starts low, measures the aggregate throughput (sum of realtime speed
+    weighted by resolution) and CPU use at the current level, and between
+    jobs tries one more encode while that keeps paying off. When a step
+    does not improve throughput by at least `tolerance` it steps back and
+    settles on the best level seen.
+    """
+
+    adaptive = True
+    warmup_seconds = 5  # ignore samples while newly started encodes spin up
+    min_window_seconds = 10  # measure at least this long before judging a level
+
+    def __init__(self, max_level=None, start_level=None, tolerance=0.05):
+        self.max_level = max(1, max_level or os.cpu_count() or 1)
+        self.level = max(1, min(start_level or 2, self.max_level))
+        self.tolerance = tolerance
+        self.settled = self.max_level == 1
+        self.history = {}  # level -> (throughput, output fps, cpu utilisation)
+        self._cpu = CpuSampler()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._samples = []
+
+    def sample(self, running_jobs):
+        """Record the current aggregate throughput of the running jobs."""
+        if time.monotonic() - self._window_start < self.warmup_seconds:
+            self._cpu.sample()
+            return
+        jobs = list(running_jobs)
+        throughput = sum(job_throughput(job) for job in jobs)
+        fps = sum(job.fps for job in jobs)
+        self._samples.append((throughput, fps, self._cpu.sample(), len(jobs)))
+
+    def _window_average(self):
+        # Only samples taken with every slot busy say something about this level
+        full = [s for s in self._samples if s[3] >= self.level] or self._samples
+        throughput = sum(s[0] for s in full) / len(full)
+        fps = sum(s[1] for s in full) / len(full)
+        cpu_values = [s[2] for s in full if s[2] is not None]
+        cpu = sum(cpu_values) / len(cpu_values) if cpu_values else None
+        return throughput, fps, cpu
+
+    def job_finished(self):
+        """Called between jobs; decides on the next level. Returns True if it changed."""
+        if self.settled or not self._samples:
+            return False
+        if time.monotonic() - self._window_start < self.warmup_seconds + self.min_window_seconds:
+            return False
+
+        self.history[self.level] = self._window_average()
+        previous = self.history.get(self.level - 1)
+        current = self.history[self.level]
+        cpu_saturated = current[2] is not None and current[2] > 0.97
+
+        if previous is not None and current[0] < previous[0] * (1 + self.tolerance):
+            # The last step up did not pay off: go back and stay there
+            self.level -= 1
+            self.settled = True
+        elif self.level < self.max_level and not (cpu_saturated and previous is not None):
+            self.level += 1
+        else:
+            self.settled = True
+            return False
+        self._reset_window()
+        return True
+
+    def describe(self):
+        state = "settled" if self.settled else "searching"
+        text = f"auto: {self.level} simultaneous encode(s), {state}"
+        measured = self.history.get(self.level)
+        if measured is not None:
+            throughput, fps, cpu = measured
+            text += f", {throughput:.2f}x realtime @1080p, {fps:.0f} fps"
+            if cpu is not None:
+                text += f", CPU {cpu:.0%}"
+        return text
+
+    def describe_history(self):
+        parts = []
+        for level in sorted(self.history):
+            throughput, fps, cpu = self.history[level]
+            cpu_text = f" CPU {cpu:.0%}" if cpu is not None else ""
+            parts.append(f"{level}: {throughput:.2f}x {fps:.0f}fps{cpu_text}")
+        return "; ".join(parts)
+
+
+def concurrency_for(value):
+    """Controller for a 'Simultaneous Encodes' value: a number, or 'auto'."""
+    if is_auto(value):
+        return AdaptiveConcurrency()
+    return FixedConcurrency(value)
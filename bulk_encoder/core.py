@@ -0,0 +1,951 @@
+import copy
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, InvalidStateError, wait
+from collections import deque
+from datetime import datetime
+from functools import partial
+
+from .concurrency import concurrency_for
+from .journal import JobJournal, temp_output_path
+from .ladder import RenditionOutput, ladder_command, parse_ladder, rendition_path
+from .metrics import BENCHMARK_ARGS, record_usage
+from .probe import ProbePool
+from .profiles import RATE_CONTROL_MODES, get_profile
+from .progress import PROGRESS_ARGS, ProgressParser
+from .remux import remux_blocker, remux_command
+from .resources import PLAN_OFF, PLAN_PIN, CpuPlanner, cpu_encoder_positions, limit_threads
+from .scheduler import SchedulePlan
+from .segments import SegmentedEncode, segment_count_for
+from .states import QUEUED, RUNNING, PAUSED, RESUMING, DONE, FAILED, CANCELED, SKIPPED
+from .system import user_cache_dir
+
+bitrate_num = "1M","2M","3M","4M","5M","6M","8M","10M","12M","14M","20M","30M","40M","50M"
+sel_preset = "slow", "medium", "fast"
+num_encodes = "1", "2", "3","4","5", "Auto"
+output_formats = "mp4", "mkv"
+bitrate_modes = RATE_CONTROL_MODES
+crf_values = "18", "20", "23", "26", "28", "30", "35"
+# "Split long files" choices: inputs at least this many seconds long are encoded in parallel segments (0: never)
+segment_thresholds = 0, 600, 1800, 3600
+LOG_TAIL_LINES = 20  # kept in memory per job for error messages; the log file has everything
+# Files a backend must fail (and another backend then encode) before the rest of the batch skips it;
+# one could be a quirk of that file, such as a pixel format the hardware encoder rejects
+DEMOTE_AFTER_FAILURES = 3
+
+
+class EncodeSettings:
+    """Plain encode options, shared by the GUI and the command line."""
+
+    def __init__(self, output_folder, preset="medium", bitrate="1M", bitrate_mode="CBR",
+                 min_bitrate="1M", max_bitrate="2M", output_format="mp4",
+                 profile="Nvidia_Cuda_h264", simultaneous_encodes=1, log_folder=None, crf="23",
+                 segment_min_duration=0, resume=True, remux=True, renditions="", cpu_plan=PLAN_OFF,
+                 background=False, fallback=True):
+        self.output_folder = output_folder
+        self.preset = preset
+        self.bitrate = bitrate
+        self.bitrate_mode = bitrate_mode
+        self.min_bitrate = min_bitrate
+        self.max_bitrate = max_bitrate
+        self.output_format = output_format
+        self.profile = profile  # name of a registered EncoderProfile
+        self.crf = crf
+        self.segment_min_duration = segment_min_duration
+        self.resume = resume  # skip inputs the journal shows were already encoded with these settings
+        self.remux = remux  # stream-copy inputs that already meet the target instead of re-encoding them
+        self.renditions = renditions  # ladder such as "1080:8M,720:4M,480:1500k"; empty for one output per input
+        self.cpu_plan = cpu_plan  # how CPU encodes share the cores: "off", "threads" or "pin" (see resources)
+        self.background = background  # run ffmpeg at low CPU and I/O priority
+        self.fallback = fallback  # retry a failed encode on the next working backend for the same codec
+        self.simultaneous_encodes = simultaneous_encodes  # a number, or "auto" to let the encoder choose
+        self.log_folder = log_folder  # None: a new timestamped folder under the user cache
+
+
+def output_path_for(input_file, settings):
+    """Output file for input_file: same base name, in the output folder, with the selected format."""
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(settings.output_folder, base_name + '.' + settings.output_format)
+
+
+def build_command(input_file, output_file, settings):
+    """Build the ffmpeg command line for one file from the selected encoder profile."""
+    profile = get_profile(settings.profile)
+    return (["ffmpeg", "-y"] + profile.input_args + ["-i", input_file]
+            + profile.video_args(settings) + ["-c:a", "copy", output_file])
+
+
+def make_job(index, input_file, settings):
+    """Job for input_file; with a rendition ladder, one job (one ffmpeg run) writes every rendition.
+
+    The ffmpeg command is not built here but each time the job asks for it
+    (see Job.command), so a queued job holds no more than its paths.
+    """
+    output_file = output_path_for(input_file, settings)
+    renditions = parse_ladder(settings.renditions)
+    if not renditions:
+        temp_output = temp_output_path(output_file)
+        job = Job(index, input_file, output_file, temp_output=temp_output)
+        job.command_builder = job.request_builder = partial(build_command, input_file, temp_output, settings)
+    else:
+        outputs = []
+        for rendition in renditions:
+            path = rendition_path(output_file, rendition)
+            outputs.append(RenditionOutput(rendition, path, temp_output_path(path)))
+        job = Job(index, input_file, outputs[0].output_file, temp_output=outputs[0].temp_output)
+        job.command_builder = job.request_builder = partial(ladder_command, input_file, outputs, settings)
+        job.renditions = outputs
+    job.profile = settings.profile
+    return job
+
+
+def default_log_folder():
+    """Timestamped folder for the per-job ffmpeg logs of one batch."""
+    return os.path.join(user_cache_dir(), "logs", datetime.now().strftime("%Y%m%d-%H%M%S"))
+
+
+def log_path_for(log_folder, index, input_file):
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(log_folder, f"{index + 1:05d}_{base_name}.log")
+
+
+class Job:
+    """One input file and the state of its encode.
+
+    Batches can hold 100k of these for their whole run, so the record is
+    kept small: __slots__, no ffmpeg command until one is asked for, and no
+    log tail until ffmpeg prints something.
+    """
+
+    __slots__ = ("index", "input_file", "output_file", "temp_output", "command_builder", "request_builder",
+                 "_command", "remux", "remux_reason", "profile", "failed_profiles", "cancel_requested",
+                 "queue_position", "renditions", "state", "returncode", "frames", "fps", "out_time", "total_size",
+                 "speed", "last_progress", "_log_tail", "log_file", "queued_time", "start_time", "end_time",
+                 "paused_at", "paused_seconds", "cpu_user", "cpu_system", "max_rss", "probe", "total_frames", "cost",
+                 "process", "segmented", "segment_count", "parent", "label")
+
+    def __init__(self, index, input_file, output_file, command=None, temp_output=None):
+        self.index = index
+        self.input_file = input_file
+        self.output_file = output_file
+        # ffmpeg writes here; moved to output_file once the encode succeeds
+        self.temp_output = temp_output if temp_output is not None else command[-1]
+        self.command_builder = None  # builds the command for the job's current backend (see make_job)
+        # ... and for the settings as requested; a fallback to another backend keeps it, so the
+        # journal recognises the output on the next run of the same batch
+        self.request_builder = None
+        self._command = command  # given outright (segment tasks), else built by command_builder
+        self.remux = False
+        self.remux_reason = None  # why the input could not simply be remuxed
+        self.profile = None  # name of the EncoderProfile the command was built for
+        self.failed_profiles = ()  # backends this job already failed on, before it moved to profile
+        self.cancel_requested = False  # this job alone was canceled (see BatchEncoder.cancel_job)
+        self.queue_position = None  # 1 for the next job to start, while the job waits in the queue
+        self.renditions = ()  # RenditionOutputs when the job encodes a ladder
+        self.state = QUEUED
+        self.returncode = None
+        self.frames = 0
+        self.fps = 0.0
+        self.out_time = 0.0
+        self.total_size = 0
+        self.speed = 0.0
+        self.last_progress = None
+        self._log_tail = None
+        self.log_file = None
+        self.queued_time = None  # when the job became ready to run; start_time - queued_time is its queue wait
+        self.start_time = None
+        self.end_time = None
+        self.paused_at = None  # when a started job was last paused, until it runs again
+        self.paused_seconds = 0.0  # time spent paused after starting; not part of elapsed
+        # Resource use of the ffmpeg process(es), parsed from its -benchmark output by metrics.record_usage
+        # (summed over segments)
+        self.cpu_user = 0.0
+        self.cpu_system = 0.0
+        self.max_rss = 0
+        self.probe = None
+        self.total_frames = 0
+        self.cost = None
+        self.process = None  # asyncio.subprocess.Process while ffmpeg runs
+        # Segmented encodes: the file's job owns a SegmentedEncode, whose tasks point back via parent
+        self.segmented = None
+        self.segment_count = 1
+        self.parent = None
+        self.label = None
+
+    @property
+    def command(self):
+        """The ffmpeg command line: a remux if routed to one, else the encode on the job's current backend."""
+        if self._command is not None:
+            return self._command
+        if self.remux:
+            return remux_command(self.input_file, self.temp_output)
+        return self.command_builder()
+
+    @property
+    def requested_command(self):
+        """The command as built from the settings, even if the job ends up a remux or on a fallback backend."""
+        return self.request_builder() if self.request_builder is not None else self._command
+
+    @property
+    def log_tail(self):
+        """The last LOG_TAIL_LINES lines ffmpeg printed, and errors about this job."""
+        if self._log_tail is None:
+            self._log_tail = deque(maxlen=LOG_TAIL_LINES)
+        return self._log_tail
+
+    def release(self):
+        """Drop what a finished job no longer needs: its process handle and, unless it failed, its log tail."""
+        self.process = None
+        if self.state in (DONE, SKIPPED):
+            self._log_tail = None
+
+    def set_probe(self, info):
+        """Attach ffprobe metadata (see bulk_encoder.probe.summarize_probe)."""
+        self.probe = info
+        self.total_frames = info["frames"] if info else 0
+
+    @property
+    def elapsed(self):
+        """Seconds spent encoding so far (or in total once finished), not counting time paused."""
+        if self.start_time is None:
+            return 0
+        end_time = self.end_time or datetime.now()
+        paused = self.paused_seconds
+        if self.paused_at is not None:
+            paused += (end_time - self.paused_at).total_seconds()
+        return (end_time - self.start_time).total_seconds() - paused
+
+    def mark_paused(self):
+        if self.start_time is not None and self.paused_at is None:
+            self.paused_at = datetime.now()
+
+    def mark_running(self):
+        if self.paused_at is not None:
+            self.paused_seconds += (datetime.now() - self.paused_at).total_seconds()
+            self.paused_at = None
+
+    def reset_progress(self):
+        """Forget a finished attempt, so the job can run again."""
+        self.state = QUEUED
+        self.returncode = None
+        self.frames = 0
+        self.fps = 0.0
+        self.out_time = 0.0
+        self.total_size = 0
+        self.speed = 0.0
+        self.last_progress = None
+        self.start_time = None
+        self.end_time = None
+        self.paused_at = None
+        self.paused_seconds = 0.0
+        self.process = None
+
+    def update_progress(self, record):
+        """Take the values of one ffmpeg -progress block."""
+        self.last_progress = record
+        self.frames = record.frame
+        self.fps = record.fps
+        self.out_time = record.out_time
+        self.total_size = record.total_size
+        self.speed = record.speed
+
+    @property
+    def duration(self):
+        return self.probe["duration"] if self.probe else 0.0
+
+    @property
+    def progress(self):
+        """Fraction encoded (by frames, else by output time), 0.0 if unknown."""
+        if self.total_frames:
+            return min(1.0, self.frames / self.total_frames)
+        if self.duration:
+            return min(1.0, self.out_time / self.duration)
+        return 0.0
+
+    @property
+    def eta(self):
+        """Estimated seconds left for this job, or None if it can't be estimated yet."""
+        if self.total_frames and self.fps > 0:
+            return max(0, self.total_frames - self.frames) / self.fps
+        if self.duration and self.speed > 0:
+            return max(0.0, self.duration - self.out_time) / self.speed
+        return None
+
+
+class BatchEncoder:
+    """Runs ffmpeg over a list of files with a bounded number of simultaneous encodes.
+
+    Progress is reported through optional callbacks so the same pipeline can
+    drive the Qt window or a plain console:
+
+        on_batch_planned(plan), on_job_started(job), on_progress(job),
+        on_output(job, line), on_job_finished(job),
+        on_concurrency_changed(controller), on_error(job, message)
+
+    on_error reports problems outside ffmpeg that do not fail the job (a log
+    file that cannot be opened); they also appear in the job's output.
+
+    While run() is under way, single jobs can be paused, resumed, canceled
+    and moved in the queue from any thread (pause(), resume(), cancel_job(),
+    move_to_front(), move_job()), and add_files() queues more files; the
+    rest of the batch carries on.
+
+    Jobs run longest first (see bulk_encoder.scheduler) and are reported
+    as they finish, not in table order. The ffmpeg processes themselves run
+    on the shared ProcessSupervisor event loop, so callbacks are made from
+    its thread (and from the thread calling run()).
+    """
+
+    SAMPLE_INTERVAL = 1.0  # seconds between throughput samples for the concurrency controller
+
+    def __init__(self, input_files, settings, probe_cache=None, journal=None, cpu_planner=None,
+                 backend_ranking=None, first_index=0):
+        self.settings = settings
+        self.first_index = first_index  # number of the first file; batches sharing a log folder keep theirs apart
+        self.probe_cache = probe_cache
+        self.journal = journal if journal is not None else JobJournal()
+        self.log_folder = settings.log_folder or default_log_folder()
+        self.jobs = []
+        self._new_jobs(input_files)
+        self.processes = set()  # running ffmpeg processes; removed once reaped
+        from .supervisor import get_supervisor  # asyncio is slow to import; the GUI only needs it once encoding
+        self.supervisor = get_supervisor()
+        # Shared with other batches (watch mode, cluster workers) so they divide the same cores
+        self.cpu_planner = cpu_planner if cpu_planner is not None else CpuPlanner()
+        # Working backends best first (see bulk_encoder.backends). If not given, the first failure tests
+        # them on a background thread and the fallbacks go by the untested ranking until that is done;
+        # callers testing on their own may set it at any time
+        self.backend_ranking = backend_ranking
+        self._untested_ranking = None
+        self._retries = deque()  # failed jobs waiting for _dispatch to move them to another backend
+        self._backend_failures = {}  # profile -> files it failed that another backend then encoded
+        self._demoted = set()  # backends with DEMOTE_AFTER_FAILURES of them
+        self._controls = deque()  # (operation, job) requests for _dispatch, from any thread
+        self._resuming = deque()  # resumed steps still suspended, first in line for the next free slot
+        self._wakeup = Future()  # completed to wake _dispatch early
+        # add_files() while running: files being probed before they join the queue, and whether run() has
+        # started (new files then go through the queue) or finished (nothing will pick them up any more)
+        self._arriving = 0
+        self._arrivals = []  # added jobs waiting for the one thread that probes them, in the order they came
+        self._probing = False
+        self._started = False
+        self._closed = False
+        self.plan = None
+        self.concurrency = concurrency_for(settings.simultaneous_encodes)
+        self.wall_seconds = 0.0  # duration of the last run(), for the metrics report
+        self._lock = threading.Lock()
+        self._is_canceled = False
+        self.on_batch_planned = None
+        self.on_concurrency_changed = None
+        self.on_job_started = None
+        self.on_progress = None
+        self.on_output = None
+        self.on_job_finished = None
+        self.on_error = None
+
+    @property
+    def is_canceled(self):
+        return self._is_canceled
+
+    def _new_jobs(self, input_files):
+        jobs = []
+        for input_file in input_files:
+            index = self.first_index + len(self.jobs)
+            job = make_job(index, input_file, self.settings)
+            job.log_file = log_path_for(self.log_folder, index, input_file)
+            self.jobs.append(job)
+            jobs.append(job)
+        return jobs
+
+    def add_files(self, input_files):
+        """Add files to the batch, even while it runs; returns their new Jobs (numbered after the others).
+
+        Files added to a running batch are probed in the background and then
+        queued behind the files already waiting. Many small additions in a
+        row (a folder scan handing over its results in chunks) share one
+        probing thread, which takes whatever has piled up each time round.
+        Raises RuntimeError once the batch has finished.
+        """
+        with self._lock:
+            if self._closed or self._is_canceled:
+                raise RuntimeError("The batch has already finished")
+            jobs = self._new_jobs(input_files)
+            if not self._started:
+                return jobs  # run() will plan them with the rest
+            self._arriving += len(jobs)
+            self._arrivals.extend(jobs)
+            if self._probing:
+                return jobs
+            self._probing = True
+        threading.Thread(target=self._probe_arrivals, name="probe-added", daemon=True).start()
+        return jobs
+
+    def _probe_arrivals(self):
+        while True:
+            with self._lock:
+                jobs, self._arrivals = self._arrivals, []
+                if not jobs:
+                    self._probing = False
+                    return
+            try:
+                self.probe(jobs)
+            finally:
+                self._control(self._admit, jobs)
+
+    def _admit(self, pending, running, jobs):
+        with self._lock:
+            self._arriving -= len(jobs)
+        jobs = self.skip_completed([job for job in jobs if job.state == QUEUED])  # not canceled meanwhile
+        self.route_remuxes(jobs)
+        self.segment_long_jobs(self.concurrency.max_level, jobs)
+        queued_time = datetime.now()
+        for job in jobs:
+            job.queued_time = queued_time
+        pending.extend(jobs)
+
+    def _new_task(self, parent, command, label):
+        """Pool task for one step of a segmented encode of parent."""
+        task = Job(parent.index, parent.input_file, command[-1], command)
+        task.parent = parent
+        task.label = label
+        task.probe = parent.probe
+        task.log_file = os.path.splitext(parent.log_file)[0] + f".{label}.log"
+        task.queued_time = datetime.now()
+        return task
+
+    def segment_long_jobs(self, slots, jobs=None):
+        """Set up segmented encodes for inputs at least settings.segment_min_duration seconds long."""
+        threshold = float(self.settings.segment_min_duration or 0)
+        if threshold <= 0:
+            return
+        for job in self.jobs if jobs is None else jobs:
+            if job.state == QUEUED and not job.remux and not job.renditions and job.duration >= threshold:
+                job.segmented = SegmentedEncode(job, self.settings, segment_count_for(job.duration, slots),
+                                                self._new_task, self._stop_task)
+                job.segment_count = job.segmented.segment_count
+
+    def probe(self, jobs=None):
+        """Probe inputs up front (in parallel, cached) so frame counts and ETAs are exact."""
+        jobs = self.jobs if jobs is None else jobs
+        pool = ProbePool(self.probe_cache)
+        try:
+            for job, info in zip(jobs, pool.map([job.input_file for job in jobs])):
+                job.set_probe(info)
+        finally:
+            pool.shutdown()
+
+    def route_remuxes(self, jobs):
+        """Turn jobs whose input already has the target codec and bitrate into stream-copy remuxes."""
+        if not self.settings.remux:
+            return
+        for job in jobs:
+            if job.renditions:
+                continue  # a ladder always scales
+            job.remux_reason = remux_blocker(job.probe, self.settings)
+            if job.remux_reason is None:
+                job.remux = True  # Job.command is now the remux
+
+    def skip_completed(self, jobs=None):
+        """Mark jobs the journal shows are already done; returns the jobs still to encode."""
+        remaining = []
+        for job in self.jobs if jobs is None else jobs:
+            if (self.settings.resume and self.journal.is_complete(job)
+                    and all(os.path.exists(output.output_file) for output in job.renditions)):
+                job.state = SKIPPED
+                self._emit(self.on_job_finished, job)
+            else:
+                remaining.append(job)
+        return remaining
+
+    def run(self):
+        """Encode every job; returns the number of jobs that did not finish successfully."""
+        start = time.monotonic()
+        with self._lock:
+            self._started = True
+        jobs = self.skip_completed()
+        self.probe(jobs)
+        self.route_remuxes(jobs)
+        controller = self.concurrency
+        self.segment_long_jobs(controller.max_level)
+        self.plan = SchedulePlan(jobs, controller.level)
+        self._emit(self.on_batch_planned, self.plan)
+        self._emit(self.on_concurrency_changed, controller)
+
+        queued_time = datetime.now()
+        for job in self.plan.order:
+            job.queued_time = queued_time
+        pending = deque(self.plan.order)
+        running = {}
+        try:
+            self._dispatch(pending, running)
+        except KeyboardInterrupt:
+            # Ctrl+C arrives on this thread: stop the ffmpegs and wait for them to exit before passing it on
+            self.cancel()
+            self._dispatch(pending, running)
+            raise
+        finally:
+            self.wall_seconds = time.monotonic() - start
+        return sum(1 for job in self.jobs if job.state not in (DONE, SKIPPED))
+
+    def _dispatch(self, pending, running):
+        """Start pending jobs on the supervisor and collect them until none are left."""
+        controller = self.concurrency
+        changed = True  # whether the queue may have moved since it was last numbered
+        while True:
+            if self._wakeup.done():
+                self._wakeup = Future()
+            self._apply_controls(pending, running)
+            self._retry_failed(pending, running)
+            # Top up to the controller's current level; it may change between jobs. Paused jobs keep
+            # their process but give up their place, and get the next free one back when resumed.
+            active = sum(1 for job in running.values() if job.state not in (PAUSED, RESUMING))
+            while active < controller.level and not self._is_canceled:
+                step = self._next_resumed()
+                if step is not None:
+                    self._continue(step)
+                    active += 1
+                    changed = True
+                    continue
+                job = self._take_next(pending)
+                if job is None:
+                    break
+                changed = True
+                if job.profile in self._demoted and job.parent is None and not job.remux:
+                    profile = self._next_backend(job)
+                    if profile is not None:
+                        self._retarget(job, profile)
+                if job.segmented is not None:
+                    job = job.segmented.first_task()
+                running[self.supervisor.submit(self.execute_ffmpeg(job))] = job
+                active += 1
+            if self._is_canceled:
+                while pending:
+                    self._finish_canceled(pending.popleft(), pending)
+            if changed:
+                self._number_queue(pending)  # O(queue): not on the passes that only take a throughput sample
+            if not running and self._retries:
+                continue
+            with self._lock:
+                if not (pending or running or self._arriving or self._controls):
+                    self._closed = True  # add_files() from here on has nobody to run its files
+                    break
+
+            # Held jobs alone keep the loop waiting here until they are resumed or canceled
+            done, _ = wait(list(running) + [self._wakeup], timeout=self.SAMPLE_INTERVAL,
+                           return_when=FIRST_COMPLETED)
+            controller.sample(job for job in running.values() if job.state == RUNNING)
+            changed = bool(done)
+            for future in done:
+                job = running.pop(future, None)
+                if job is None:
+                    continue  # the wakeup
+                future.result()
+                if job.parent is not None:
+                    self._segment_task_done(job, pending)
+                if controller.job_finished():
+                    self._emit(self.on_concurrency_changed, controller)
+
+    def _take_next(self, pending):
+        """Remove and return the first pending job that is not held, None if there is none."""
+        for job in pending:
+            if job.state != PAUSED and (job.parent is None or job.parent.state != PAUSED):
+                pending.remove(job)
+                job.queue_position = None
+                return job
+        return None
+
+    def _number_queue(self, pending):
+        position = 0
+        for job in pending:
+            if job.parent is None:
+                position += 1
+                job.queue_position = position
+
+    def queued_jobs(self):
+        """The files still waiting to start, in the order they will start."""
+        return sorted((job for job in self.jobs if job.queue_position is not None),
+                      key=lambda job: job.queue_position)
+
+    def pause(self, job):
+        """Suspend a running job (SIGSTOP), or hold a queued one; its place goes to the next queued job."""
+        self._control(self._pause, job)
+
+    def resume(self, job):
+        """Continue a paused job, or release a held one back into the queue."""
+        self._control(self._resume, job)
+
+    def cancel_job(self, job):
+        """Cancel one job, queued or running, without touching the others."""
+        self._control(self._cancel_job, job)
+
+    def move_to_front(self, job):
+        """Make a queued job the next one to start."""
+        self._control(self._move, job, None)
+
+    def move_job(self, job, steps):
+        """Move a queued job steps places later in the queue (earlier if steps is negative)."""
+        self._control(self._move, job, steps)
+
+    def _control(self, operation, *args):
+        self._controls.append((operation, args))
+        try:
+            self._wakeup.set_result(None)
+        except InvalidStateError:
+            pass  # already woken
+
+    def _apply_controls(self, pending, running):
+        while self._controls:
+            operation, args = self._controls.popleft()
+            operation(pending, running, *args)
+
+    def _steps_of(self, job, running):
+        """The pool entries of job: the job itself, or the started steps of a segmented encode."""
+        if job.segmented is None:
+            return [job]
+        return [task for task in running.values() if task.parent is job]
+
+    def _pause(self, pending, running, job):
+        if job.state not in (QUEUED, RUNNING, RESUMING):
+            return
+        job.state = PAUSED
+        job.mark_paused()
+        for step in self._steps_of(job, running):
+            with self._lock:
+                # A step that has not started yet suspends itself once spawned (see _run_ffmpeg)
+                step.state = PAUSED
+                process = step.process if step.end_time is None else None
+            if process is not None:
+                self.supervisor.suspend(process)
+
+    def _resume(self, pending, running, job):
+        # A suspended ffmpeg waits in _resuming for a free slot (see _dispatch), so resuming
+        # never runs more encodes at once than the concurrency level
+        if job.state != PAUSED:
+            return
+        waiting = False
+        for step in self._steps_of(job, running):
+            with self._lock:
+                if step.state != PAUSED:
+                    continue
+                started = step.end_time is None and (step.process is not None or step in running.values())
+                step.state = RESUMING if started else QUEUED
+            if started:
+                self._resuming.append(step)
+                waiting = True
+        if job.segmented is not None:
+            if waiting:
+                job.state = RESUMING
+            else:
+                job.state = RUNNING if job.start_time is not None else QUEUED
+                job.mark_running()
+
+    def _next_resumed(self):
+        """The first resumed step still waiting for a slot, None if there is none."""
+        while self._resuming:
+            step = self._resuming.popleft()
+            if step.state == RESUMING:  # not paused again or canceled meanwhile
+                return step
+        return None
+
+    def _continue(self, step):
+        with self._lock:
+            step.state = RUNNING
+            process = step.process if step.end_time is None else None
+        job = step.parent or step
+        if job.state == RESUMING:
+            job.state = RUNNING
+        job.mark_running()
+        if process is not None:
+            self.supervisor.resume(process)
+
+    def _cancel_job(self, pending, running, job):
+        if job.state not in (QUEUED, RUNNING, PAUSED, RESUMING):
+            return
+        job.cancel_requested = True
+        if job in pending:
+            pending.remove(job)
+            job.queue_position = None
+            self._finish_canceled(job, pending)
+            return
+        # Started: its ffmpeg(s) end as canceled, and the file is reported as usual from there
+        self._resume(pending, running, job)
+        for step in self._steps_of(job, running):
+            self._stop_task(step)
+
+    def _move(self, pending, running, job, steps):
+        if job not in pending:
+            return
+        index = pending.index(job)
+        pending.remove(job)
+        pending.insert(0 if steps is None else max(0, min(len(pending), index + steps)), job)
+
+    def _finish_canceled(self, job, pending=None):
+        job.state = CANCELED
+        if job.parent is not None:
+            self._segment_task_done(job, pending)
+        else:
+            self._job_finished(job)
+
+    def _segment_task_done(self, task, pending):
+        parent = task.parent
+        segmented = parent.segmented
+        if segmented.finished:
+            segmented.task_finished(task)  # a step stopped after the file had already failed
+            task.release()
+            return
+        next_tasks = segmented.task_finished(task)
+        task.release()  # a failed step's log tail has been copied to the file's job
+        if segmented.finished:
+            # Done or failed: drop whatever of this file is still queued
+            if pending:
+                for queued in [t for t in pending if t.parent is parent]:
+                    pending.remove(queued)
+            parent.end_time = datetime.now()
+            self._job_finished(parent)
+        elif pending is not None:
+            # Run the next step of a file that is already under way before starting new files
+            pending.extendleft(reversed(next_tasks))
+
+    def _report_started(self, job):
+        parent = job.parent
+        if parent is None:
+            self.journal.record_started(job)
+            self._emit(self.on_job_started, job)
+        elif parent.start_time is None:
+            parent.state = RUNNING
+            parent.start_time = job.start_time
+            self.journal.record_started(parent)
+            self._emit(self.on_job_started, parent)
+
+    def _job_finished(self, job, retry=True):
+        """Move a successful encode into place, record the outcome in the journal and report it.
+
+        A failed encode is not reported yet while another backend is left to
+        try it on: it waits in _retries for _dispatch (see _retry_failed).
+        """
+        outputs = [(output.temp_output, output.output_file) for output in job.renditions]
+        for temp_output, output_file in outputs or [(job.temp_output, job.output_file)]:
+            if job.state == DONE:
+                try:
+                    os.replace(temp_output, output_file)
+                except OSError as e:
+                    job.log_tail.append(f"Could not move {temp_output} to {output_file}: {e}")
+                    job.state = FAILED
+            elif os.path.exists(temp_output):
+                try:
+                    os.remove(temp_output)  # never leave a partial output behind
+                except OSError:
+                    pass
+        if job.start_time is not None:
+            self.journal.record_finished(job)
+        if retry and self._may_retry(job):
+            self._retries.append(job)
+            return
+        if job.state == DONE and job.failed_profiles:
+            # The file was fine, the backend was not; after a few such files the rest of the batch skips it
+            for profile in job.failed_profiles:
+                self._backend_failures[profile] = self._backend_failures.get(profile, 0) + 1
+                if self._backend_failures[profile] >= DEMOTE_AFTER_FAILURES:
+                    self._demoted.add(profile)
+        self._emit(self.on_job_finished, job)
+        job.release()
+
+    def _may_retry(self, job):
+        return (job.state == FAILED and self.settings.fallback and not self._cancel_requested(job)
+                and not job.remux and job.profile is not None)
+
+    def _next_backend(self, job):
+        """The backend to try job on next, None when every one for its codec has been tried."""
+        from .backends import fallback_profiles
+        ranking = self.backend_ranking or self._start_ranking()
+        tried = set(job.failed_profiles) | self._demoted
+        original = job.failed_profiles[0] if job.failed_profiles else job.profile
+        return next((profile for profile in fallback_profiles(original, ranking)
+                     if profile != job.profile and profile not in tried), None)
+
+    def _start_ranking(self):
+        """The untested ranking, after starting the test encodes off the dispatch thread the first time."""
+        if self._untested_ranking is None:
+            from .backends import rank_backends, untested_ranking
+            from .tools import discover_tools
+            tools = discover_tools()  # cached; no ffmpeg run on a warm start
+            self._untested_ranking = untested_ranking(tools)
+
+            def rank():
+                self.backend_ranking = rank_backends(tools)  # cached too: a week of batches test once
+            threading.Thread(target=rank, name="rank-backends", daemon=True).start()
+        return self._untested_ranking
+
+    def _retry_failed(self, pending, running):
+        """Queue failed jobs again, first in line, on their next backend; report those with none left."""
+        for _ in range(len(self._retries)):
+            job = self._retries.popleft()
+            if any(task.parent is job for task in running.values()):
+                self._retries.append(job)  # the failed file's other steps are still stopping
+                continue
+            profile = None if self._is_canceled else self._next_backend(job)
+            if profile is None:
+                self._emit(self.on_job_finished, job)
+                job.release()
+                continue
+            message = f"{job.profile} failed (exit code {job.returncode}); retrying on {profile}"
+            job.failed_profiles = job.failed_profiles + (job.profile,)
+            self._retarget(job, profile)
+            job.log_tail.append(message)
+            self._emit(self.on_output, job, message)
+            pending.appendleft(job)
+
+    def _retarget(self, job, profile):
+        """Rebuild a queued or failed job's command for another backend."""
+        settings = copy.copy(self.settings)
+        settings.profile = profile
+        rebuilt = make_job(job.index, job.input_file, settings)
+        job.profile = profile
+        job.command_builder = rebuilt.command_builder
+        job.temp_output = rebuilt.temp_output
+        job.renditions = rebuilt.renditions
+        log_file = log_path_for(self.log_folder, job.index, job.input_file)
+        job.log_file = os.path.splitext(log_file)[0] + f".{profile}.log"
+        if job.segmented is not None:
+            job.segmented = SegmentedEncode(job, settings, job.segment_count, self._new_task, self._stop_task)
+        job.reset_progress()
+        job.queued_time = datetime.now()
+
+    def _report_progress(self, job):
+        if job.parent is None:
+            for output in job.renditions:
+                output.refresh_size()
+            self._emit(self.on_progress, job)
+        else:
+            job.parent.segmented.roll_up()
+            self._emit(self.on_progress, job.parent)
+
+    def cancel(self):
+        """Stop the batch: queued jobs are dropped and running ffmpegs terminated (killed if they linger)."""
+        self._is_canceled = True
+        with self._lock:
+            processes = list(self.processes)
+        for process in processes:
+            self.supervisor.stop(process)
+
+    def _stop_task(self, job):
+        process = job.process
+        if process is not None:
+            self.supervisor.stop(process)
+
+    def _emit(self, callback, *args):
+        if callback is not None:
+            callback(*args)
+
+    async def _read_diagnostics(self, job, stream, log):
+        # ffmpeg's stderr (warnings, errors, banner, -benchmark totals); progress goes to stdout.
+        # Every line goes to the job's log file; the caller decides what to keep in memory.
+        async for line in stream:
+            line = line.decode("utf-8", errors="replace").rstrip()
+            if line:
+                if log is not None:
+                    log.write(line + "\n")
+                if not record_usage(job, line):
+                    job.log_tail.append(line)
+                    self._emit(self.on_output, job.parent or job, line)
+
+    def _report_error(self, job, message):
+        job.log_tail.append(message)
+        self._emit(self.on_output, job.parent or job, message)
+        self._emit(self.on_error, job.parent or job, message)
+
+    def _open_log(self, job, command):
+        try:
+            os.makedirs(os.path.dirname(job.log_file), exist_ok=True)
+            log = open(job.log_file, "w", encoding="utf-8", buffering=1)
+        except OSError as e:
+            self._report_error(job, f"Could not open log file {job.log_file}: {e}")
+            return None
+        log.write(subprocess.list2cmdline(command) + "\n\n")
+        return log
+
+    async def execute_ffmpeg(self, job):
+        """Run one job's ffmpeg on the supervisor loop."""
+        allocation = self._plan_cpus(job)
+        try:
+            await self._run_ffmpeg(job, allocation)
+        finally:
+            if allocation is not None:
+                self.cpu_planner.release(allocation)
+
+    def _plan_cpus(self, job):
+        """Cores and thread count for a job with a CPU encoder, None if the plan is off or it has none."""
+        if self.settings.cpu_plan == PLAN_OFF or not cpu_encoder_positions(job.command):
+            return None
+        return self.cpu_planner.acquire(self.concurrency.level)
+
+    def _cancel_requested(self, job):
+        parent = job.parent
+        return self._is_canceled or job.cancel_requested or (parent is not None and parent.cancel_requested)
+
+    async def _run_ffmpeg(self, job, allocation):
+        if self._cancel_requested(job) or (job.parent is not None and job.parent.segmented.finished):
+            job.state = CANCELED
+            if job.parent is None:
+                self._job_finished(job)
+            return
+
+        command = job.command[:1] + PROGRESS_ARGS + BENCHMARK_ARGS + job.command[1:]
+        cpus = None
+        if allocation is not None:
+            command = limit_threads(command, allocation.threads)
+            cpus = allocation.cpus if self.settings.cpu_plan == PLAN_PIN else None
+        try:
+            process = await self.supervisor.spawn(command, cpus=cpus, background=self.settings.background)
+        except OSError as e:
+            # Reported with the failed job, like an ffmpeg error
+            message = f"Could not start ffmpeg: {e}"
+            job.log_tail.append(message)
+            self._emit(self.on_output, job.parent or job, message)
+            job.state = FAILED
+            if job.parent is None:
+                self._job_finished(job)
+            return
+
+        with self._lock:
+            self.processes.add(process)
+            job.process = process
+            paused = job.state in (PAUSED, RESUMING)
+            if not paused:
+                job.state = RUNNING
+        if self._cancel_requested(job):
+            self.supervisor.stop(process)  # canceled while the process was starting
+        elif paused:
+            self.supervisor.suspend(process)  # paused while the process was starting
+        job.start_time = datetime.now()
+        self._report_started(job)
+
+        log = self._open_log(job, command)
+        stderr_reader = self.supervisor.start_task(self._read_diagnostics(job, process.stderr, log))
+
+        parser = ProgressParser()
+        async for line in process.stdout:
+            record = parser.feed(line.decode("utf-8", errors="replace"))
+            if record is not None:
+                job.update_progress(record)
+                self._report_progress(job)
+
+        await stderr_reader
+        job.returncode = await process.wait()
+        with self._lock:
+            self.processes.discard(process)
+            job.process = None  # reaped: nothing left to signal, and the handle holds the pipes' transports
+        if log is not None:
+            log.close()
+        job.end_time = datetime.now()
+
+        if self._cancel_requested(job):
+            job.state = CANCELED
+        elif job.returncode == 0:
+            job.state = DONE
+        else:
+            job.state = FAILED
+        if job.parent is None:
+            self._job_finished(job)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .states import DONE
+from .system import user_cache_dir
+
+SAMPLE_BYTES = 1 << 20
+
+
+def temp_output_path(output_file):
+    """Name an encode is written under until it succeeds: movie.mp4 -> movie.part.mp4 (same folder, same format)."""
+    base, ext = os.path.splitext(output_file)
+    return base + ".part" + ext
+
+
+def quick_checksum(path):
+    """SHA-256 over the size and three 1 MiB samples (start, middle, end) of a file.
+
+    Cheap enough for multi-GB outputs and still catches truncated or
+    replaced files.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_BYTES // 2), max(0, size - SAMPLE_BYTES)}):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def settings_hash(job):
+    """Identity of what a job would produce: its requested ffmpeg command plus the input's size and mtime."""
+    requested = job.requested_command
+    command = [("{output}" if arg == requested[-1] else arg) for arg in requested]
+    try:
+        st = os.stat(job.input_file)
+        input_identity = [os.path.abspath(job.input_file), st.st_size, st.st_mtime_ns]
+    except OSError:
+        input_identity = [os.path.abspath(job.input_file)]
+    return hashlib.sha256(json.dumps([command, input_identity]).encode()).hexdigest()
+
+
+class JobJournal:
+    """Persistent record of every encode, used to skip work that is already done.
+
+    One row per output file with the settings hash, state (running, done,
+    failed, canceled), and the size and quick checksum of the finished
+    output. Pass db_path=None for a journal that only lives in memory.
+    """
+
+    def __init__(self, db_path=""):
+        if db_path == "":
+            db_path = os.path.join(user_cache_dir(), "journal.sqlite3")
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         "output_file TEXT PRIMARY KEY, input_file TEXT, settings_hash TEXT, state TEXT, "
+                         "output_size INTEGER, output_checksum TEXT, updated_at REAL)")
+        self._db.commit()
+
+    def _write(self, job, state, output_size=None, output_checksum=None):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO jobs (output_file, input_file, settings_hash, state, "
+                             "output_size, output_checksum, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (os.path.abspath(job.output_file), os.path.abspath(job.input_file),
+                              settings_hash(job), state, output_size, output_checksum, time.time()))
+            self._db.commit()
+
+    def record_started(self, job):
+        self._write(job, "running")
+
+    def record_finished(self, job):
+        """Store the job's final state; for a finished output also its size and checksum."""
+        if job.state == DONE and os.path.exists(job.output_file):
+            self._write(job, job.state, os.path.getsize(job.output_file), quick_checksum(job.output_file))
+        else:
+            self._write(job, job.state)
+
+    def is_complete(self, job):
+        """True if job.output_file was finished with the same settings and is still intact."""
+        with self._lock:
+            row = self._db.execute("SELECT settings_hash, state, output_size, output_checksum FROM jobs "
+                                   "WHERE output_file = ?", (os.path.abspath(job.output_file),)).fetchone()
+        if row is None:
+            return False
+        saved_hash, state, output_size, output_checksum = row
+        if state != DONE or saved_hash != settings_hash(job):
+            return False
+        try:
+            return (os.path.getsize(job.output_file) == output_size
+                    and quick_checksum(job.output_file) == output_checksum)
+        except OSError:
+            return False
+
+    def close(self):
+        with self._lock:
+            self._db.close()
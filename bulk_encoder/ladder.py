@@ -0,0 +1,93 @@
+import copy
+import os
+
+from .profiles import get_profile
+from .remux import parse_bitrate
+
+
+class Rendition:
+    """One rung of an encoding ladder: an output height, optionally with its own bitrate and profile."""
+
+    def __init__(self, height, bitrate=None, profile=None):
+        self.height = int(height)
+        self.bitrate = bitrate
+        self.profile = profile
+
+    @property
+    def name(self):
+        return f"{self.height}p"
+
+
+def parse_ladder(spec):
+    """Renditions from 'HEIGHT[:BITRATE[:PROFILE]],...', e.g. '1080:8M,720:4M,480:1500k'.
+
+    An empty spec means no ladder (one output per input, as usual).
+    """
+    renditions = []
+    for part in filter(None, (p.strip() for p in str(spec or "").split(","))):
+        height, _, rest = part.partition(":")
+        bitrate, _, profile = rest.partition(":")
+        if not height.isdigit() or int(height) < 16 or int(height) % 2:
+            raise ValueError(f"Invalid rendition height {height!r} in {part!r} (expected an even number of lines)")
+        if profile:
+            get_profile(profile)
+        renditions.append(Rendition(height, bitrate or None, profile or None))
+    if len({r.height for r in renditions}) != len(renditions):
+        raise ValueError(f"Rendition heights must be unique: {spec}")
+    return renditions
+
+
+def rendition_settings(settings, rendition):
+    """The batch settings with a rendition's own profile and bitrate applied.
+
+    The bitrate replaces the CBR target; in VBR mode it becomes the maximum
+    (and lowers the minimum if needed). CRF ignores it.
+    """
+    settings = copy.copy(settings)
+    if rendition.profile:
+        settings.profile = rendition.profile
+    if rendition.bitrate:
+        settings.bitrate = rendition.bitrate
+        settings.max_bitrate = rendition.bitrate
+        if (parse_bitrate(settings.min_bitrate) or 0) > (parse_bitrate(rendition.bitrate) or 0):
+            settings.min_bitrate = rendition.bitrate
+    return settings
+
+
+class RenditionOutput:
+    """A rendition of one input: where it is written and how big it has grown."""
+
+    def __init__(self, rendition, output_file, temp_output):
+        self.rendition = rendition
+        self.output_file = output_file
+        self.temp_output = temp_output
+        self.size = 0
+
+    def refresh_size(self):
+        path = self.temp_output if os.path.exists(self.temp_output) else self.output_file
+        try:
+            self.size = os.path.getsize(path)
+        except OSError:
+            pass
+        return self.size
+
+
+def rendition_path(output_file, rendition):
+    """movie.mp4 -> movie_720p.mp4"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_{rendition.name}{ext}"
+
+
+def ladder_command(input_file, outputs, settings):
+    """One ffmpeg run for all renditions: decode once, split, scale each copy, encode each with its settings."""
+    decoder = get_profile(settings.profile)
+    labels = [f"[v{i}]" for i in range(len(outputs))]
+    graph = f"[0:v]split={len(outputs)}{''.join(labels)}"
+    for i, output in enumerate(outputs):
+        graph += f";{labels[i]}scale=-2:{output.rendition.height}[out{i}]"
+    command = ["ffmpeg", "-y"] + decoder.input_args + ["-i", input_file, "-filter_complex", graph]
+    for i, output in enumerate(outputs):
+        rsettings = rendition_settings(settings, output.rendition)
+        command += (["-map", f"[out{i}]", "-map", "0:a:0?"] + get_profile(rsettings.profile).video_args(rsettings)
+                    + ["-c:a", "copy", output.temp_output])
+    return command
@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+import re
+import time
+
+from .states import DONE, FAILED, CANCELED, SKIPPED
+
+# Per-job fields, in report column order
+JOB_FIELDS = ("index", "input_file", "output_file", "state", "mode", "profile", "queue_wait_seconds",
+              "wall_seconds", "media_seconds", "speed", "avg_fps", "frames", "input_bytes", "output_bytes",
+              "compression_ratio", "cpu_user_seconds", "cpu_system_seconds", "max_rss_bytes")
+
+# Inserted after the ffmpeg executable: on exit ffmpeg reports its own CPU time and peak memory on stderr
+BENCHMARK_ARGS = ["-benchmark"]
+BENCH_TIMES = re.compile(r"^bench: utime=([\d.]+)s stime=([\d.]+)s")
+BENCH_RSS = re.compile(r"^bench: maxrss=(\d+)\s*(?:kB|KiB)")
+
+
+def record_usage(job, line):
+    """Take a -benchmark line of ffmpeg's stderr into job (and the file it is a segment of); False for other lines."""
+    times = BENCH_TIMES.match(line)
+    rss = BENCH_RSS.match(line) if times is None else None
+    if times is None and rss is None:
+        return False
+    for target in (job, job.parent):
+        if target is None:
+            continue
+        if times is not None:
+            target.cpu_user += float(times.group(1))
+            target.cpu_system += float(times.group(2))
+        else:
+            target.max_rss = max(target.max_rss, int(rss.group(1)) * 1024)
+    return True
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _seconds(start, end):
+    return (end - start).total_seconds() if start is not None and end is not None else 0.0
+
+
+def job_metrics(job):
+    """Measurements for one top-level job as a flat dict (see JOB_FIELDS)."""
+    wall = job.elapsed if job.end_time is not None else 0.0  # without the time spent paused
+    media = job.duration if job.state == DONE else job.out_time
+    frames = job.total_frames if job.state == DONE and job.total_frames else job.frames
+    input_bytes = _file_size(job.input_file)
+    renditions = [{"name": output.rendition.name, "output_file": output.output_file,
+                   "output_bytes": _file_size(output.output_file) if job.state in (DONE, SKIPPED) else 0}
+                  for output in job.renditions]
+    for rendition in renditions:
+        rendition["bitrate"] = round(rendition["output_bytes"] * 8 / job.duration) if job.duration else 0
+    if renditions:
+        output_bytes = sum(rendition["output_bytes"] for rendition in renditions)
+    else:
+        output_bytes = _file_size(job.output_file) if job.state in (DONE, SKIPPED) else 0
+    mode = ("ladder" if job.renditions else "segmented" if job.segmented is not None
+            else "remux" if job.remux else "encode")
+    metrics = {
+        "index": job.index,
+        "input_file": job.input_file,
+        "output_file": job.output_file,
+        "state": job.state,
+        "mode": mode,
+        "profile": "" if job.remux else job.profile or "",  # the backend that finally ran it
+        "queue_wait_seconds": round(_seconds(job.queued_time, job.start_time), 3),
+        "wall_seconds": round(wall, 3),
+        "media_seconds": round(media, 3),
+        "speed": round(media / wall, 3) if wall else 0.0,
+        "avg_fps": round(frames / wall, 2) if wall else 0.0,
+        "frames": frames,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "compression_ratio": round(input_bytes / output_bytes, 3) if output_bytes else 0.0,
+        "cpu_user_seconds": round(job.cpu_user, 3),
+        "cpu_system_seconds": round(job.cpu_system, 3),
+        "max_rss_bytes": job.max_rss,
+    }
+    if renditions:
+        metrics["renditions"] = renditions  # JSON and Prometheus only; CSV keeps one row per file
+    return metrics
+
+
+def batch_metrics(jobs, wall_seconds):
+    """Aggregates over the per-job metrics of one batch."""
+    rows = [job_metrics(job) for job in jobs]
+    ran = [row for row in rows if row["wall_seconds"]]
+    media = sum(row["media_seconds"] for row in rows if row["state"] == DONE)
+    input_bytes = sum(row["input_bytes"] for row in rows if row["state"] == DONE)
+    output_bytes = sum(row["output_bytes"] for row in rows if row["state"] == DONE)
+    waits = [row["queue_wait_seconds"] for row in ran]
+    return {
+        "files": len(rows),
+        "done": sum(1 for row in rows if row["state"] == DONE),
+        "failed": sum(1 for row in rows if row["state"] == FAILED),
+        "canceled": sum(1 for row in rows if row["state"] == CANCELED),
+        "skipped": sum(1 for row in rows if row["state"] == SKIPPED),
+        "remuxed": sum(1 for row in rows if row["state"] == DONE and row["mode"] == "remux"),
+        "wall_seconds": round(wall_seconds, 3),
+        "media_seconds": round(media, 3),
+        "speed": round(media / wall_seconds, 3) if wall_seconds else 0.0,
+        "avg_fps": round(sum(row["frames"] for row in ran) / wall_seconds, 2) if wall_seconds else 0.0,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "compression_ratio": round(input_bytes / output_bytes, 3) if output_bytes else 0.0,
+        "cpu_user_seconds": round(sum(row["cpu_user_seconds"] for row in rows), 3),
+        "cpu_system_seconds": round(sum(row["cpu_system_seconds"] for row in rows), 3),
+        "max_rss_bytes": max((row["max_rss_bytes"] for row in rows), default=0),
+        "mean_queue_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+        "max_queue_wait_seconds": max(waits, default=0.0),
+    }, rows
+
+
+def write_json(path, batch, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.time(), "batch": batch, "jobs": rows}, f, indent=2)
+
+
+def write_csv(path, batch, rows):
+    """One row per job; the batch totals go in a final row with index 'batch'."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=JOB_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        writer.writerow(dict(batch, index="batch", state="", mode="", profile=""))
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+PROMETHEUS_JOB_METRICS = (
+    ("queue_wait_seconds", "Time the file waited for a free slot."),
+    ("wall_seconds", "Wall-clock time of the encode."),
+    ("speed", "Encoded media seconds per wall-clock second."),
+    ("avg_fps", "Average frames per second."),
+    ("input_bytes", "Size of the input file."),
+    ("output_bytes", "Size of the output file."),
+    ("compression_ratio", "Input size divided by output size."),
+    ("cpu_user_seconds", "User CPU time of the ffmpeg processes."),
+    ("cpu_system_seconds", "System CPU time of the ffmpeg processes."),
+    ("max_rss_bytes", "Peak resident memory of the ffmpeg processes."),
+)
+
+
+def write_prometheus(path, batch, rows):
+    """Prometheus text format for the node exporter textfile collector.
+
+    Written to a temporary file and renamed, so the collector never reads
+    a half-written file.
+    """
+    lines = []
+    for name, value in batch.items():
+        metric = f"bulk_encoder_batch_{name}"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    lines += ["# TYPE bulk_encoder_batch_finished_timestamp_seconds gauge",
+              f"bulk_encoder_batch_finished_timestamp_seconds {time.time():.0f}"]
+    for name, help_text in PROMETHEUS_JOB_METRICS:
+        metric = f"bulk_encoder_job_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        for row in rows:
+            labels = (f'index="{row["index"]}",file="{_label(os.path.basename(row["input_file"]))}",'
+                      f'state="{row["state"]}",mode="{row["mode"]}"')
+            lines.append(f"{metric}{{{labels}}} {row[name]}")
+    ladder_rows = [(row, rendition) for row in rows for rendition in row.get("renditions", ())]
+    for name, help_text in (("output_bytes", "Size of one rendition of a ladder."),
+                            ("bitrate", "Average bitrate of one rendition of a ladder.")):
+        if not ladder_rows:
+            break
+        metric = f"bulk_encoder_rendition_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        for row, rendition in ladder_rows:
+            labels = (f'index="{row["index"]}",file="{_label(os.path.basename(row["input_file"]))}",'
+                      f'rendition="{rendition["name"]}"')
+            lines.append(f"{metric}{{{labels}}} {rendition[name]}")
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+
+
+WRITERS = {".json": write_json, ".csv": write_csv, ".prom": write_prometheus}
+
+
+def write_report(path, jobs, wall_seconds):
+    """Write the batch's metrics to path; the format follows the extension (.json, .csv or .prom)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unknown metrics format {extension!r} (use .json, .csv or .prom)")
+    batch, rows = batch_metrics(jobs, wall_seconds)
+    WRITERS[extension](path, batch, rows)
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .system import hidden_startupinfo, user_cache_dir
+
+log = logging.getLogger(__name__)
+
+
+# Everything the encoder needs, requested in a single ffprobe call
+PROBE_ENTRIES = ("format=duration,bit_rate,format_name:"
+                 "stream=index,codec_type,codec_name,width,height,nb_frames,r_frame_rate,avg_frame_rate,duration,bit_rate")
+
+
+def parse_rate(rate):
+    """Turn an ffprobe rational such as '30000/1001' into a float (0.0 if unknown)."""
+    try:
+        num, _, den = str(rate).partition("/")
+        num = float(num)
+        den = float(den) if den else 1.0
+        return num / den if den else 0.0
+    except ValueError:
+        return 0.0
+
+
+def summarize_probe(data):
+    """Reduce raw ffprobe JSON to the fields the encoder needs."""
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+
+    duration = float(fmt.get("duration") or video.get("duration") or 0)
+    frame_rate = parse_rate(video.get("avg_frame_rate")) or parse_rate(video.get("r_frame_rate"))
+    try:
+        frames = int(video.get("nb_frames") or 0)
+    except ValueError:
+        frames = 0
+    if not frames and duration and frame_rate:
+        frames = int(round(duration * frame_rate))
+
+    return {
+        "duration": duration,
+        "frames": frames,
+        "frame_rate": frame_rate,
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "video_codec": video.get("codec_name", ""),
+        "audio_codecs": [s.get("codec_name", "") for s in streams if s.get("codec_type") == "audio"],
+        "bit_rate": int(fmt.get("bit_rate") or 0),
+        "video_bit_rate": int(video.get("bit_rate") or 0),  # often missing (e.g. in mkv); 0 if unknown
+        "format_name": fmt.get("format_name", ""),
+        "streams": [{"index": s.get("index"), "type": s.get("codec_type"), "codec": s.get("codec_name")}
+                    for s in streams],
+    }
+
+
+def probe_file(path):
+    """Run ffprobe once on path and return the summarized metadata, or None on error."""
+    command = ["ffprobe", "-v", "error", "-print_format", "json",
+               "-show_entries", PROBE_ENTRIES, path]
+    try:
+        output = subprocess.check_output(command, universal_newlines=True, startupinfo=hidden_startupinfo())
+        return summarize_probe(json.loads(output))
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        log.warning("Error probing %s: %s", path, e)
+        return None
+
+
+def get_video_duration(video_file):
+    """Get the duration of a video using FFprobe (cached)."""
+    info = default_cache().get(video_file)
+    if info is None or not info["duration"]:
+        return None
+    return info["duration"]
+
+
+class ProbeCache:
+    """ffprobe results cached in memory (LRU) and on disk (SQLite).
+
+    Entries are keyed on the absolute path and only reused while the file
+    size and modification time still match, so edited files are re-probed.
+    Pass db_path=None to keep the cache in memory only.
+    """
+
+    def __init__(self, db_path="", max_entries=4096):
+        if db_path == "":
+            db_path = os.path.join(user_cache_dir(), "probe_cache.sqlite3")
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS probes ("
+                                 "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("Probe cache disabled (%s): %s", db_path, e)
+                self._db = None
+
+    @staticmethod
+    def _key(path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        return path, st.st_size, st.st_mtime_ns
+
+    def _lookup(self, key):
+        with self._lock:
+            info = self._memory.get(key)
+            if info is not None:
+                self._memory.move_to_end(key)
+                return info
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT info FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                   key).fetchone()
+        if row is None:
+            return None
+        info = json.loads(row[0])
+        self._remember(key, info)
+        return info
+
+    def _remember(self, key, info):
+        with self._lock:
+            self._memory[key] = info
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key, info):
+        self._remember(key, info)
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO probes (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                             key + (json.dumps(info),))
+            self._db.commit()
+
+    def get(self, path):
+        """Metadata for path, probing only if the file is new or changed. None if it can't be probed."""
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+        info = self._lookup(key)
+        if info is None:
+            info = probe_file(path)
+            if info is not None:
+                self._store(key, info)
+        return info
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache backed by the user cache folder."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProbeCache()
+        return _default_cache
+
+
+class ProbePool:
+    """Probes files in the background with a bounded number of ffprobe processes.
+
+    on_probed(path, info) is called from the pool threads as each file
+    finishes; info is None if the file could not be probed. A file that
+    is already being probed is not probed a second time.
+    """
+
+    def __init__(self, cache=None, max_workers=None, on_probed=None):
+        self.cache = cache if cache is not None else default_cache()
+        self.on_probed = on_probed
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1),
+                                            thread_name_prefix="probe")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path):
+        """Queue path for probing and return a future for its metadata."""
+        with self._lock:
+            future = self._pending.get(path)
+            if future is None:
+                future = self._executor.submit(self._probe, path)
+                self._pending[path] = future
+            return future
+
+    def map(self, paths):
+        """Probe paths concurrently and return their metadata in the same order."""
+        futures = [self.submit(path) for path in paths]
+        return [future.result() for future in futures]
+
+    def _probe(self, path):
+        try:
+            info = self.cache.get(path)
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+        if self.on_probed is not None:
+            self.on_probed(path, info)
+        return info
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
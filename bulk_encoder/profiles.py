@@ -0,0 +1,121 @@
+from collections import OrderedDict
+
+# Presets offered everywhere; each profile maps them onto its own vocabulary
+GENERIC_PRESETS = ("slow", "medium", "fast")
+RATE_CONTROL_MODES = ("CBR", "VBR", "CRF")
+
+X26X_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+NVENC_PRESETS = ("slow", "medium", "fast", "p1", "p2", "p3", "p4", "p5", "p6", "p7")
+SVT_AV1_PRESETS = tuple(str(i) for i in range(14))
+
+# Rate control templates; {name} is filled from the EncodeSettings attribute of the same name
+NVENC_RATE_CONTROL = {
+    "CBR": ["-b:v", "{bitrate}"],
+    "VBR": ["-b:v", "{min_bitrate}", "-minrate", "{min_bitrate}", "-maxrate", "{max_bitrate}", "-bufsize", "50M"],
+    "CRF": ["-rc", "vbr", "-cq", "{crf}", "-b:v", "0"],
+}
+X26X_RATE_CONTROL = {
+    "CBR": ["-b:v", "{bitrate}", "-maxrate", "{bitrate}", "-bufsize", "{bitrate}"],
+    "VBR": ["-b:v", "{min_bitrate}", "-minrate", "{min_bitrate}", "-maxrate", "{max_bitrate}", "-bufsize", "50M"],
+    "CRF": ["-crf", "{crf}"],
+}
+SVT_AV1_RATE_CONTROL = {
+    # libsvtav1 has no true CBR for file encodes; a target bitrate is the closest match
+    "CBR": ["-b:v", "{bitrate}"],
+    "VBR": ["-b:v", "{min_bitrate}", "-maxrate", "{max_bitrate}"],
+    "CRF": ["-crf", "{crf}"],
+}
+
+# Encoder options that cap the encoder's worker threads; {threads} is filled in by the CPU planner
+THREADS_OPTION = ("-threads", "{threads}")
+X265_THREADS_OPTION = ("-x265-params", "pools={threads}")  # libx265 ignores -threads
+
+
+class EncoderProfile:
+    """How to encode with one backend: decoder/hwaccel args, encoder, presets and rate control.
+
+    New backends are added with register_profile(); nothing else in the
+    pipeline needs to change.
+    """
+
+    def __init__(self, name, encoder, codec, input_args=(), presets=GENERIC_PRESETS, preset_aliases=None,
+                 default_preset="medium", rate_control=None, extra_args=(), hardware=False, description="",
+                 thread_options=None):
+        self.name = name
+        self.encoder = encoder
+        self.codec = codec  # codec name as ffprobe reports it: h264, hevc, av1
+        self.input_args = list(input_args)
+        self.presets = tuple(presets)
+        self.preset_aliases = dict(preset_aliases or {})
+        self.default_preset = default_preset
+        self.rate_control = rate_control or X26X_RATE_CONTROL
+        self.extra_args = list(extra_args)
+        self.hardware = hardware
+        self.description = description
+        # Hardware encoders have no CPU thread pool to size
+        self.thread_options = tuple(thread_options if thread_options is not None
+                                    else () if hardware else THREADS_OPTION)
+
+    def resolve_preset(self, preset):
+        """Native preset for a generic or native preset name."""
+        preset = self.preset_aliases.get(preset, preset)
+        if preset not in self.presets:
+            raise ValueError(f"{self.name} has no preset {preset!r} (choose from {', '.join(self.presets)})")
+        return preset
+
+    def rate_control_args(self, settings):
+        try:
+            template = self.rate_control[settings.bitrate_mode]
+        except KeyError:
+            raise ValueError(f"{self.name} does not support {settings.bitrate_mode} rate control")
+        return [arg.format(**vars(settings)) for arg in template]
+
+    def video_args(self, settings):
+        """Everything after -i that selects and configures the video encoder."""
+        return (["-c:v", self.encoder, "-preset", self.resolve_preset(settings.preset)]
+                + self.rate_control_args(settings) + self.extra_args)
+
+    def thread_args(self, threads):
+        return [arg.format(threads=threads) for arg in self.thread_options]
+
+
+PROFILES = OrderedDict()
+
+
+def register_profile(profile):
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown encoder profile {name!r} (choose from {', '.join(PROFILES)})")
+
+
+def profile_names():
+    return list(PROFILES)
+
+
+# The NVENC profiles keep their original names and order, so saved settings still match
+register_profile(EncoderProfile("Nvidia_Cuda_h264", "h264_nvenc", "h264", input_args=["-hwaccel", "cuda"],
+                                presets=NVENC_PRESETS, rate_control=NVENC_RATE_CONTROL, hardware=True,
+                                description="NVENC H.264, CUDA decoding"))
+register_profile(EncoderProfile("Nvidia_Cuvid_h264", "h264_nvenc", "h264", input_args=["-hwaccel", "cuvid"],
+                                presets=NVENC_PRESETS, rate_control=NVENC_RATE_CONTROL, hardware=True,
+                                description="NVENC H.264, CUVID decoding"))
+register_profile(EncoderProfile("Nvidia_Cuda_265", "hevc_nvenc", "hevc", input_args=["-hwaccel", "cuda"],
+                                presets=NVENC_PRESETS, rate_control=NVENC_RATE_CONTROL, hardware=True,
+                                description="NVENC HEVC, CUDA decoding"))
+register_profile(EncoderProfile("Nvidia_Cuvid_265", "hevc_nvenc", "hevc", input_args=["-hwaccel", "cuvid"],
+                                presets=NVENC_PRESETS, rate_control=NVENC_RATE_CONTROL, hardware=True,
+                                description="NVENC HEVC, CUVID decoding"))
+register_profile(EncoderProfile("CPU_x264", "libx264", "h264", presets=X26X_PRESETS,
+                                rate_control=X26X_RATE_CONTROL, description="libx264 on the CPU"))
+register_profile(EncoderProfile("CPU_x265", "libx265", "hevc", presets=X26X_PRESETS,
+                                rate_control=X26X_RATE_CONTROL, description="libx265 on the CPU",
+                                thread_options=X265_THREADS_OPTION))
+register_profile(EncoderProfile("CPU_SVT_AV1", "libsvtav1", "av1", presets=SVT_AV1_PRESETS,
+                                preset_aliases={"slow": "4", "medium": "6", "fast": "8"}, default_preset="6",
+                                rate_control=SVT_AV1_RATE_CONTROL, description="SVT-AV1 on the CPU"))
@@ -0,0 +1,70 @@
+# Inserted right after the ffmpeg executable: progress blocks on stdout, no stats line on stderr
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value):
+    try:
+        return float(str(value).rstrip("x"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProgressRecord:
+    """One block of ffmpeg progress: frame, fps, out_time (s), total_size (bytes), speed (x realtime)."""
+
+    __slots__ = ("frame", "fps", "out_time", "total_size", "speed", "bitrate", "finished")
+
+    def __init__(self, frame=0, fps=0.0, out_time=0.0, total_size=0, speed=0.0, bitrate="", finished=False):
+        self.frame = frame
+        self.fps = fps
+        self.out_time = out_time
+        self.total_size = total_size
+        self.speed = speed
+        self.bitrate = bitrate
+        self.finished = finished
+
+    @classmethod
+    def from_block(cls, block):
+        # out_time_us is the real microsecond value; older builds only have the misnamed out_time_ms
+        out_time_us = block.get("out_time_us", block.get("out_time_ms"))
+        return cls(
+            frame=_to_int(block.get("frame")),
+            fps=_to_float(block.get("fps")),
+            out_time=max(0, _to_int(out_time_us)) / 1000000,
+            total_size=_to_int(block.get("total_size")),
+            speed=_to_float(block.get("speed")),
+            bitrate=block.get("bitrate", ""),
+            finished=block.get("progress") == "end",
+        )
+
+    def __repr__(self):
+        return (f"ProgressRecord(frame={self.frame}, fps={self.fps}, out_time={self.out_time}, "
+                f"total_size={self.total_size}, speed={self.speed}, finished={self.finished})")
+
+
+class ProgressParser:
+    """Incremental parser: feed it stdout lines, get a ProgressRecord at the end of each block.
+
+    ffmpeg writes key=value lines and closes every block with
+    progress=continue (or progress=end for the last one).
+    """
+
+    def __init__(self):
+        self._block = {}
+
+    def feed(self, line):
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        self._block[key] = value.strip()
+        if key != "progress":
+            return None
+        block, self._block = self._block, {}
+        return ProgressRecord.from_block(block)
@@ -0,0 +1,63 @@
+from .profiles import get_profile
+
+# Codecs an .mp4 can carry with -c copy; Matroska takes anything ffmpeg can demux
+MP4_VIDEO_CODECS = {"h264", "hevc", "av1", "mpeg4"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"}
+
+BITRATE_SUFFIXES = {"k": 1000, "m": 1000 ** 2, "g": 1000 ** 3}
+
+
+def parse_bitrate(value):
+    """Bits per second for an ffmpeg bitrate such as '8M' or '4500k' (None if it can't be read)."""
+    text = str(value).strip().lower()
+    scale = BITRATE_SUFFIXES.get(text[-1:], 1)
+    if scale != 1:
+        text = text[:-1]
+    try:
+        return int(float(text) * scale)
+    except ValueError:
+        return None
+
+
+def target_bitrate(settings):
+    """Highest video bitrate the settings ask for; None in CRF mode, where no bitrate is set."""
+    if settings.bitrate_mode == "CBR":
+        return parse_bitrate(settings.bitrate)
+    if settings.bitrate_mode == "VBR":
+        return parse_bitrate(settings.max_bitrate)
+    return None
+
+
+def remux_blocker(info, settings):
+    """Why a file needs a real encode, or None if stream-copying it into the new container is enough.
+
+    A file qualifies when its video already uses the profile's codec at or
+    below the requested bitrate, and the output container can carry all of
+    its audio as-is.
+    """
+    if not info:
+        return "not probed"
+    profile = get_profile(settings.profile)
+    if info["video_codec"] != profile.codec:
+        return f"video is {info['video_codec'] or 'unknown'}, not {profile.codec}"
+    limit = target_bitrate(settings)
+    if limit is None:
+        return f"{settings.bitrate_mode} has no bitrate to compare with"
+    # The container bitrate includes audio, so it is only used when the stream's own is missing
+    bit_rate = info.get("video_bit_rate") or info["bit_rate"]
+    if not bit_rate:
+        return "bitrate unknown"
+    if bit_rate > limit:
+        return f"{bit_rate / 1e6:.1f} Mb/s is above the {limit / 1e6:.1f} Mb/s target"
+    if settings.output_format == "mp4":
+        if info["video_codec"] not in MP4_VIDEO_CODECS:
+            return f"mp4 can't carry {info['video_codec']}"
+        unsupported = [codec for codec in info["audio_codecs"] if codec not in MP4_AUDIO_CODECS]
+        if unsupported:
+            return f"mp4 can't carry {', '.join(unsupported)} audio"
+    return None
+
+
+def remux_command(input_file, output_file):
+    """Stream-copy the same video and audio streams an encode would pick into the new container."""
+    return ["ffmpeg", "-y", "-i", input_file, "-c:v", "copy", "-c:a", "copy", output_file]
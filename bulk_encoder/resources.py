@@ -0,0 +1,171 @@
+import glob
+import os
+import platform
+import signal
+import subprocess
+import threading
+
+from .profiles import PROFILES
+
+# EncodeSettings.cpu_plan values
+PLAN_OFF = "off"  # every ffmpeg sizes its thread pools for the whole machine (ffmpeg's default)
+PLAN_THREADS = "threads"  # each encode gets a share of the cores' worth of threads
+PLAN_PIN = "pin"  # ... and is pinned to its own set of cores
+CPU_PLANS = (PLAN_OFF, PLAN_THREADS, PLAN_PIN)
+
+BACKGROUND_NICENESS = 10
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_SET_SYSCALL = {"x86_64": 251, "aarch64": 30, "i686": 289, "armv7l": 314}
+PROCESS_SUSPEND_RESUME = 0x0800
+
+
+def parse_cpulist(text):
+    """'0-3,8,10-11' (the kernel's cpulist format) -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in filter(None, text.strip().split(",")):
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def available_cpus():
+    """The CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def numa_nodes(cpus):
+    """cpus grouped by NUMA node (one group where the topology is unknown)."""
+    allowed = set(cpus)
+    nodes = []
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(path) as f:
+                node = [cpu for cpu in parse_cpulist(f.read()) if cpu in allowed]
+        except (OSError, ValueError):
+            return [list(cpus)]
+        if node:
+            nodes.append(node)
+    return nodes or [list(cpus)]
+
+
+class CpuAllocation:
+    """The cores one ffmpeg may use, and how many threads its encoder should start."""
+
+    def __init__(self, cpus, threads):
+        self.cpus = cpus
+        self.threads = threads
+
+
+class CpuPlanner:
+    """Divides the available cores among the encodes running at the same time.
+
+    Each encode gets len(cpus) // slots cores, where slots is the number of
+    simultaneous encodes (fixed at construction for planners shared by
+    several batches, else given per acquire()). Cores are handed out
+    best-fit by NUMA node, so an encode stays on one node whenever a node
+    still has room for it. When every core is taken (the concurrency level
+    went up while older encodes still run) the encode may use all of them.
+    """
+
+    def __init__(self, slots=None, cpus=None):
+        self.slots = slots
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        self.nodes = numa_nodes(self.cpus)
+        self._held = []
+        self._lock = threading.Lock()
+
+    def acquire(self, level):
+        with self._lock:
+            share = max(1, len(self.cpus) // max(1, self.slots or level))
+            busy = {cpu for allocation in self._held for cpu in allocation.cpus}
+            free_by_node = [[cpu for cpu in node if cpu not in busy] for node in self.nodes]
+            fitting = [free for free in free_by_node if len(free) >= share]
+            if fitting:
+                cpus = min(fitting, key=len)[:share]
+            else:
+                cpus = [cpu for free in free_by_node for cpu in free][:share] or list(self.cpus)
+            allocation = CpuAllocation(cpus, share)
+            self._held.append(allocation)
+            return allocation
+
+    def release(self, allocation):
+        with self._lock:
+            self._held.remove(allocation)
+
+    def describe(self):
+        nodes = f" on {len(self.nodes)} NUMA nodes" if len(self.nodes) > 1 else ""
+        return f"{len(self.cpus)} cores{nodes}"
+
+
+def cpu_encoder_positions(command):
+    """Indexes of the '-c:v ENCODER' arguments in command whose encoder runs on the CPU."""
+    return [i for i in range(len(command) - 1)
+            if command[i] == "-c:v" and any(profile.encoder == command[i + 1] and profile.thread_options
+                                            for profile in PROFILES.values())]
+
+
+def limit_threads(command, threads):
+    """command with its decoder and every CPU encoder in it limited to `threads` threads."""
+    command = list(command)
+    for i in reversed(cpu_encoder_positions(command)):
+        profile = next(p for p in PROFILES.values() if p.encoder == command[i + 1])
+        command[i + 2:i + 2] = profile.thread_args(threads)
+    if "-i" in command:
+        first_input = command.index("-i")
+        command[first_input:first_input] = ["-threads", str(threads)]
+    return command
+
+
+def background_creationflags():
+    """Popen creationflags starting a child at below-normal priority (Windows; 0 elsewhere)."""
+    return getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", 0)
+
+
+def _nt_process_call(pid, function):
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(PROCESS_SUSPEND_RESUME, False, pid)
+    if not handle:
+        raise ctypes.WinError()
+    try:
+        getattr(ctypes.windll.ntdll, function)(handle)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def suspend_process(pid):
+    """Freeze a child where it is (SIGSTOP; NtSuspendProcess on Windows). Raises OSError if it is gone."""
+    if os.name == "nt":
+        _nt_process_call(pid, "NtSuspendProcess")
+    else:
+        os.kill(pid, signal.SIGSTOP)
+
+
+def resume_process(pid):
+    """Let a suspended child carry on (SIGCONT; NtResumeProcess on Windows)."""
+    if os.name == "nt":
+        _nt_process_call(pid, "NtResumeProcess")
+    else:
+        os.kill(pid, signal.SIGCONT)
+
+
+def lower_priority(pid):
+    """Renice a running child and, on Linux, put it in the idle I/O class (as nice -n 10 ionice -c 3 would)."""
+    if not hasattr(os, "setpriority"):
+        return  # Windows: the priority class was set at creation
+    try:
+        os.setpriority(os.PRIO_PROCESS, pid, BACKGROUND_NICENESS)
+    except OSError:
+        pass
+    syscall = IOPRIO_SET_SYSCALL.get(platform.machine())
+    if syscall is None or not platform.system() == "Linux":
+        return
+    import ctypes
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall(syscall, IOPRIO_WHO_PROCESS, pid, IOPRIO_CLASS_IDLE << 13)
+    except (OSError, AttributeError):
+        pass
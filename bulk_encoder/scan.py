@@ -0,0 +1,73 @@
+import fnmatch
+import os
+import re
+
+VIDEO_PATTERNS = ("*.mp4", "*.mkv", "*.avi", "*.mov", "*.wmv", "*.flv", "*.webm", "*.mpeg", "*.mpg", "*.m4v", "*.ts")
+CHUNK_SIZE = 500  # files per batch handed to the caller of find_videos_chunked
+
+
+def path_key(path):
+    """What makes two spellings of a path the same file, for de-duplication."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def pattern_matcher(patterns):
+    """One compiled regex for a list of shell patterns, matched against lower-case file names."""
+    return re.compile("|".join(fnmatch.translate(pattern.lower()) for pattern in patterns))
+
+
+def walk_files(folder, recursive=True):
+    """Paths of the files in folder (and, if recursive, its subfolders), skipping hidden folders.
+
+    os.scandir with an explicit stack: no recursion limit, one stat-free
+    directory read per folder, and unreadable folders are passed over.
+    Each folder's files come in name order before its subfolders, so the
+    same tree is always walked the same way. Symlinked folders are not
+    followed, so link loops cannot trap the walk.
+    """
+    stack = [folder]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subfolders = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith("."):
+                        subfolders.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+        stack.extend(reversed(subfolders))
+
+
+def is_partial(name):
+    """Hidden files and the .part outputs of encodes still under way."""
+    return name.startswith(".") or os.path.splitext(os.path.splitext(name)[0])[1] == ".part"
+
+
+def find_videos(folder, patterns=VIDEO_PATTERNS, recursive=True):
+    """Video files under folder whose names match one of patterns (case-insensitive)."""
+    matcher = pattern_matcher(patterns)
+    for path in walk_files(folder, recursive):
+        name = os.path.basename(path)
+        if not is_partial(name) and matcher.match(name.lower()):
+            yield path
+
+
+def find_videos_chunked(folder, patterns=VIDEO_PATTERNS, recursive=True, chunk_size=CHUNK_SIZE, stop=None):
+    """find_videos() in lists of up to chunk_size paths; stops early once the stop event is set."""
+    chunk = []
+    for path in find_videos(folder, patterns, recursive):
+        if stop is not None and stop.is_set():
+            return
+        chunk.append(path)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
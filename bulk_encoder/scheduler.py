@@ -0,0 +1,86 @@
+import heapq
+
+# Costs are measured in seconds of 1080p video, so clips of different sizes compare fairly
+REFERENCE_PIXELS = 1920 * 1080
+REMUX_COST_FACTOR = 0.01  # a stream-copy remux takes about 1% of an encode's time
+
+
+def job_cost(job):
+    """Relative encode cost of a job: probed duration x pixel count, in 1080p-seconds. None if unknown."""
+    info = job.probe
+    if not info or not info["duration"]:
+        return None
+    pixels = (info["width"] * info["height"]) or REFERENCE_PIXELS
+    if job.renditions:
+        # Decoded once, encoded once per rendition at its own size
+        aspect = info["width"] / info["height"] if info["width"] and info["height"] else 16 / 9
+        pixels = sum(aspect * output.rendition.height ** 2 for output in job.renditions)
+    cost = info["duration"] * pixels / REFERENCE_PIXELS
+    return cost * REMUX_COST_FACTOR if job.remux else cost
+
+
+def simulate_makespan(costs, slots):
+    """Finish time of the last slot when costs are handed, in order, to whichever slot frees up first."""
+    slots = max(1, slots)
+    finish_times = [0.0] * min(slots, len(costs))
+    if not finish_times:
+        return 0.0
+    heapq.heapify(finish_times)
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+    return max(finish_times)
+
+
+def split_costs(jobs):
+    """Costs as the pool sees them: a segmented job is several equal pieces."""
+    costs = []
+    for job in jobs:
+        pieces = max(1, job.segment_count)
+        costs.extend([job.cost / pieces] * pieces)
+    return costs
+
+
+def lpt_order(jobs):
+    """Longest-processing-time-first order.
+
+    Jobs without probe data go first: their cost is unknown, so assume the worst.
+    The sort is stable, so equal costs keep the table order.
+    """
+    return sorted(jobs, key=lambda job: (job.cost is not None, -(job.cost or 0)))
+
+
+class SchedulePlan:
+    """Job order for a batch plus the predicted makespan.
+
+    Predictions assume each slot encodes at speed x realtime for 1080p
+    content (1.0 unless a measured speed is supplied).
+    """
+
+    def __init__(self, jobs, slots, speed=1.0):
+        for job in jobs:
+            job.cost = job_cost(job)
+        self.slots = slots
+        self.speed = speed if speed > 0 else 1.0
+        self.order = lpt_order(jobs)
+        self.unknown = sum(1 for job in jobs if job.cost is None)
+        self.remuxed = sum(1 for job in jobs if job.remux)
+        self.encoded = len(jobs) - self.remuxed
+        known_in_list_order = split_costs(job for job in jobs if job.cost is not None)
+        known_in_lpt_order = split_costs(job for job in self.order if job.cost is not None)
+        self.makespan = simulate_makespan(known_in_lpt_order, slots) / self.speed
+        self.list_order_makespan = simulate_makespan(known_in_list_order, slots) / self.speed
+
+    def describe(self):
+        text = (f"Predicted batch time {format_seconds(self.makespan)} on {self.slots} slot(s) "
+                f"at {self.speed:g}x realtime per 1080p slot "
+                f"(table order: {format_seconds(self.list_order_makespan)})")
+        if self.remuxed:
+            text += f"; {self.remuxed} file(s) only need a remux, {self.encoded} to re-encode"
+        if self.unknown:
+            text += f", {self.unknown} file(s) without duration not included"
+        return text
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
@@ -0,0 +1,143 @@
+import glob
+import os
+import shutil
+
+from .profiles import get_profile
+from .states import DONE, FAILED
+
+# Stages of a segmented encode; each runs as one or more ffmpeg tasks in the worker pool
+SPLIT = "split"
+ENCODE = "encode"
+CONCAT = "concat"
+
+MIN_SEGMENT_SECONDS = 30  # shorter pieces cost more in process start-up than they gain
+
+
+def segment_count_for(duration, slots):
+    """How many pieces to cut a file into: enough to keep every slot busy, none shorter than 30 s."""
+    return max(2, min(2 * max(1, slots), int(duration // MIN_SEGMENT_SECONDS)))
+
+
+class SegmentedEncode:
+    """Encodes one long input as several segments in parallel.
+
+    1. split: stream-copy the video into pieces with the segment muxer; pieces
+       start on keyframes at (or just after) evenly spaced times.
+    2. encode: every piece is encoded as its own task, in parallel.
+    3. concat: the encoded pieces are joined with the concat demuxer (stream
+       copy) and the audio is copied once from the original input.
+
+    new_task(parent, command, label) creates the pool task (a Job) for each
+    step; task_finished() is called as they complete and returns the tasks
+    that can start next. stop_task(task) stops a running task without
+    waiting for it; the work folder is removed once the last one has exited.
+    """
+
+    def __init__(self, job, settings, segment_count, new_task, stop_task):
+        self.job = job
+        self.settings = settings
+        self.segment_count = segment_count
+        self._new_task = new_task
+        self._stop_task = stop_task
+        output_folder = os.path.dirname(job.output_file) or "."
+        base_name = os.path.splitext(os.path.basename(job.output_file))[0]
+        self.work_dir = os.path.join(output_folder, f".{base_name}.segments")
+        self.tasks = []
+        self.encode_tasks = []
+        self.finished = False
+
+    def split_times(self):
+        step = self.job.duration / self.segment_count
+        return [f"{step * i:.3f}" for i in range(1, self.segment_count)]
+
+    def _task(self, command, label):
+        task = self._new_task(self.job, command, label)
+        self.tasks.append(task)
+        return task
+
+    def first_task(self):
+        os.makedirs(self.work_dir, exist_ok=True)
+        command = ["ffmpeg", "-y", "-i", self.job.input_file,
+                   "-map", "0:v:0", "-c", "copy",
+                   "-f", "segment", "-segment_times", ",".join(self.split_times()),
+                   "-segment_format", "matroska", "-reset_timestamps", "1",
+                   os.path.join(self.work_dir, "source_%04d.mkv")]
+        return self._task(command, SPLIT)
+
+    def _encode_tasks(self):
+        profile = get_profile(self.settings.profile)
+        sources = sorted(glob.glob(os.path.join(self.work_dir, "source_*.mkv")))
+        for i, source in enumerate(sources):
+            encoded = os.path.join(self.work_dir, f"encoded_{i:04d}.mkv")
+            command = (["ffmpeg", "-y"] + profile.input_args + ["-i", source]
+                       + profile.video_args(self.settings) + ["-an", encoded])
+            self.encode_tasks.append(self._task(command, f"{ENCODE}{i + 1:02d}"))
+        return self.encode_tasks
+
+    def _concat_task(self):
+        list_file = os.path.join(self.work_dir, "segments.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            for task in self.encode_tasks:
+                # The encoded piece is the last argument of its command
+                path = os.path.abspath(task.command[-1]).replace("'", "'\\''")
+                f.write(f"file '{path}'\n")
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+                   "-i", self.job.input_file,
+                   "-map", "0:v:0", "-map", "1:a:0?", "-c", "copy", self.job.temp_output]
+        return self._task(command, CONCAT)
+
+    def task_finished(self, task):
+        """Record a finished task; returns the tasks that can run next."""
+        if self.finished:
+            self._cleanup_when_stopped()  # a task stopped after the file failed
+            return []
+        if task.state != DONE:
+            self.fail(task)
+            return []
+        if task.label == SPLIT:
+            tasks = self._encode_tasks()
+            if not tasks:
+                self.fail(task)
+            return tasks
+        if task.label == CONCAT:
+            self.finished = True
+            self.job.returncode = 0
+            self.job.state = DONE
+            self.cleanup()
+            return []
+        if all(t.state == DONE for t in self.encode_tasks):
+            return [self._concat_task()]
+        return []
+
+    def fail(self, task):
+        """Stop the whole file when one of its tasks fails or is canceled."""
+        self.finished = True
+        self.job.returncode = task.returncode if task.returncode is not None else 1
+        self.job.state = FAILED if task.state == DONE else task.state
+        self.job.log_tail.extend(task.log_tail)
+        self.job.log_file = task.log_file  # point at the log of the step that failed
+        for sibling in self.running_tasks():
+            if sibling is not task:
+                self._stop_task(sibling)
+        self._cleanup_when_stopped()
+
+    def running_tasks(self):
+        return [t for t in self.tasks if t.process is not None and t.end_time is None]
+
+    def _cleanup_when_stopped(self):
+        if not self.running_tasks():
+            self.cleanup()
+
+    def roll_up(self):
+        """Show the segments' combined progress on the file's own job."""
+        job = self.job
+        job.frames = sum(t.frames for t in self.encode_tasks)
+        job.total_size = sum(t.total_size for t in self.encode_tasks)
+        running = [t for t in self.running_tasks() if t in self.encode_tasks]
+        job.fps = sum(t.fps for t in running)
+        job.speed = sum(t.speed for t in running)
+        job.out_time = job.duration * job.progress if job.total_frames else sum(t.out_time for t in self.encode_tasks)
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
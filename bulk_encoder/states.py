@@ -0,0 +1,9 @@
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"  # suspended while running, or held in the queue
+RESUMING = "resuming"  # resumed while suspended; stays suspended until an encode slot is free
+DONE = "done"
+FAILED = "failed"
+CANCELED = "canceled"
+SKIPPED = "skipped"  # output already complete from an earlier run
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sys
+import threading
+
+from .resources import background_creationflags, lower_priority, resume_process, suspend_process
+from .system import hidden_startupinfo
+
+TERMINATE_GRACE_SECONDS = 5.0  # after SIGTERM, how long ffmpeg gets to finish its file before SIGKILL
+STREAM_LIMIT = 1 << 20  # longest line read from a child's pipes
+
+
+def _use_pidfd_watcher():
+    """Before Python 3.12 asyncio waits for every child on a thread of its own; on
+    Linux a pidfd per child lets the event loop notice exits itself."""
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return None  # kernel older than 5.3
+    watcher = asyncio.PidfdChildWatcher()
+    asyncio.set_child_watcher(watcher)
+    return watcher
+
+
+class ProcessSupervisor:
+    """Owns the ffmpeg children of every batch in this process, on one asyncio event loop.
+
+    The loop runs on a single background thread. It reads the pipes of all
+    running children, so there is no thread per encode. Coroutines are
+    handed over with submit(); they start children with spawn() and reap
+    them with process.wait(). stop(), suspend() and resume() may be called
+    from any thread. stop() sends SIGTERM and, if the child is still alive
+    TERMINATE_GRACE_SECONDS later, SIGKILL.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._spawn_lock = asyncio.Lock()
+        self._cpus = None  # the loop thread's own affinity, restored after every pinned spawn
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="ffmpeg-supervisor", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        if hasattr(os, "sched_getaffinity"):
+            self._cpus = os.sched_getaffinity(0)
+        watcher = _use_pidfd_watcher()
+        if watcher is not None:
+            watcher.attach_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    def submit(self, coroutine):
+        """Run coroutine on the supervisor's loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def start_task(self, coroutine):
+        """Run coroutine alongside the calling one (which must be on this loop); await the result to join it."""
+        return self._loop.create_task(coroutine)
+
+    async def spawn(self, command, cpus=None, background=False):
+        """Start command with stdout and stderr piped (asyncio.subprocess.Process).
+
+        cpus pins the child to those cores; background runs it at low CPU and I/O priority.
+        """
+        pin = cpus is not None and self._cpus is not None
+        async with self._spawn_lock:
+            if pin:
+                # A child inherits the affinity of the thread that forks it: pinned from its first instruction
+                os.sched_setaffinity(0, cpus)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, limit=STREAM_LIMIT, startupinfo=hidden_startupinfo(),
+                    creationflags=background_creationflags() if background else 0)
+            finally:
+                if pin:
+                    os.sched_setaffinity(0, self._cpus)
+        if background:
+            lower_priority(process.pid)
+        return process
+
+    def suspend(self, process):
+        """Pause process where it is; False if it has already exited."""
+        return self._signal(suspend_process, process)
+
+    def resume(self, process):
+        return self._signal(resume_process, process)
+
+    def _signal(self, send, process):
+        if process.returncode is not None:
+            return False
+        try:
+            send(process.pid)
+        except OSError:
+            return False  # exited, not reaped yet
+        return True
+
+    def stop(self, process, grace=TERMINATE_GRACE_SECONDS):
+        """Ask process to exit (thread-safe); it is killed if it has not after grace seconds."""
+        self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._stop(process, grace)))
+
+    async def _stop(self, process, grace):
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            self.resume(process)  # a suspended child only acts on SIGTERM once it runs again
+            await asyncio.wait_for(process.wait(), grace)
+        except ProcessLookupError:
+            pass  # exited in the meantime
+        except asyncio.TimeoutError:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor():
+    """The process-wide ProcessSupervisor, started on first use."""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor()
+        return _supervisor
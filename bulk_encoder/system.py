@@ -0,0 +1,20 @@
+import os
+import subprocess
+
+
+def hidden_startupinfo():
+    """Return a STARTUPINFO that hides the console window on Windows, None elsewhere."""
+    if os.name != "nt":
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def user_cache_dir():
+    """Folder for the encoder's on-disk caches (probe results and the like)."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "bulk_encoder")
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from .system import hidden_startupinfo, user_cache_dir
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+# Where the GUI installs ffmpeg on Windows; used when it is not on PATH (yet)
+WINDOWS_INSTALL_DIR = "C:\\ffmpeg\\bin"
+
+
+class ToolInfo:
+    """The ffmpeg/ffprobe found on this machine and what that ffmpeg can do."""
+
+    def __init__(self, ffmpeg=None, ffprobe=None, version="", encoders=(), hwaccels=(), cached=False,
+                 signatures=None):
+        self.ffmpeg = ffmpeg  # absolute paths, None when not found
+        self.ffprobe = ffprobe
+        self.version = version  # first line of ffmpeg -version
+        self.encoders = list(encoders)
+        self.hwaccels = list(hwaccels)
+        self.cached = cached  # True when read from the cache without running anything
+        self.signatures = signatures  # path, mtime and size of both binaries; results derived from them are cached
+
+    @property
+    def found(self):
+        return self.ffmpeg is not None and self.ffprobe is not None
+
+
+def find_executable(name):
+    path = shutil.which(name)
+    if path is None and os.name == "nt":
+        candidate = os.path.join(WINDOWS_INSTALL_DIR, name + ".exe")
+        path = candidate if os.path.isfile(candidate) else None
+    return os.path.abspath(path) if path else None
+
+
+def _signature(path):
+    """What invalidates the cache: the binary's path, mtime and size."""
+    st = os.stat(path)
+    return [path, st.st_mtime_ns, st.st_size]
+
+
+def _run(path, *args):
+    return subprocess.run([path, "-hide_banner"] + list(args), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          universal_newlines=True, errors="replace", startupinfo=hidden_startupinfo()).stdout
+
+
+def parse_encoders(output):
+    """Encoder names from ffmpeg -encoders (the lines after the ------ separator)."""
+    lines = output.splitlines()
+    start = next((i + 1 for i, line in enumerate(lines) if line.strip().startswith("---")), 0)
+    return [line.split()[1] for line in lines[start:] if len(line.split()) > 1]
+
+
+def parse_hwaccels(output):
+    """Method names from ffmpeg -hwaccels."""
+    return [line.strip() for line in output.splitlines()[1:] if line.strip()]
+
+
+def default_tools_cache():
+    return os.path.join(user_cache_dir(), "tools.json")
+
+
+def load_cache(cache_path):
+    """The JSON cache at cache_path, None if it is missing, unreadable or from another CACHE_VERSION."""
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and data.get("cache_version") == CACHE_VERSION else None
+
+
+def save_cache(cache_path, data):
+    """Write data to the JSON cache at cache_path atomically; a failure is reported, not raised."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        log.warning("Could not write the cache %s: %s", cache_path, e)
+
+
+def discover_tools(cache_path=None, refresh=False):
+    """Find ffmpeg and ffprobe and ask ffmpeg for its version, encoders and hwaccels.
+
+    The answers are cached in cache_path (default: tools.json in the user
+    cache) for as long as both binaries keep their path, mtime and size, so
+    a warm start runs no subprocess at all. cache_path=None uses the default
+    location; pass "" to disable the cache.
+    """
+    if cache_path is None:
+        cache_path = default_tools_cache()
+    ffmpeg, ffprobe = find_executable("ffmpeg"), find_executable("ffprobe")
+    if ffmpeg is None:
+        return ToolInfo(ffprobe=ffprobe)
+    try:
+        signatures = [_signature(ffmpeg), _signature(ffprobe) if ffprobe else None]
+    except OSError:
+        return ToolInfo(ffprobe=ffprobe)
+
+    cached = load_cache(cache_path) if cache_path and not refresh else None
+    if cached is not None and cached.get("signatures") == signatures:
+        return ToolInfo(ffmpeg, ffprobe, cached["ffmpeg_version"], cached["encoders"], cached["hwaccels"],
+                        cached=True, signatures=signatures)
+
+    try:
+        version = (_run(ffmpeg, "-version").splitlines() or [""])[0]
+        encoders = parse_encoders(_run(ffmpeg, "-encoders"))
+        hwaccels = parse_hwaccels(_run(ffmpeg, "-hwaccels"))
+    except OSError:
+        return ToolInfo(ffprobe=ffprobe)  # found on PATH but not runnable
+    if cache_path:
+        save_cache(cache_path, {"cache_version": CACHE_VERSION, "signatures": signatures,
+                                "ffmpeg_version": version, "encoders": encoders, "hwaccels": hwaccels})
+    return ToolInfo(ffmpeg, ffprobe, version, encoders, hwaccels, signatures=signatures)
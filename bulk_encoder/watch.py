@@ -0,0 +1,340 @@
+import copy
+import ctypes
+import ctypes.util
+import itertools
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import BatchEncoder, default_log_folder
+from .journal import JobJournal
+from .profiles import get_profile
+from .resources import CpuPlanner
+from .scan import VIDEO_PATTERNS, is_partial, pattern_matcher, walk_files
+
+log = logging.getLogger(__name__)
+
+
+# inotify(7) event bits
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class WatchRule:
+    """Where files dropped into `folder` go and how they are encoded.
+
+    overrides are EncodeSettings attributes (crf, bitrate_mode, preset, ...)
+    applied on top of the daemon's base settings for this folder only.
+    """
+
+    def __init__(self, folder, output_folder, profile=None, patterns=VIDEO_PATTERNS, recursive=False,
+                 overrides=None):
+        self.folder = os.path.abspath(folder)
+        self.output_folder = os.path.abspath(output_folder)
+        self.profile = profile
+        self.patterns = tuple(patterns)
+        self._matcher = pattern_matcher(self.patterns)
+        self.recursive = recursive
+        self.overrides = dict(overrides or {})
+
+    def matches(self, path):
+        """True for video files of this rule, leaving out hidden files, partial outputs and its own outputs."""
+        name = os.path.basename(path)
+        if is_partial(name):
+            return False
+        folder = os.path.dirname(path)
+        if folder == self.output_folder or folder.startswith(self.output_folder + os.sep):
+            return False
+        if folder != self.folder and not (self.recursive and folder.startswith(self.folder + os.sep)):
+            return False
+        return self._matcher.match(name.lower()) is not None
+
+    def settings_for(self, base_settings):
+        settings = copy.copy(base_settings)
+        settings.output_folder = self.output_folder
+        if self.profile:
+            settings.profile = self.profile
+        for name, value in self.overrides.items():
+            if not hasattr(settings, name):
+                raise ValueError(f"Unknown setting {name!r} in the rule for {self.folder}")
+            setattr(settings, name, value)
+        get_profile(settings.profile).resolve_preset(settings.preset)  # fail at start-up, not per file
+        return settings
+
+
+def load_rules(path):
+    """Rules from a JSON list of {"folder", "output_folder", "profile"?, "patterns"?, "recursive"?, "settings"?}."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [WatchRule(entry["folder"], entry["output_folder"], entry.get("profile"),
+                      entry.get("patterns", VIDEO_PATTERNS), entry.get("recursive", False), entry.get("settings"))
+            for entry in entries]
+
+
+def scan(rule):
+    """Every matching file currently in the rule's folder."""
+    return (path for path in walk_files(rule.folder, rule.recursive) if rule.matches(path))
+
+
+class InotifyWatcher:
+    """Change notifications for a set of folders through Linux inotify (loaded with ctypes).
+
+    wait(timeout) returns the paths written or moved in since the last call,
+    or None when the kernel queue overflowed and the folders need a rescan.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folders, recursive=False):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}  # watch descriptor -> folder
+        self._recursive = recursive
+        for folder in folders:
+            self._add(folder)
+
+    def _add(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self._folders[wd] = folder
+        if self._recursive:
+            for entry in os.scandir(folder):
+                if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                    self._add(entry.path)
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            folder = self._folders.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if self._recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add(path)
+                    return None  # files may have landed before the watch existed
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self._fd)
+
+
+def inotify_available():
+    return sys.platform.startswith("linux")
+
+
+def is_locked(path):
+    """True while another process holds a lock on path (Windows share lock, or an flock on POSIX)."""
+    if os.name == "nt":
+        try:
+            with open(path, "ab"):
+                return False
+        except PermissionError:
+            return True
+        except OSError:
+            return False
+    import fcntl
+    try:
+        with open(path, "rb") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+    except OSError:
+        pass
+    return False
+
+
+class WriteTracker:
+    """Decides when files have finished being written.
+
+    A file is complete once its size and mtime have not changed for
+    settle_seconds and nobody holds a lock on it. Each version of a file
+    (path, size, mtime) is handed out only once; only the last version of
+    each path is remembered, until forget_missing() finds it gone.
+    """
+
+    def __init__(self, settle_seconds=5.0):
+        self.settle_seconds = settle_seconds
+        self._candidates = {}  # path -> (size, mtime_ns, unchanged since)
+        self._handed_out = {}  # path -> (size, mtime_ns) of the version handed out
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def add(self, path):
+        if path not in self._candidates:
+            self._candidates[path] = (-1, -1, time.monotonic())
+
+    def ready(self):
+        """Paths that are complete now."""
+        now = time.monotonic()
+        complete = []
+        for path, (size, mtime, since) in list(self._candidates.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._candidates[path]  # deleted or renamed away
+                continue
+            version = (st.st_size, st.st_mtime_ns)
+            if self._handed_out.get(path) == version:
+                del self._candidates[path]
+            elif version != (size, mtime):
+                self._candidates[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.settle_seconds and st.st_size > 0 and not is_locked(path):
+                del self._candidates[path]
+                self._handed_out[path] = version
+                complete.append(path)
+        return complete
+
+    def forget_missing(self):
+        """Drop the handed-out versions whose file was deleted or renamed away, so memory stays bounded."""
+        for path in list(self._handed_out):
+            if not os.path.exists(path):
+                del self._handed_out[path]
+
+
+class WatchDaemon:
+    """Watches the rules' folders and encodes files as they finish arriving.
+
+    Every complete file becomes a one-file BatchEncoder run on a pool of
+    max_workers threads, so at most that many encodes run at once. Their
+    logs share one folder and are numbered across files, so none overwrite
+    another. The journal makes restarts cheap: files encoded before are
+    skipped.
+    inotify only sees writes made on this machine, so the folders are also
+    rescanned every rescan_interval seconds (and whenever inotify is not
+    available, every poll_interval).
+    """
+
+    def __init__(self, rules, base_settings, max_workers=1, settle_seconds=5.0, poll_interval=2.0,
+                 rescan_interval=60.0, journal=None, use_inotify=None):
+        self.rules = list(rules)
+        self.settings = {rule: rule.settings_for(base_settings) for rule in self.rules}  # rules may share a folder
+        self.log_folder = base_settings.log_folder or default_log_folder()
+        for settings in self.settings.values():
+            settings.simultaneous_encodes = 1  # the pool bounds the total; one ffmpeg per file
+            settings.log_folder = settings.log_folder or self.log_folder
+        self._file_numbers = itertools.count()
+        self.max_workers = max(1, int(max_workers))
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.journal = journal if journal is not None else JobJournal()
+        self.tracker = WriteTracker(settle_seconds)
+        self.cpu_planner = CpuPlanner(slots=self.max_workers)
+        self.use_inotify = inotify_available() if use_inotify is None else use_inotify
+        self.encoders = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.on_file_ready = None  # (path, rule)
+        self.on_encoder_created = None  # (encoder), to attach progress callbacks
+
+    def rule_for(self, path):
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule
+        return None
+
+    def _rescan(self):
+        self.tracker.forget_missing()
+        for rule in self.rules:
+            for path in scan(rule):
+                self.tracker.add(path)
+
+    def _encode(self, path, rule, number):
+        encoder = BatchEncoder([path], self.settings[rule], journal=self.journal, cpu_planner=self.cpu_planner,
+                               first_index=number)
+        if self.on_encoder_created is not None:
+            self.on_encoder_created(encoder)
+        with self._lock:
+            if self._stop.is_set():
+                return
+            self.encoders.add(encoder)
+        try:
+            encoder.run()
+        finally:
+            with self._lock:
+                self.encoders.discard(encoder)
+
+    def run(self):
+        """Watch and encode until stop() is called."""
+        for rule in self.rules:
+            os.makedirs(rule.output_folder, exist_ok=True)
+        watcher = None
+        if self.use_inotify:
+            try:
+                watcher = InotifyWatcher([rule.folder for rule in self.rules],
+                                         recursive=any(rule.recursive for rule in self.rules))
+            except OSError as e:
+                log.warning("inotify unavailable (%s), polling instead", e)
+        interval = self.rescan_interval if watcher is not None else self.poll_interval
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="watch")
+        try:
+            self._rescan()
+            last_scan = time.monotonic()
+            while not self._stop.is_set():
+                if watcher is not None:
+                    # Wake up for new events, or to re-check files that are still settling
+                    paths = watcher.wait(self.poll_interval if len(self.tracker) else interval)
+                    if paths is None:
+                        self._rescan()
+                    else:
+                        for path in paths:
+                            if self.rule_for(path) is not None:
+                                self.tracker.add(path)
+                else:
+                    self._stop.wait(self.poll_interval)
+                if time.monotonic() - last_scan >= interval:
+                    self._rescan()
+                    last_scan = time.monotonic()
+                for path in self.tracker.ready():
+                    rule = self.rule_for(path)
+                    if rule is None:
+                        continue
+                    if self.on_file_ready is not None:
+                        self.on_file_ready(path, rule)
+                    executor.submit(self._encode, path, rule, next(self._file_numbers))
+        finally:
+            if watcher is not None:
+                watcher.close()
+            self.stop()
+            executor.shutdown(wait=True)
+
+    def stop(self):
+        """Stop watching and cancel the encodes in progress."""
+        self._stop.set()
+        with self._lock:
+            encoders = list(self.encoders)
+        for encoder in encoders:
+            encoder.cancel()